@@ -0,0 +1,353 @@
+# scripts/backfill_channels.py
+
+import argparse
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator
+
+import yaml
+from dotenv import load_dotenv
+
+from src.api.errors import QuotaExhaustedError, InvalidRequestError
+from src.api.requests.get_channel_uploads_playlists import GetChannelUploadsPlaylists
+from src.api.requests.get_playlist_page import GetPlaylistPage
+from src.api.requests.get_video_details import GetVideoDetails
+from src.api.youtube_client import YouTubeClient
+from src.api.quota_manager import YouTubeQuotaManager
+from src.db.database_client import enqueue_channel_backfills, retry_failed_channel_backfills, \
+    iter_pending_channel_backfills, update_channel_backfill_progress, finish_channel_backfill, \
+    update_channel_uploads_playlists, insert_video_rows_bulk, insert_video_schedule_rows_bulk, \
+    BULK_FAILED, BULK_INSERTED, VIDEO_COLUMNS, VIDEO_SCHEDULE_COLUMNS
+from src.db.known_ids import KnownIdsIndex, create_known_ids_index
+from src.mappers.video_rows import VideoPageMapper
+from src.scheduling.backfill_budget import BackfillBudget
+from src.utils.iterables import chunked
+from src.utils.logger import setup_logger
+from src.utils.metrics import metrics, configure_metrics, write_run_metrics
+
+
+def load_config(path="config.yaml"):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    config_path = os.path.join(base_dir, "..", path)
+    config_path = os.path.abspath(config_path)
+
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"Config file not found at: {config_path}")
+
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f)
+
+
+# config
+config = load_config()
+backfill_config = config.get("backfill", {})
+channel_workers = backfill_config.get("channel_workers", 8)
+pages_ahead = backfill_config.get("pages_ahead", 4)
+store_workers = backfill_config.get("store_workers", 8)
+
+load_dotenv()
+api_keys = os.getenv("YOUTUBE_API_KEYS", "").split(",")
+
+# Setup logger
+logger = setup_logger(__name__, config["logging"])
+
+# Name of this script's runs in the run metrics
+JOB_NAME = "backfill_channels"
+
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+def main(channel_ids: list[str] = None, new_channels: bool = False, restart: bool = False,
+         retry_failed: bool = False, max_units: int = None):
+    event_start_log()
+    configure_metrics(JOB_NAME, config.get("metrics"))
+
+    quota_manager = YouTubeQuotaManager.from_config(api_keys, config["youtube"])
+    try:
+        if channel_ids:
+            logger.info(f"Queued {enqueue_channel_backfills(channel_ids, restart=restart)} channels for backfill")
+        if new_channels:
+            logger.info(f"Queued {enqueue_channel_backfills()} channels that were never backfilled")
+        if retry_failed:
+            logger.info(f"Re-queued {retry_failed_channel_backfills()} failed backfills")
+
+        backfill_queued_channels(quota_manager, max_units=max_units)
+    finally:
+        # Hand reserved but unspent units back to the quota ledger
+        quota_manager.close()
+        for path in write_run_metrics(config.get("metrics")):
+            logger.info(f"Wrote run metrics to {path}")
+
+
+def backfill_queued_channels(quota_manager: YouTubeQuotaManager, max_units: int = None):
+    budget = BackfillBudget(quota_manager, backfill_config, max_units=max_units)
+    budget.refresh()
+    logger.info(f"Reserving {budget.reserve} units for the other jobs, "
+                f"{quota_manager.remaining_units()} units left today across {len(api_keys)} keys")
+
+    known_videos = create_known_ids_index("videos", config.get("known_ids"))
+    mapper = VideoPageMapper(VIDEO_COLUMNS, VIDEO_SCHEDULE_COLUMNS, config.get("stats_sampling"))
+    run = BackfillRun(quota_manager, budget, known_videos, mapper, datetime.now(timezone.utc))
+    try:
+        run.run(iter_backfill_targets(YouTubeClient(quota_manager), budget))
+    finally:
+        known_videos.save()
+
+    elapsed = time.monotonic() - run.started_at
+    logger.info(f"Completed {run.completed_count} channels, {run.failed_count} failed, "
+                f"{run.paused_count} paused until there is quota")
+    logger.info(f"Fetched {run.page_count} playlist pages, inserted {run.inserted_count} videos "
+                f"({run.inserted_count / max(elapsed, 1):.1f} videos/s), skipped {run.unmapped_count} "
+                f"videos that could not be mapped")
+    logger.info(
+        f"Used {budget.spent()} quota units, "
+        f"{quota_manager.remaining_units()} units left today across {len(api_keys)} keys"
+    )
+
+
+class BackfillRun:
+    """
+    Works through queued backfills, paging each channel's uploads playlist from the
+    newest upload to the oldest.
+
+    Up to ``channel_workers`` channels are paged at once. Each page's video IDs go
+    to a pool of ``store_workers`` that drops known IDs, fetches details 50 per
+    call, maps them and bulk inserts them, while the channel goes on to its next
+    pages (at most ``pages_ahead`` in flight). A page's token is stored once it and
+    every page before it are stored, so an interrupted backfill resumes after the
+    last stored page, on this run or on a later day.
+
+    Paging stops when the budget runs out; those channels stay queued. A channel
+    whose paging or storing fails is marked failed at the last stored page (see
+    ``--retry-failed``).
+    """
+
+    # A page costs one playlistItems.list call and at most one videos.list call
+    PAGE_UNITS = 2
+
+    def __init__(self, quota_manager: YouTubeQuotaManager, budget: BackfillBudget,
+                 known_videos: KnownIdsIndex, mapper: VideoPageMapper, now: datetime):
+        self.qm = quota_manager
+        self.budget = budget
+        self.known_videos = known_videos
+        self.mapper = mapper
+        self.page_request = GetPlaylistPage()
+        self.details_request = GetVideoDetails()
+        # Older videos are stored without a sampling schedule, their tracking has ended
+        self.tracking_cutoff = now - timedelta(days=mapper.scheduler.max_tracking_days)
+
+        self.started_at = time.monotonic()
+        self.page_count = 0
+        self.inserted_count = 0
+        self.unmapped_count = 0
+        self.completed_count = 0
+        self.failed_count = 0
+        self.paused_count = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._store_executor = None
+
+    def run(self, targets: Iterable[tuple[str, str, str]]):
+        """Backfills ``(channel_id, uploads_playlist_id, page_token)`` targets until done or out of budget."""
+        pending = iter(targets)
+        with ThreadPoolExecutor(max_workers=store_workers, thread_name_prefix="backfill-store") as store_executor, \
+                ThreadPoolExecutor(max_workers=channel_workers, thread_name_prefix="backfill-page") as executor:
+            self._store_executor = store_executor
+            in_flight = set()
+
+            def submit_next() -> bool:
+                if self._stop.is_set():
+                    return False
+                target = next(pending, None)
+                if target is None:
+                    return False
+                in_flight.add(executor.submit(self._in_stage, "page", self.backfill_channel, *target))
+                return True
+
+            while len(in_flight) < channel_workers and submit_next():
+                pass
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                    submit_next()
+
+    @staticmethod
+    def _in_stage(stage: str, fn, *args):
+        # Quota units and DB time of the pool threads are reported per stage
+        with metrics.stage(stage):
+            return fn(*args)
+
+    def backfill_channel(self, channel_id: str, playlist_id: str, page_token: str):
+        stored = deque()  # (next page token, store future) per page in flight, in playlist order
+        token = page_token
+        try:
+            while True:
+                if self._stop.is_set() or not self.budget.allows(self.PAGE_UNITS):
+                    self._stop.set()
+                    self._drain(channel_id, stored, wait_all=True)
+                    with self._lock:
+                        self.paused_count += 1
+                    return
+
+                try:
+                    video_ids, next_token = self.qm.execute(self.page_request, playlist_id=playlist_id,
+                                                            page_token=token)
+                except InvalidRequestError:
+                    if token is None or token != page_token:
+                        raise
+                    # Stored tokens can expire between days; known videos are skipped on the way back down
+                    logger.warning(f"Page token of channel {channel_id} expired, paging from the newest upload")
+                    token = page_token = None
+                    continue
+
+                with self._lock:
+                    self.page_count += 1
+                stored.append((next_token, self._store_executor.submit(self._in_stage, "store", self.store_page,
+                                                                       video_ids)))
+                self._drain(channel_id, stored, wait_all=len(stored) >= pages_ahead)
+                if next_token is None:
+                    break
+                token = next_token
+
+            self._drain(channel_id, stored, wait_all=True)
+            finish_channel_backfill(channel_id, STATUS_COMPLETED)
+            with self._lock:
+                self.completed_count += 1
+            logger.info(f"Backfilled channel {channel_id}")
+        except QuotaExhaustedError as e:
+            # Every key is out: stop paging, keep the channel queued at its last stored page
+            self._stop.set()
+            self._drain(channel_id, stored, wait_all=True, raise_errors=False)
+            with self._lock:
+                self.paused_count += 1
+            logger.warning(f"Out of quota while backfilling channel {channel_id}: {e}")
+        except Exception as e:
+            self._drain(channel_id, stored, wait_all=True, raise_errors=False)
+            finish_channel_backfill(channel_id, STATUS_FAILED, error=str(e))
+            with self._lock:
+                self.failed_count += 1
+            logger.error(f"Failed to backfill channel {channel_id}: {e}")
+
+    def _drain(self, channel_id: str, stored: deque, wait_all: bool, raise_errors: bool = True):
+        """
+        Records the pages stored in order so far. With ``wait_all``, waits for the
+        oldest pages in flight until none is left (or, failing, until one fails).
+        """
+        pages = 0
+        videos = 0
+        last_token = None
+        try:
+            while stored and (wait_all or stored[0][1].done()):
+                next_token, future = stored[0]
+                videos += future.result()
+                stored.popleft()
+                pages += 1
+                last_token = next_token
+        except Exception:
+            # Pages after a failed one are not recorded; they are paged again on retry
+            stored.clear()
+            if raise_errors:
+                raise
+        finally:
+            if pages:
+                update_channel_backfill_progress(channel_id, last_token, pages, videos)
+
+    def store_page(self, video_ids: list[str]) -> int:
+        """
+        Stores a page's videos that are not stored yet; returns how many were inserted.
+
+        Videos that cannot be mapped are logged and skipped, as fetching them again
+        would fail the same way. If some inserts fail, the rest of the page is still
+        scheduled and marked known before the page fails, so a retry only fetches
+        the failed videos again.
+        """
+        new_ids = self.known_videos.filter_unknown(video_ids)
+        if not new_ids:
+            return 0
+
+        bodies = self.qm.execute(self.details_request, video_ids=new_ids, raw=True)
+        rows, failures = self.mapper.map_responses(bodies)
+        for video_id, error in failures:
+            logger.error(f"Failed to map video {video_id}, skipping it: {error}")
+
+        video_outcomes = insert_video_rows_bulk([video_row for video_row, _ in rows])
+        stored_ids = {video_id for video_id, outcome, _ in video_outcomes if outcome != BULK_FAILED}
+        insert_video_schedule_rows_bulk([
+            schedule_row for video_row, schedule_row in rows
+            if video_row[0] in stored_ids and schedule_row is not None and schedule_row[1] >= self.tracking_cutoff
+        ])
+        self.known_videos.add(stored_ids)
+
+        inserted = sum(1 for _, outcome, _ in video_outcomes if outcome == BULK_INSERTED)
+        with self._lock:
+            self.inserted_count += inserted
+            self.unmapped_count += len(failures)
+
+        failed = [(video_id, error) for video_id, outcome, error in video_outcomes if outcome == BULK_FAILED]
+        if failed:
+            raise RuntimeError(f"{len(failed)} videos could not be stored, e.g. {failed[0][0]}: {failed[0][1]}")
+        return inserted
+
+
+def iter_backfill_targets(yt: YouTubeClient, budget: BackfillBudget) -> Iterator[tuple[str, str, str]]:
+    """
+    Streams ``(channel_id, uploads_playlist_id, page_token)`` for queued backfills.
+    Missing uploads playlists are resolved 50 channels per call and stored;
+    channels the API no longer knows are marked failed. Stops early when the
+    budget runs out.
+    """
+    for chunk in iter_pending_channel_backfills():
+        missing = [channel_id for channel_id, playlist_id, _ in chunk if not playlist_id]
+        resolved = {}
+        for batch in chunked(missing, GetChannelUploadsPlaylists.MAX_IDS_PER_REQUEST):
+            if not budget.allows(1):
+                return
+            try:
+                playlists = yt.resolve_uploads_playlists(batch)
+            except Exception as e:
+                # Channels already handed out finish; the rest wait for the next run
+                logger.error(f"Failed to resolve uploads playlists, not starting more channels: {e}")
+                return
+            update_channel_uploads_playlists(playlists)
+            resolved.update(playlists)
+
+        for channel_id, playlist_id, page_token in chunk:
+            playlist_id = playlist_id or resolved.get(channel_id)
+            if not playlist_id:
+                finish_channel_backfill(channel_id, STATUS_FAILED, error="Channel or uploads playlist not found")
+                logger.warning(f"Channel {channel_id} not found, backfill marked as failed")
+                continue
+            yield channel_id, playlist_id, page_token
+
+
+def event_start_log():
+    logger.info("")
+    logger.info("=" * 60)
+    logger.info(f"Starting backfill_channels run at {datetime.now(timezone.utc).isoformat()}")
+    logger.info("=" * 60)
+    logger.info("")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="Backfill the full upload history of queued channels within the quota left today."
+    )
+    arg_parser.add_argument("--channels", nargs="+", metavar="CHANNEL_ID",
+                            help="Queue these channels (they must already be stored) before backfilling.")
+    arg_parser.add_argument("--new-channels", action="store_true",
+                            help="Queue every active channel that was never backfilled.")
+    arg_parser.add_argument("--restart", action="store_true",
+                            help="With --channels, start those channels over from the newest upload.")
+    arg_parser.add_argument("--retry-failed", action="store_true",
+                            help="Re-queue failed backfills from the page they failed on.")
+    arg_parser.add_argument("--max-units", type=int,
+                            help="Spend at most this many quota units in this run.")
+    args = arg_parser.parse_args()
+    main(channel_ids=args.channels, new_channels=args.new_channels, restart=args.restart,
+         retry_failed=args.retry_failed, max_units=args.max_units)
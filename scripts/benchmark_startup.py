@@ -0,0 +1,61 @@
+# scripts/benchmark_startup.py
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = [
+    "fetch_new_uploads.py",
+    "update_video_stats_hourly.py",
+    "populate_channels_from_a_list.py",
+]
+
+# Runs a script's module-level code (imports, config, client setup) without calling
+# main() and prints the elapsed time, i.e. the cost paid before any real work starts.
+PROBE = """
+import runpy, sys, time
+start = time.perf_counter()
+runpy.run_path(sys.argv[1], run_name="__benchmark__")
+print(time.perf_counter() - start)
+"""
+
+
+def measure(script_path: str, runs: int) -> list[float]:
+    env = dict(os.environ, PYTHONPATH=BASE_DIR)
+    timings = []
+    for _ in range(runs):
+        # A fresh interpreter per run so every measurement is a cold start
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE, script_path],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"{os.path.basename(script_path)} failed to start:\n{result.stderr}")
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import-to-first-work time of each script.")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per script.")
+    args = parser.parse_args()
+
+    print(f"{'script':<36} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for script in SCRIPTS:
+        try:
+            timings = measure(os.path.join(BASE_DIR, "scripts", script), args.runs)
+        except RuntimeError as e:
+            print(f"{script:<36} error: {e}")
+            continue
+        print(
+            f"{script:<36} {statistics.median(timings) * 1000:>10.1f} "
+            f"{min(timings) * 1000:>10.1f} {max(timings) * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# scripts/benchmark_stats_batch.py
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+MODES = ["dicts", "columnar"]
+PAGE_SIZE = 50
+
+# Due videos the hourly job fetches and stores together (iter_due_videos' chunk_size)
+HOURLY_CHUNK_SIZE = 1000
+
+
+def response_pages(video_count: int):
+    """Synthetic ``videos.list`` pages (JSON text, as received) of the fields the hourly job requests."""
+    for start in range(0, video_count, PAGE_SIZE):
+        items = [
+            {
+                "id": f"video{index:07d}",
+                "statistics": {
+                    "viewCount": str(index * 37),
+                    "likeCount": str(index * 3),
+                    "favoriteCount": "0",
+                    "commentCount": str(index % 997),
+                },
+            }
+            for index in range(start, min(start + PAGE_SIZE, video_count))
+        ]
+        yield json.dumps({"items": items})
+
+
+def run_dicts(pages, chunk_pages: int, now: datetime) -> int:
+    """The previous path: raw items per chunk, a mapped dict and a BigQuery row dict per video."""
+    from src.mappers.map_video_stats import map_video_stats_snapshot
+
+    rows = 0
+    sink = deque(maxlen=0)
+    items = []
+    for page_number, page in enumerate(pages, start=1):
+        items.extend(json.loads(page)["items"])
+        if page_number % chunk_pages:
+            continue
+        snapshots = [map_video_stats_snapshot(item) for item in items]
+        for sample_index, stats in enumerate(snapshots):
+            record = {
+                "videoId": stats["video_id"],
+                "recordedAt": now.isoformat(),
+                "viewCount": stats["view_count"],
+                "likeCount": stats["likes_count"],
+                "commentCount": stats["comment_count"],
+                "dayIndex": sample_index,
+                "fetchedFrom": "hourly_script",
+            }
+            sink.append({k: v for k, v in record.items()})
+            rows += 1
+        items = []
+    return rows
+
+
+def run_columnar(pages, chunk_pages: int, now: datetime) -> int:
+    """The current path: pages parsed straight into a VideoStatsBatch, rows built from the columns."""
+    from src.db.bigquery_client import stats_batch_rows
+    from src.mappers.map_video_stats import VideoStatsBatch
+
+    rows = 0
+    sink = deque(maxlen=0)
+    batch = VideoStatsBatch()
+    for page_number, page in enumerate(pages, start=1):
+        batch.extend_items(json.loads(page)["items"])
+        if page_number % chunk_pages:
+            continue
+        sample_indexes = {video_id: index for index, video_id in enumerate(batch.video_ids)}
+        for row in stats_batch_rows(batch, now, sample_indexes, "hourly_script"):
+            sink.append(row)
+            rows += 1
+        batch = VideoStatsBatch()
+    return rows
+
+
+def child(mode: str, video_count: int, chunk_size: int):
+    # Pre-render the responses so only the processing is timed and counted in the peak
+    pages = list(response_pages(video_count))
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    now = datetime.now(timezone.utc)
+
+    runner = run_dicts if mode == "dicts" else run_columnar
+    start = time.perf_counter()
+    rows = runner(pages, max(chunk_size // PAGE_SIZE, 1), now)
+    elapsed = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"rows": rows, "seconds": elapsed, "peak_delta_kb": peak_kb - baseline_kb}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the dict and columnar stats snapshot paths.")
+    parser.add_argument("--videos", type=int, default=1_000_000, help="Snapshots processed per run.")
+    parser.add_argument("--chunk-size", type=int, default=HOURLY_CHUNK_SIZE,
+                        help="Videos handled together; defaults to the hourly job's due-video chunk.")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        child(args.mode, args.videos, args.chunk_size)
+        return
+
+    print(f"{'path':<10} {'videos/s':>12} {'peak RSS +MB':>13}")
+    for mode in MODES:
+        # A fresh interpreter per path so the peak RSS of one does not hide the other's
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--mode", mode,
+             "--videos", str(args.videos), "--chunk-size", str(args.chunk_size)],
+            cwd=BASE_DIR, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(f"{mode:<10} error: {result.stderr.strip()}")
+            continue
+        measured = json.loads(result.stdout.strip().splitlines()[-1])
+        print(
+            f"{mode:<10} {measured['rows'] / measured['seconds']:>12,.0f} "
+            f"{measured['peak_delta_kb'] / 1024:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
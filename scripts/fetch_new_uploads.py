@@ -1,19 +1,31 @@
 # scripts/fetch_new_uploads.py
 
+import argparse
 import os
+import threading
 from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator
 
 import yaml
 from dotenv import load_dotenv
-from dateutil import parser
 
+from src.api.errors import ResourceNotFoundError
 from src.api.requests.get_video_details import GetVideoDetails
-from src.db.database_client import fetch_all_channels, mark_channel_inactive, insert_video, \
-    insert_video_schedule
-from src.mappers.map_video_metadata import map_video_metadata
+from src.db.database_client import iter_due_channels, update_channel_uploads_playlists, \
+    update_channel_high_water_marks, mark_channel_inactive, insert_video_rows_bulk, \
+    insert_video_schedule_rows_bulk, refresh_channel_upload_rates, update_channel_poll_schedule, \
+    BULK_FAILED, BULK_INSERTED, BULK_SKIPPED, VIDEO_COLUMNS, VIDEO_SCHEDULE_COLUMNS
+from src.db.known_ids import KnownIdsIndex, create_known_ids_index
+from src.mappers.video_rows import VideoPageMapper
 from src.api.youtube_client import YouTubeClient
 from src.api.quota_manager import YouTubeQuotaManager
+from src.scheduling.channel_polling import ChannelPollingPlanner
+from src.scheduling.checkpoint import JobCheckpoint
+from src.utils.iterables import chunked
 from src.utils.logger import setup_logger
+from src.utils.metrics import configure_metrics, write_run_metrics
+from src.utils.pipeline import Pipeline, Stage
+from src.utils.timestamps import to_naive_utc
 
 
 def load_config(path="config.yaml"):
@@ -31,6 +43,10 @@ def load_config(path="config.yaml"):
 # config
 config = load_config()
 lookback_days = config["youtube"].get("lookback_days", 1)
+scan_concurrency = config["youtube"].get("scan_concurrency", 8)
+details_workers = config.get("fetch_pipeline", {}).get("details_workers", 4)
+write_batch_size = config.get("fetch_pipeline", {}).get("write_batch_size", 500)
+pipeline_queue_size = config.get("fetch_pipeline", {}).get("queue_size", 16)
 
 load_dotenv()
 api_keys = os.getenv("YOUTUBE_API_KEYS", "").split(",")
@@ -38,86 +54,337 @@ api_keys = os.getenv("YOUTUBE_API_KEYS", "").split(",")
 # Setup logger
 logger = setup_logger(__name__, config["logging"])
 
+# Name of this script's runs in the job_runs table
+JOB_NAME = "fetch_new_uploads"
 
-def main():
+
+def main(resume: bool = False):
     event_start_log()
+    configure_metrics(JOB_NAME, config.get("metrics"))
+
+    quota_manager = YouTubeQuotaManager.from_config(api_keys, config["youtube"])
+    try:
+        fetch_and_store_new_uploads(quota_manager, resume=resume)
+    finally:
+        # Hand reserved but unspent units back to the quota ledger
+        quota_manager.close()
+        for path in write_run_metrics(config.get("metrics")):
+            logger.info(f"Wrote run metrics to {path}")
 
-    quota_manager = YouTubeQuotaManager(api_keys)
+
+def fetch_and_store_new_uploads(quota_manager: YouTubeQuotaManager, resume: bool = False):
     yt = YouTubeClient(quota_manager)
+    planner = ChannelPollingPlanner(config.get("channel_polling"))
+
+    # A resumed run keeps the original run's clock and budget, minus the channels it finished
+    now = datetime.now(timezone.utc)
+    checkpoint = JobCheckpoint.start(JOB_NAME, resume=resume, state={
+        "now": now.isoformat(),
+        "budget": planner.channel_budget(quota_manager.remaining_units()),
+    })
+    now = datetime.fromisoformat(checkpoint.state["now"])
+    budget = max(checkpoint.state["budget"] - len(checkpoint.done), 0)
+    since_time = now - timedelta(days=lookback_days)
+    known_videos = create_known_ids_index("videos", config.get("known_ids"))
+    mapper = VideoPageMapper(VIDEO_COLUMNS, VIDEO_SCHEDULE_COLUMNS, config.get("stats_sampling"))
 
-    since_time = datetime.now(timezone.utc) - timedelta(days=lookback_days)
+    try:
+        # Step 1: pick the due channels most likely to have uploaded, within this run's share of the quota
+        if not checkpoint.resumed:
+            refresh_channel_upload_rates(planner.history_days, to_naive_utc(now), planner.rate_refresh_hours)
+        due_channels = (
+            channel for chunk in iter_due_channels(to_naive_utc(now)) for channel in chunk
+            if not checkpoint.is_done(channel[0])
+        )
+        channels = planner.plan(due_channels, budget, now)
+        logger.info(f"Polling {len(channels)} due channels (budget {budget})")
+
+        # feed the planned channels into the concurrent playlist scan,
+        # each playlist scanned only down to its channel's high-water mark
+        run = NewUploadsRun(quota_manager, planner, checkpoint, now, known_videos, mapper)
+        scan_targets = iter_scan_targets(channels, since_time, yt, run)
+        video_ids = fetch_recent_video_ids(scan_targets, yt, run)
+
+        # Step 2: fetch details, map and write concurrently while the scan is still running
+        pipeline = Pipeline([
+            Stage("details", run.fetch_details, workers=details_workers, on_error=run.details_failed),
+            Stage("map", run.map_details, on_error=run.map_failed),
+            Stage("write", run.write_batch, batch_size=write_batch_size, on_error=run.write_failed),
+        ], queue_size=pipeline_queue_size)
+        pipeline.run(chunked(
+            iter_unknown_video_ids(video_ids, known_videos, run.skipped), GetVideoDetails.MAX_IDS_PER_REQUEST
+        ))
+
+        # Channels whose scan or videos failed stay due, with their old mark, and are retried next run
+        run.flush()
+    except Exception:
+        checkpoint.fail()
+        raise
+    finally:
+        known_videos.save()
+    checkpoint.complete()
+
+    logger.info(f"Finished {run.completed_count} channels")
+    for name, stage_stats in pipeline.stats().items():
+        logger.info(f"Stage {name}: {stage_stats['in']} in, {stage_stats['out']} out, "
+                    f"{stage_stats['errors']} failed, {stage_stats['seconds']:.1f}s busy")
+    logger.info(f"Fetched {run.fetched_count} full video records")
+    logger.info(f"Inserted {run.inserted_count} videos ({run.skipped_count} already stored, "
+                f"{len(run.failed_ids)} failed)")
+    logger.info(
+        f"Used {quota_manager.total_quota} quota units, "
+        f"{quota_manager.remaining_units()} units left today across {len(api_keys)} keys"
+    )
+    if quota_manager.response_cache is not None:
+        cache_stats = quota_manager.response_cache.stats()
+        logger.info(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                    f"({cache_stats['hit_rate']:.0%} served unchanged)")
+
+
+class NewUploadsRun:
+    """
+    The details, map and write stages of the fetch pipeline, and the per-channel
+    progress they share.
+
+    A channel is finished once its playlist scan succeeded and every new video
+    from it is stored. Finished channels are written out in groups of
+    FLUSH_CHANNELS: their high-water mark advances, their next poll is
+    scheduled and the run's checkpoint records them, so a crashed run never
+    scans them again.
+
+    A failure only loses its own chunk, video or batch. The IDs are recorded in
+    ``failed_ids``, and the channels they came from are never finished, so they
+    keep their old mark and stay due for the next run. Everything written
+    before the failure stays written.
+    """
+
+    FLUSH_CHANNELS = 100
+
+    def __init__(self, quota_manager: YouTubeQuotaManager, planner: ChannelPollingPlanner,
+                 checkpoint: JobCheckpoint, now: datetime, known_videos: KnownIdsIndex, mapper: VideoPageMapper):
+        self.qm = quota_manager
+        self.planner = planner
+        self.checkpoint = checkpoint
+        self.now = now
+        self.known_videos = known_videos
+        self.mapper = mapper
+        self.details_request = GetVideoDetails()
+
+        self.failed_ids = set()
+        self.fetched_count = 0
+        self.inserted_count = 0
+        self.skipped_count = 0
+        self.completed_count = 0
+
+        self._channels = {}  # uploads playlist ID -> (channel ID, uploads per day)
+        self._playlists = {}  # video ID -> uploads playlist it was found in
+        self._pending = {}  # uploads playlist ID -> video IDs not stored yet
+        self._failed_playlists = set()
+        self._marks = {}  # uploads playlist ID -> newest stored (published_at, video_id)
+        self._completed = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def planned(self, playlist_id: str, channel_id: str, uploads_per_day: float):
+        with self._lock:
+            self._channels[playlist_id] = (channel_id, uploads_per_day)
+
+    def scanned(self, playlist_id: str, video_ids: list[str]):
+        with self._lock:
+            for video_id in video_ids:
+                self._playlists[video_id] = playlist_id
+            self._pending[playlist_id] = set(video_ids)
+            self._complete_if_done(playlist_id)
+        self._flush_if_full()
+
+    def skipped(self, video_ids: Iterable[str]):
+        """Videos the scan found that were already stored."""
+        with self._lock:
+            self._resolve(video_ids)
+        self._flush_if_full()
+
+    def fetch_details(self, video_ids: list[str]) -> list[tuple[list[str], list[bytes]]]:
+        # Undecoded, so decoding happens in the map stage
+        bodies = self.qm.execute(self.details_request, video_ids=video_ids, raw=True)
+        return [(video_ids, bodies)]
+
+    def details_failed(self, video_ids: list[str], error: Exception):
+        self._fail(video_ids)
+        logger.error(f"Failed to fetch video details for {len(video_ids)} videos: {error}")
+
+    def map_details(self, details: tuple[list[str], list[bytes]]) -> list[tuple[tuple, tuple]]:
+        video_ids, bodies = details
+        rows, failures = self.mapper.map_responses(bodies)
+        for video_id, error in failures:
+            logger.error(f"Failed to map video {video_id}: {error}")
+        self._fail([video_id for video_id, _ in failures])
+
+        # Deleted or private since the scan: nothing to store
+        returned_ids = {video_row[0] for video_row, _ in rows} | {video_id for video_id, _ in failures}
+        with self._lock:
+            self.fetched_count += len(returned_ids)
+            self._resolve(video_id for video_id in video_ids if video_id not in returned_ids)
+        return rows
+
+    def map_failed(self, details: tuple[list[str], list[bytes]], error: Exception):
+        self._fail(details[0])
+        logger.error(f"Failed to map {len(details[0])} videos: {error}")
+
+    def write_batch(self, records: list[tuple[tuple, tuple]]):
+        video_outcomes = insert_video_rows_bulk([video_row for video_row, _ in records])
+        log_bulk_failures("video", video_outcomes)
+        self._fail([video_id for video_id, outcome, _ in video_outcomes if outcome == BULK_FAILED])
+
+        # Only schedule videos that are actually in the table
+        stored_ids = {video_id for video_id, outcome, _ in video_outcomes if outcome != BULK_FAILED}
+        schedule_outcomes = insert_video_schedule_rows_bulk([
+            schedule_row for video_row, schedule_row in records
+            if schedule_row is not None and video_row[0] in stored_ids
+        ])
+        log_bulk_failures("video schedule", schedule_outcomes)
+        self.known_videos.add(stored_ids)
+
+        with self._lock:
+            self.inserted_count += sum(1 for _, outcome, _ in video_outcomes if outcome == BULK_INSERTED)
+            self.skipped_count += sum(1 for _, outcome, _ in video_outcomes if outcome == BULK_SKIPPED)
+            for video_row, schedule_row in records:
+                # The schedule row carries the parsed publish time (upload_datetime)
+                if video_row[0] in stored_ids and schedule_row is not None:
+                    self._advance_mark(video_row[0], schedule_row[1])
+            self._resolve(stored_ids)
+        self._flush_if_full()
+
+    def write_failed(self, records: list[tuple[tuple, tuple]], error: Exception):
+        self._fail([video_row[0] for video_row, _ in records])
+        logger.error(f"Failed to write {len(records)} videos: {error}")
+
+    def flush(self):
+        """Writes out the channels finished since the last flush."""
+        with self._flush_lock:
+            with self._lock:
+                completed, self._completed = self._completed, []
+            if not completed:
+                return
+
+            marks = {}
+            schedules = []
+            for playlist_id in completed:
+                channel_id, uploads_per_day = self._channels[playlist_id]
+                if playlist_id in self._marks:
+                    marks[channel_id] = self._marks[playlist_id]
+                tier, next_poll_at = self.planner.next_poll(uploads_per_day, self.now)
+                schedules.append((channel_id, tier, to_naive_utc(self.now), next_poll_at))
+
+            update_channel_high_water_marks(marks)
+            update_channel_poll_schedule(schedules)
+            self.checkpoint.mark_done([channel_id for channel_id, _, _, _ in schedules])
+            self.completed_count += len(completed)
+
+    def _flush_if_full(self):
+        if len(self._completed) >= self.FLUSH_CHANNELS:
+            self.flush()
+
+    def _fail(self, video_ids: Iterable[str]):
+        with self._lock:
+            for video_id in video_ids:
+                self.failed_ids.add(video_id)
+                self._failed_playlists.add(self._playlists.get(video_id))
+
+    def _resolve(self, video_ids: Iterable[str]):
+        # Caller holds self._lock
+        for video_id in video_ids:
+            playlist_id = self._playlists.get(video_id)
+            pending = self._pending.get(playlist_id)
+            if pending is None:
+                continue
+            pending.discard(video_id)
+            self._complete_if_done(playlist_id)
+
+    def _complete_if_done(self, playlist_id: str):
+        # Caller holds self._lock
+        if not self._pending[playlist_id] and playlist_id not in self._failed_playlists:
+            del self._pending[playlist_id]
+            self._completed.append(playlist_id)
+
+    def _advance_mark(self, video_id: str, published_at: datetime):
+        # Caller holds self._lock
+        playlist_id = self._playlists.get(video_id)
+        current = self._marks.get(playlist_id)
+        if current is None or published_at > current[0]:
+            self._marks[playlist_id] = (published_at, video_id)
+
+
+def log_bulk_failures(kind: str, outcomes: list[tuple]):
+    for record_id, outcome, error in outcomes:
+        if outcome == BULK_FAILED:
+            logger.error(f"Failed to insert {kind} {record_id}: {error}")
+
+
+def iter_unknown_video_ids(video_ids: Iterable[str], known_videos: KnownIdsIndex,
+                           on_known: Callable[[list[str]], None], chunk_size: int = 500) -> Iterator[str]:
+    """Drops IDs already in the videos table; only the known-IDs index's hits are checked against the DB."""
+    for chunk in chunked(video_ids, chunk_size):
+        unknown = known_videos.filter_unknown(chunk)
+        unknown_set = set(unknown)
+        on_known([video_id for video_id in chunk if video_id not in unknown_set])
+        yield from unknown
+
+
+def iter_scan_targets(channels: list[tuple], since_time: datetime, yt: YouTubeClient,
+                      run: NewUploadsRun) -> Iterator[tuple[str, datetime, str]]:
+    """
+    Streams ``(uploads_playlist_id, since, last_seen_video_id)`` for the planned channels
+    (rows from iter_due_channels), registering each playlist's channel with ``run``.
+
+    Channels with a high-water mark are scanned down to it, however long ago the last
+    run was; channels without one fall back to the ``lookback_days`` window.
+    Playlists stored on the channel row are used as is; missing ones are resolved 50
+    channels per call and stored so later runs skip the lookup, and channels the API
+    no longer knows are marked inactive.
+    """
+    for chunk in chunked(channels, 1000):
+        missing = [channel[0] for channel in chunk if not channel[1]]
+        resolved = resolve_missing_playlists(missing, yt) if missing else {}
+
+        for channel_id, playlist_id, last_seen_published_at, last_seen_video_id, uploads_per_day, _, _ in chunk:
+            playlist_id = playlist_id or resolved.get(channel_id)
+            if not playlist_id:
+                continue
+            run.planned(playlist_id, channel_id, uploads_per_day)
+            since = last_seen_published_at.replace(tzinfo=timezone.utc) if last_seen_published_at else since_time
+            yield playlist_id, since, last_seen_video_id
+
+
+def resolve_missing_playlists(channel_ids: list[str], yt: YouTubeClient) -> dict[str, str]:
+    logger.info(f"Resolving uploads playlists for {len(channel_ids)} channels")
+    try:
+        resolved = yt.resolve_uploads_playlists(channel_ids)
+    except Exception as e:
+        logger.error(f"Failed to resolve uploads playlists: {e}. Scanning by channel ID instead.")
+        return {channel_id: channel_id for channel_id in channel_ids}
 
-    # collect videos so can fetch data with batch API
-    upload_playlist_ids = [playlist_id[0] for playlist_id in fetch_all_channels()]
-    logger.info(f"Found {len(upload_playlist_ids)} active channels")
+    update_channel_uploads_playlists(resolved)
+    for channel_id in channel_ids:
+        if channel_id not in resolved:
+            mark_channel_inactive(channel_id)
+            logger.warning(f"Channel {channel_id} not found. Channel marked as inactive.")
 
-    video_ids = fetch_recent_video_ids(since_time, upload_playlist_ids, yt)
+    return resolved
 
-    # Step 2: Get video details in batches
-    if not video_ids:
-        logger.info("No new video IDs found.")
-        return
 
-    video_details_fetcher = GetVideoDetails()
-    try:
-        video_details = quota_manager.execute(video_details_fetcher, video_ids=video_ids)
-    except Exception as e:
-        logger.error(f"Failed to fetch video details: {e}")
-        return
-
-    # Step 3: Map and insert video details
-    logger.info(f"Fetched {len(video_details)} full video records")
-
-    inserted_video_count = 0
-    for video in video_details:
-        try:
-            video_record = map_video_metadata(video)
-            insert_video(**video_record)
-            logger.info(f"Inserted video: {video_record['id']}")
-
-            # Parse published_at to datetime for upload_datetime
-            published_at_str = video_record.get("published_at")
-            upload_datetime = parser.isoparse(published_at_str) if published_at_str else None
-
-            # Calculate bin_id as the hour of the upload time (0-23)
-            bin_id = upload_datetime.hour if upload_datetime else None
-
-            if upload_datetime:
-                insert_video_schedule(
-                    video_id=video_record["id"],
-                    upload_datetime=upload_datetime,
-                    current_sample=0,
-                    bin_id=bin_id
-                )
-
-            logger.info(f"Inserted video schedule: {video_record['id']}")
-            inserted_video_count += 1
-
-
-        except Exception as e:
-            logger.exception(f"Failed to insert video {video.get('id')}: {e}")
-
-    logger.info(f"Inserted {inserted_video_count} videos")
-
-def fetch_recent_video_ids(since_time: datetime, upload_playlist_ids: list[str], yt: YouTubeClient) -> list[str]:
-    video_ids = []
-    for playlist_id in upload_playlist_ids:
-        try:
-            videos = yt.get_recent_uploads(playlist_id, since=since_time)
-            if videos:
-                video_ids.extend(videos)
+def fetch_recent_video_ids(scan_targets: Iterable[tuple[str, datetime, str]], yt: YouTubeClient,
+                           run: NewUploadsRun) -> Iterator[str]:
+    scan = yt.scan_new_uploads(scan_targets, max_workers=scan_concurrency)
+    for playlist_id, videos, error in scan:
+        if error is None:
             logger.info(f"{playlist_id}: {len(videos)} recent videos")
-
-        except RuntimeError as e:
-            error_message = str(e).lower()
-            if "404" in error_message:
-                mark_channel_inactive(playlist_id)
-                logger.warning(f"Failed to fetch for {playlist_id}: {e}. Channel marked as inactive.")
-            else:
-                logger.error(f"Failed to fetch for {playlist_id}: {e}. Not marking as inactive.")
-        except Exception as e:
-            logger.error(f"Failed to fetch for {playlist_id}: {e}")
-    return video_ids
+            run.scanned(playlist_id, videos)
+            yield from videos
+        elif isinstance(error, ResourceNotFoundError):
+            mark_channel_inactive(playlist_id)
+            logger.warning(f"Failed to fetch for {playlist_id}: {error}. Channel marked as inactive.")
+        else:
+            logger.error(f"Failed to fetch for {playlist_id}: {error}. Not marking as inactive.")
 
 
 def event_start_log():
@@ -129,4 +396,7 @@ def event_start_log():
 
 
 if __name__ == "__main__":
-    main()
+    arg_parser = argparse.ArgumentParser(description="Fetch and store new uploads of due channels.")
+    arg_parser.add_argument("--resume", action="store_true",
+                            help="Continue the last interrupted run instead of starting a new one.")
+    main(resume=arg_parser.parse_args().resume)
@@ -1,13 +1,21 @@
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
+from typing import Iterator
 
 from dotenv import load_dotenv
 
+from src.api.errors import QuotaExhaustedError
+from src.api.handle_cache import create_handle_cache
+from src.api.requests.get_channel_details import GetChannelDataByHandleOrId
 from src.mappers.map_channel_metadata import map_channel_metadata
 from src.api.youtube_client import YouTubeClient
 from src.api.quota_manager import YouTubeQuotaManager
-from src.db.database_client import insert_channel, fetch_all_channels
+from src.db.database_client import upsert_channels_bulk, BULK_FAILED
+from src.db.known_ids import KnownIdsIndex, create_known_ids_index
+from src.utils.iterables import chunked
 from src.utils.logger import setup_logger
+from src.utils.metrics import configure_metrics, write_run_metrics
 import yaml
 
 
@@ -26,6 +34,10 @@ def load_config(path="config.yaml"):
 config = load_config()
 logger = setup_logger(__name__, config["logging"])
 
+import_chunk_size = config.get("channel_import", {}).get("chunk_size", 5000)
+handle_workers = config.get("channel_import", {}).get("handle_workers", 8)
+details_workers = config.get("channel_import", {}).get("details_workers", 4)
+
 
 def main():
     logger.info("")
@@ -42,44 +54,163 @@ def main():
         logger.error("Missing YOUTUBE_API_KEYS in .env file")
         return
 
-    quota_manager = YouTubeQuotaManager(api_keys)
-    yt_client = YouTubeClient(quota_manager)
+    configure_metrics("populate_channels_from_a_list", config.get("metrics"))
+    quota_manager = YouTubeQuotaManager.from_config(api_keys, config["youtube"])
+    handle_cache = create_handle_cache(config["youtube"].get("handle_cache"))
+    yt_client = YouTubeClient(quota_manager, handle_cache=handle_cache)
 
     file_name = os.getenv("CHANNELS_FILE_NAME")
-
-    channel_ids_initial = read_channels_list_from_file(file_name=file_name)
-
-    existing_ids = [i[0] for i in fetch_all_channels()]
-    channel_ids = list(filter(lambda cid: cid not in existing_ids, channel_ids_initial))
-
-    logger.info(f"Fetching details for {len(channel_ids)} channels...")
+    known_channels = create_known_ids_index("channels", config.get("known_ids"))
+    channel_import = ChannelImport(yt_client, known_channels)
 
     try:
-        channel_data = yt_client.fetch_channel_details(channel_ids)
-        if not channel_data:
-            logger.warning("No data returned from API.")
-            return
-
-        logger.info("Mapping and inserting channels...")
-        for channel in channel_data:
-            mapped = map_channel_metadata(channel)
-            insert_channel(mapped)
-            logger.info(f"Inserted channel: {mapped['id']} - {mapped['title']}")
-
-        logger.info("Done.")
+        for number, entries in enumerate(chunked(iter_channel_entries(file_name), import_chunk_size), start=1):
+            chunk = channel_import.import_chunk(entries)
+            totals = channel_import.totals
+            logger.info(
+                f"Chunk {number}: {chunk['read']} entries, {chunk['duplicate']} duplicates, "
+                f"{chunk['known']} already stored, {chunk['not_found']} not found, "
+                f"{chunk['upserted']} upserted, {chunk['failed']} failed "
+                f"(total {totals['read']} read, {totals['upserted']} upserted, {totals['failed']} failed, "
+                f"{quota_manager.total_quota} quota units)"
+            )
+
+        logger.info(f"Done. Used {quota_manager.total_quota} quota units.")
+        if handle_cache is not None:
+            cache_stats = handle_cache.stats()
+            logger.info(f"Handle cache: {cache_stats['hits']} handles cached, "
+                        f"{cache_stats['misses']} resolved through the API")
+    except QuotaExhaustedError as e:
+        logger.error(f"Stopping the import, out of quota: {e}")
     except Exception as e:
         logger.exception(f"Error occurred while fetching or inserting channels: {e}")
-
-
-def read_channels_list_from_file(file_name="channels.txt"):
+    finally:
+        known_channels.save()
+        # Hand reserved but unspent units back to the quota ledger
+        quota_manager.close()
+        for path in write_run_metrics(config.get("metrics")):
+            logger.info(f"Wrote run metrics to {path}")
+
+
+class ChannelImport:
+    """
+    Imports a stream of channel IDs and handles chunk by chunk.
+
+    Per chunk: entries seen earlier in the file are dropped, handles are resolved
+    concurrently, IDs already stored are dropped (see KnownIdsIndex), details are
+    fetched 50 channels per call, also concurrently, and the channels are upserted
+    in bulk transactions. A failed handle, details call or row only loses itself;
+    it is logged and counted, and the rest of the chunk goes on. Running out of
+    quota stops the import.
+    """
+
+    BATCH_SIZE = GetChannelDataByHandleOrId.MAX_IDS_PER_REQUEST
+
+    def __init__(self, yt: YouTubeClient, known_channels: KnownIdsIndex):
+        self.yt = yt
+        self.known_channels = known_channels
+        self.totals = {}
+        self._seen = set()
+
+    def import_chunk(self, entries: list[str]) -> dict:
+        """Imports one chunk of file entries; returns its counters, also added to ``totals``."""
+        counts = dict(read=len(entries), duplicate=0, known=0, not_found=0, upserted=0, failed=0)
+
+        unique = self._unseen(entries)
+        counts["duplicate"] += len(entries) - len(unique)
+
+        handles = [entry for entry in unique if entry.startswith("@")]
+        resolved_ids = []
+        for handle, channel_id, error in self.yt.resolve_channel_handles(handles, max_workers=handle_workers):
+            if isinstance(error, QuotaExhaustedError):
+                raise error
+            if error is not None:
+                self._failed(counts, handle, error)
+            elif channel_id is None:
+                counts["not_found"] += 1
+            else:
+                resolved_ids.append(channel_id)
+
+        # A handle can name a channel listed elsewhere in the file by ID
+        unseen_resolved = self._unseen(resolved_ids)
+        counts["duplicate"] += len(resolved_ids) - len(unseen_resolved)
+        channel_ids = [entry for entry in unique if not entry.startswith("@")] + unseen_resolved
+
+        new_ids = self.known_channels.filter_unknown(channel_ids)
+        counts["known"] += len(channel_ids) - len(new_ids)
+
+        channels, failed_count = self._fetch_details(new_ids)
+        counts["failed"] += failed_count
+        # Requested but not returned: deleted, terminated or mistyped IDs
+        counts["not_found"] += len(new_ids) - len(channels) - failed_count
+
+        outcomes = upsert_channels_bulk(channels)
+        stored = []
+        for channel_id, outcome, error in outcomes:
+            if outcome == BULK_FAILED:
+                self._failed(counts, channel_id, error)
+            else:
+                stored.append(channel_id)
+        counts["upserted"] += len(stored)
+        self.known_channels.add(stored)
+
+        for name, value in counts.items():
+            self.totals[name] = self.totals.get(name, 0) + value
+        return counts
+
+    def _unseen(self, entries: list[str]) -> list[str]:
+        unique = []
+        for entry in entries:
+            if entry not in self._seen:
+                self._seen.add(entry)
+                unique.append(entry)
+        return unique
+
+    def _fetch_details(self, channel_ids: list[str]) -> tuple[list[dict], int]:
+        """Fetches and maps the channels' details; returns them and how many IDs failed to fetch or map."""
+        channels = {}
+        failed_count = 0
+        with ThreadPoolExecutor(max_workers=details_workers, thread_name_prefix="channel-details") as executor:
+            futures = {
+                executor.submit(self.yt.fetch_channel_details, batch): batch
+                for batch in chunked(channel_ids, self.BATCH_SIZE)
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    items = future.result()
+                except QuotaExhaustedError:
+                    raise
+                except Exception as e:
+                    failed_count += len(batch)
+                    logger.error(f"Failed to fetch details for channels {', '.join(batch)}: {e}")
+                    continue
+                for item in items:
+                    try:
+                        mapped = map_channel_metadata(item)
+                    except Exception as e:
+                        failed_count += 1
+                        logger.error(f"Failed to map channel {item.get('id')}: {e!r}")
+                        continue
+                    channels[mapped["id"]] = mapped
+        return list(channels.values()), failed_count
+
+    @staticmethod
+    def _failed(counts: dict, entry: str, error):
+        counts["failed"] += 1
+        logger.error(f"Failed to import channel {entry}: {error}")
+
+
+def iter_channel_entries(file_name="channels.txt") -> Iterator[str]:
+    """Streams the channel IDs and handles listed in the file, one per line."""
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     file_name = os.path.join(BASE_DIR, file_name)
 
     with open(file_name, "r") as file:
-        lines = file.readlines()
-
-    channel_ids = [line.strip() for line in lines if line.strip() != "channel_id"]
-    return channel_ids
+        for line in file:
+            entry = line.strip()
+            if entry and entry != "channel_id":
+                yield entry
 
 
 if __name__ == "__main__":
@@ -1,109 +1,166 @@
 # scripts/update_video_stats_hourly.py
 
+import argparse
 import os
 from datetime import datetime, timezone
+
+import yaml
 from dotenv import load_dotenv
 
 from src.api.requests.get_video_stats_snapshot import GetVideoStatsSnapshot
-from src.db.bigquery_client import insert_video_stats
-from src.api.youtube_client import YouTubeClient
+from src.db.bigquery_client import create_stats_sink
 from src.api.quota_manager import YouTubeQuotaManager
-from src.db.database_client import update_video_stats, increment_video_sample, \
-    fetch_videos_for_bin_paginated, get_current_sample
+from src.api.errors import QuotaExhaustedError
+from src.db.database_client import update_video_stats_bulk, iter_due_videos, end_video_sampling
+from src.mappers.map_video_stats import VideoStatsBatch
+from src.scheduling.checkpoint import JobCheckpoint
+from src.scheduling.sampling_scheduler import SamplingScheduler
 from src.utils.logger import setup_logger
+from src.utils.metrics import configure_metrics, write_run_metrics
+
+
+def load_config(path="config.yaml"):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    config_path = os.path.join(base_dir, "..", path)
+    config_path = os.path.abspath(config_path)
+
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"Config file not found at: {config_path}")
+
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f)
+
 
 # Load environment and config
 load_dotenv()
-logger = setup_logger(__name__)
+config = load_config()
+logger = setup_logger(__name__, config["logging"])
 
 # Environment config
 api_keys = os.getenv("YOUTUBE_API_KEYS", "").split(",")
 
-if not api_keys or not api_keys[0]:
-    raise RuntimeError("Missing YOUTUBE_API_KEYS in .env")
-
-quota_manager = YouTubeQuotaManager(api_keys)
-yt_client = YouTubeClient(quota_manager)
+# Name of this script's runs in the job_runs table
+JOB_NAME = "update_video_stats_hourly"
 
 
-def main():
+def main(resume: bool = False):
     logger.info("")
     logger.info("=" * 60)
     logger.info(f"Starting update_video_stats_hourly run at {datetime.now(timezone.utc).isoformat()} UTC")
     logger.info("=" * 60)
     logger.info("")
 
-    current_hour = datetime.now(timezone.utc).hour
-    logger.info(f"Fetching videos in bin {current_hour}...")
+    if not api_keys or not api_keys[0]:
+        raise RuntimeError("Missing YOUTUBE_API_KEYS in .env")
 
-    batch_size = 50
-    offset = 0
-    video_ids = []
-
-    while True:
-        batch = fetch_videos_for_bin_paginated(current_hour, batch_size=batch_size, offset=offset)
-        if not batch:
-            break
-        video_ids.extend([row[0] for row in batch])
-        offset += batch_size
+    configure_metrics(JOB_NAME, config.get("metrics"))
+    quota_manager = YouTubeQuotaManager.from_config(api_keys, config["youtube"])
+    try:
+        sample_due_videos(quota_manager, resume=resume)
+    finally:
+        # Hand reserved but unspent units back to the quota ledger
+        quota_manager.close()
+        for path in write_run_metrics(config.get("metrics")):
+            logger.info(f"Wrote run metrics to {path}")
 
-    if not video_ids:
-        logger.info("No videos to process.")
-        return
 
+def sample_due_videos(quota_manager: YouTubeQuotaManager, resume: bool = False):
+    scheduler = SamplingScheduler(config.get("stats_sampling"))
     fetcher = GetVideoStatsSnapshot()
 
+    # A resumed run keeps the original run's clock and budget and continues after
+    # the last chunk it handled, so no video is fetched twice
+    now = datetime.now(timezone.utc)
+    checkpoint = JobCheckpoint.start(JOB_NAME, resume=resume, state={
+        "now": now.isoformat(),
+        "budget": scheduler.hourly_video_budget(quota_manager.remaining_units(), now),
+        "handled": 0,
+        "cursor": None,
+    })
+    now = datetime.fromisoformat(checkpoint.state["now"])
+    budget = max(checkpoint.state["budget"] - checkpoint.state["handled"], 0)
+    cursor = checkpoint.state["cursor"]
+    start_after = (datetime.fromisoformat(cursor[0]), cursor[1]) if cursor else None
+    logger.info(f"Sampling up to {budget} due videos this run")
+
+    video_count = 0
+    updated_count = 0
+
+    # Stream due videos from the DB, most overdue first, and process them chunk by chunk
     try:
-        video_details_list = quota_manager.execute(fetcher, video_ids=video_ids)
-    except Exception as e:
-        logger.error(f"Failed to fetch video details: {e}")
+        with create_stats_sink(config.get("bigquery")) as stats_sink:
+            for due_videos in iter_due_videos(now.replace(tzinfo=None), limit=budget, start_after=start_after):
+                schedule_rows = {row[0]: row for row in due_videos}
+                try:
+                    stats_batch = quota_manager.execute(fetcher, video_ids=list(schedule_rows))
+                except QuotaExhaustedError as e:
+                    logger.error(f"Stopping, quota exhausted: {e}")
+                    break
+                except Exception as e:
+                    logger.error(f"Failed to fetch stats for {len(due_videos)} videos: {e}")
+                else:
+                    updated_count += store_stats(stats_batch, schedule_rows, scheduler, now, stats_sink)
+
+                    # Deleted or private videos are not returned, stop spending quota on them
+                    returned_ids = set(stats_batch.video_ids)
+                    gone_ids = [video_id for video_id in schedule_rows if video_id not in returned_ids]
+                    if gone_ids:
+                        logger.info(f"Ending sampling for {len(gone_ids)} videos no longer returned by the API")
+                        end_video_sampling(gone_ids)
+
+                # Failed chunks stay due and are picked up by the next regular run, not by a resume
+                video_count += len(due_videos)
+                last_next_sample_at, last_video_id = due_videos[-1][4], due_videos[-1][0]
+                checkpoint.save(
+                    handled=checkpoint.state["handled"] + len(due_videos),
+                    cursor=[last_next_sample_at.isoformat(), last_video_id]
+                )
+    except Exception:
+        checkpoint.fail()
+        raise
+    checkpoint.complete()
+
+    if not video_count:
+        logger.info("No videos to process.")
         return
 
-    logger.info(f"Fetched stats for {len(video_details_list)} videos")
-
-    now = datetime.now(timezone.utc)
-
-    for video in video_details_list:
-        try:
-            video_id = video["id"]
-            stats = video.get("statistics", {})
-
-            view_count = int(stats.get("viewCount", 0))
-            like_count = int(stats.get("likeCount", 0))
-            favourite_count = int(stats.get("favoriteCount", 0))
-            comment_count = int(stats.get("commentCount", 0))
-
-            update_video_stats(
-                video_id=video_id,
-                view_count=view_count,
-                likes_count=like_count,
-                favourite_count=favourite_count,
-                comment_count=comment_count
-            )
-
-            day_index = get_current_sample(video_id)[0]
-
-            logger.info(f"Video {video_id} has {day_index} samples")
-
-            increment_video_sample(video_id)
-
-            # Insert into BigQuery
-            record = {
-                "videoId": video_id,
-                "recordedAt": now.isoformat(),
-                "viewCount": view_count,
-                "likeCount": like_count,
-                "commentCount": comment_count,
-                "dayIndex": day_index,
-                "fetchedFrom": "hourly_script"
-            }
-
-            insert_video_stats(record)
-            logger.info(f"Updated stats and inserted BigQuery row for video: {video_id}")
-
-        except Exception as e:
-            logger.exception(f"Error processing video {video.get('id')}: {e}")
+    logger.info(f"Updated stats for {updated_count} of {video_count} due videos")
+    logger.info(f"Inserted {stats_sink.inserted_count} BigQuery rows ({stats_sink.failed_count} failed)")
+    logger.info(
+        f"Used {quota_manager.total_quota} quota units, "
+        f"{quota_manager.remaining_units()} units left today across {len(api_keys)} keys"
+    )
+
+
+def store_stats(stats_batch: VideoStatsBatch, schedule_rows: dict, scheduler: SamplingScheduler,
+                now: datetime, stats_sink) -> int:
+    next_samples = {}
+    for video_id, view_count in zip(stats_batch.video_ids, stats_batch.view_counts):
+        _, upload_datetime, last_sampled_at, last_view_count, _ = schedule_rows[video_id]
+        next_samples[video_id] = scheduler.next_sample_at(
+            now, upload_datetime, last_sampled_at, last_view_count, view_count
+        )
+
+    previous_samples, failed_chunks = update_video_stats_bulk(stats_batch, next_samples=next_samples)
+    failed_count = 0
+    for video_ids, error in failed_chunks:
+        logger.error(f"Failed to update stats for {len(video_ids)} videos: {error}")
+        failed_count += len(video_ids)
+
+    unscheduled = len(stats_batch) - len(previous_samples) - failed_count
+    if unscheduled:
+        logger.warning(f"{unscheduled} videos have no schedule row, skipping their BigQuery rows")
+
+    # Insert into BigQuery, straight from the columns
+    try:
+        stats_sink.add_stats_batch(stats_batch, now, previous_samples, "hourly_script")
+    except Exception as e:
+        logger.exception(f"Failed to queue BigQuery rows for {len(previous_samples)} videos: {e}")
 
+    return len(previous_samples)
 
 if __name__ == "__main__":
-    main()
+    arg_parser = argparse.ArgumentParser(description="Sample stats of the videos that are due.")
+    arg_parser.add_argument("--resume", action="store_true",
+                            help="Continue the last interrupted run instead of starting a new one.")
+    main(resume=arg_parser.parse_args().resume)
@@ -0,0 +1,102 @@
+# api/async_backend.py
+
+from urllib.parse import urlencode
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+# REST root of the YouTube Data API; point ``youtube.async_http.base_url`` elsewhere
+# (e.g. a local mock server) to run the async backend against something else
+DEFAULT_BASE_URL = "https://www.googleapis.com/youtube/v3"
+
+DEFAULT_MAX_CONNECTIONS = 200
+DEFAULT_TIMEOUT_SECONDS = 30.0
+
+
+def create_async_http_client(async_http_config: dict = None):
+    """
+    Builds the pooled async HTTP client described by ``youtube.async_http`` in
+    config.yaml: keep-alive connections shared by every key and every coroutine,
+    over HTTP/2 when the ``h2`` package is installed.
+
+    httpx is imported here so the synchronous scripts never pay for it.
+    """
+    import httpx
+
+    async_http_config = async_http_config or {}
+    max_connections = async_http_config.get("max_connections", DEFAULT_MAX_CONNECTIONS)
+    http2 = async_http_config.get("http2", True)
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        timeout=async_http_config.get("timeout_seconds", DEFAULT_TIMEOUT_SECONDS),
+    )
+
+
+class AsyncYouTubeService:
+    """
+    Awaitable stand-in for a googleapiclient ``youtube`` service, calling the same
+    REST endpoints over a shared async HTTP client.
+
+    Mirrors the fluent API the request classes use, with an awaitable execute:
+    ``await service.videos().list(part=..., id=...).execute()``. Parameters that
+    are None are left out, as googleapiclient does. Error responses are raised as
+    googleapiclient HttpErrors, so src.api.errors classifies them the same way.
+
+    Args:
+        api_key (str): YouTube Data API key sent with every request.
+        http_client (httpx.AsyncClient): Shared client, see create_async_http_client.
+        base_url (str): REST root, DEFAULT_BASE_URL unless overridden.
+    """
+
+    def __init__(self, api_key: str, http_client, base_url: str = None):
+        self.api_key = api_key
+        self.http_client = http_client
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+
+    def videos(self):
+        return _AsyncCollection(self, "videos")
+
+    def channels(self):
+        return _AsyncCollection(self, "channels")
+
+    def playlistItems(self):
+        return _AsyncCollection(self, "playlistItems")
+
+    async def get(self, collection: str, params: dict) -> dict:
+        query = {name: value for name, value in params.items() if value is not None}
+        query["key"] = self.api_key
+        response = await self.http_client.get(f"{self.base_url}/{collection}", params=query)
+
+        if response.status_code >= 400:
+            resp = httplib2.Response({"status": str(response.status_code)})
+            resp.reason = response.reason_phrase
+            # Logged URIs must not carry the key
+            uri = f"{self.base_url}/{collection}?{urlencode({k: v for k, v in query.items() if k != 'key'})}"
+            raise HttpError(resp, response.content, uri=uri)
+        return response.json()
+
+
+class _AsyncCollection:
+    def __init__(self, service: AsyncYouTubeService, name: str):
+        self.service = service
+        self.name = name
+
+    def list(self, **params):
+        return _AsyncRequest(self.service, self.name, params)
+
+
+class _AsyncRequest:
+    def __init__(self, service: AsyncYouTubeService, collection: str, params: dict):
+        self.service = service
+        self.collection = collection
+        self.params = params
+
+    async def execute(self) -> dict:
+        return await self.service.get(self.collection, self.params)
@@ -0,0 +1,93 @@
+# api/errors.py
+
+import json
+
+from googleapiclient.errors import HttpError
+
+# Error reasons that mean the key is out of quota for the day
+QUOTA_EXHAUSTED_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+
+# Error reasons that mean the key is being throttled, another key can take the call
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+
+class YouTubeAPIError(RuntimeError):
+    """Base class of the errors raised by YouTubeQuotaManager.execute."""
+
+
+class QuotaExhaustedError(YouTubeAPIError):
+    """No API key has quota left for the request."""
+
+
+class ResourceNotFoundError(YouTubeAPIError):
+    """The requested channel, playlist or video does not exist (HTTP 404)."""
+
+
+class InvalidRequestError(YouTubeAPIError):
+    """The API rejected the request itself (HTTP 400, or 403 unrelated to quota); retrying will not help."""
+
+
+class TransientAPIError(YouTubeAPIError):
+    """Server errors or timeouts that persisted through every retry."""
+
+
+class RateLimitedError(TransientAPIError):
+    """Every usable key was still rate limited after backing off; daily quota may well be left."""
+
+
+def http_error_reasons(error: HttpError) -> set[str]:
+    """Extracts the ``reason`` codes from an HttpError's error details or body."""
+    details = getattr(error, "error_details", None)
+    if isinstance(details, list):
+        reasons = {d.get("reason") for d in details if isinstance(d, dict) and d.get("reason")}
+        if reasons:
+            return reasons
+    try:
+        body = json.loads(error.content.decode("utf-8"))
+        return {e.get("reason") for e in body.get("error", {}).get("errors", []) if e.get("reason")}
+    except Exception:
+        return set()
+
+
+# Error classes, see classify_error
+QUOTA_EXHAUSTED = "quota_exhausted"
+RATE_LIMITED = "rate_limited"
+TRANSIENT = "transient"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+UNKNOWN = "unknown"
+
+
+def classify_error(error: Exception) -> str:
+    """Maps an exception raised while executing a request to one of the error classes above."""
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        reasons = http_error_reasons(error)
+        if reasons & QUOTA_EXHAUSTED_REASONS:
+            return QUOTA_EXHAUSTED
+        if status == 429 or reasons & RATE_LIMIT_REASONS:
+            return RATE_LIMITED
+        if status == 404:
+            return NOT_FOUND
+        if status >= 500:
+            return TRANSIENT
+        return INVALID
+
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return TRANSIENT
+    try:
+        import httplib2
+
+        if isinstance(error, httplib2.HttpLib2Error):
+            return TRANSIENT
+    except ImportError:
+        pass
+    try:
+        import httpx
+
+        # Connection failures and timeouts of the async backend
+        if isinstance(error, httpx.TransportError):
+            return TRANSIENT
+    except ImportError:
+        pass
+    return UNKNOWN
@@ -0,0 +1,113 @@
+# api/handle_cache.py
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+DEFAULT_CAPACITY = 100_000
+DEFAULT_NEGATIVE_TTL = timedelta(days=7)
+
+# Marks a handle looked up in the table and not found there, so it is not queried twice
+_ABSENT = object()
+
+
+def normalize_handle(handle: str) -> str:
+    """Handles are case-insensitive; cache them lowercased, with the leading "@"."""
+    handle = handle.strip().lower()
+    return handle if handle.startswith("@") else f"@{handle}"
+
+
+class HandleCache:
+    """
+    Channel handle to channel ID mapping, stored in the ``channel_handles`` table
+    and kept in an in-memory LRU of ``capacity`` handles.
+
+    Handles that resolved to no channel are cached too, as None, for
+    ``negative_ttl``; after that they are looked up again, in case the handle
+    has been claimed since. Request classes that take handles consult the cache
+    before calling the API and record what they resolve in it.
+
+    Args:
+        capacity (int): Handles kept in memory; the table keeps all of them.
+        negative_ttl (timedelta): How long a handle without a channel is trusted.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, negative_ttl: timedelta = DEFAULT_NEGATIVE_TTL):
+        self.capacity = capacity
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # handle -> (channel ID or None, resolved_at) or _ABSENT
+        self._lock = threading.Lock()
+
+    def preload(self, handles: list[str]):
+        """Loads the handles' table rows in one query, ahead of looking them up one by one."""
+        from src.db.database_client import fetch_channel_handles
+
+        handles = dict.fromkeys(normalize_handle(handle) for handle in handles)
+        with self._lock:
+            missing = [handle for handle in handles if handle not in self._entries]
+        if not missing:
+            return
+        rows = fetch_channel_handles(missing)
+        with self._lock:
+            for handle in missing:
+                self._remember(handle, rows.get(handle, _ABSENT))
+
+    def get(self, handle: str):
+        """
+        Returns ``(True, channel_id)`` for a cached handle, where ``channel_id`` is
+        None if the handle has no channel, or ``(False, None)`` if it must be resolved.
+        """
+        from src.db.database_client import fetch_channel_handles
+
+        handle = normalize_handle(handle)
+        with self._lock:
+            entry = self._entries.get(handle)
+        if entry is None:
+            entry = fetch_channel_handles([handle]).get(handle, _ABSENT)
+            with self._lock:
+                self._remember(handle, entry)
+
+        with self._lock:
+            if entry is not _ABSENT:
+                channel_id, resolved_at = entry
+                if channel_id is not None or datetime.utcnow() - resolved_at < self.negative_ttl:
+                    self._entries.move_to_end(handle)
+                    self.hits += 1
+                    return True, channel_id
+            return False, None
+
+    def set(self, handle: str, channel_id: str = None):
+        """Records a resolved handle; ``channel_id`` None means no channel has it."""
+        from src.db.database_client import upsert_channel_handles
+
+        handle = normalize_handle(handle)
+        resolved_at = datetime.utcnow()
+        upsert_channel_handles([(handle, channel_id, resolved_at)])
+        with self._lock:
+            self.misses += 1
+            self._remember(handle, (channel_id, resolved_at))
+
+    def _remember(self, handle: str, entry):
+        # Caller holds self._lock
+        self._entries[handle] = entry
+        self._entries.move_to_end(handle)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Handles answered from the cache (hits) and resolved through the API (misses)."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+def create_handle_cache(cache_config: dict = None):
+    """Builds the cache described by ``youtube.handle_cache`` in config.yaml, or None if disabled."""
+    cache_config = cache_config or {}
+    if not cache_config.get("enabled", False):
+        return None
+    return HandleCache(
+        capacity=cache_config.get("capacity", DEFAULT_CAPACITY),
+        negative_ttl=timedelta(days=cache_config.get("negative_ttl_days", DEFAULT_NEGATIVE_TTL.days)),
+    )
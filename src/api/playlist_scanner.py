@@ -0,0 +1,81 @@
+# api/playlist_scanner.py
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from src.api.quota_manager import YouTubeQuotaManager
+from src.api.requests.get_playlist_videos import GetPlaylistVideos
+from src.utils.metrics import metrics
+
+
+class PlaylistScanner:
+    """
+    Scans many uploads playlists concurrently through a YouTubeQuotaManager.
+
+    At most ``max_workers`` playlists are fetched at a time and only a small window
+    of identifiers is pulled from the input ahead of the workers, so the input can
+    itself be a generator. Results are yielded as each playlist completes, not in
+    input order.
+
+    Args:
+        quota_manager (YouTubeQuotaManager): Manager used for every request.
+        max_workers (int): Maximum number of playlists fetched concurrently.
+    """
+
+    DEFAULT_MAX_WORKERS = 8
+
+    def __init__(self, quota_manager: YouTubeQuotaManager, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.qm = quota_manager
+        self.max_workers = max_workers
+
+    def scan(self, identifiers: Iterable[str], since: datetime = None) \
+            -> Iterator[tuple[str, list[str], Exception]]:
+        """
+        Yields ``(identifier, video_ids, error)`` for every playlist or channel ID.
+        ``error`` is None on success; on failure ``video_ids`` is empty and the
+        exception raised by the quota manager is passed through.
+        """
+        return self.scan_incremental((identifier, since, None) for identifier in identifiers)
+
+    def scan_incremental(self, targets: Iterable[tuple[str, datetime, str]]) \
+            -> Iterator[tuple[str, list[str], Exception]]:
+        """
+        Like ``scan`` with a stopping point per playlist: ``targets`` yields
+        ``(identifier, since, stop_at_video_id)`` tuples, see GetPlaylistVideos.
+        """
+        request = GetPlaylistVideos()
+        pending = iter(targets)
+        max_in_flight = self.max_workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="playlist-scan") as executor:
+            in_flight = {}
+
+            def submit_next() -> bool:
+                target = next(pending, None)
+                if target is None:
+                    return False
+                identifier, since, stop_at_video_id = target
+                future = executor.submit(
+                    self._execute, request,
+                    identifier=identifier, since_datetime=since, stop_at_video_id=stop_at_video_id
+                )
+                in_flight[future] = identifier
+                return True
+
+            while len(in_flight) < max_in_flight and submit_next():
+                pass
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    identifier = in_flight.pop(future)
+                    try:
+                        yield identifier, future.result(), None
+                    except Exception as e:
+                        yield identifier, [], e
+                    submit_next()
+
+    def _execute(self, request: GetPlaylistVideos, **kwargs) -> list[str]:
+        with metrics.stage("scan"):
+            return self.qm.execute(request, **kwargs)
@@ -0,0 +1,85 @@
+# api/quota_ledger.py
+
+import threading
+from datetime import date
+
+
+class InMemoryQuotaLedger:
+    """
+    Per-process quota ledger, the default when usage does not need to be shared.
+
+    A ledger tracks units used per key and quota day. Keys are identified by a
+    fingerprint, never by the API key itself. Any object with the same methods
+    can be handed to YouTubeQuotaManager.
+    """
+
+    def __init__(self):
+        self._usage = {}
+        self._lock = threading.Lock()
+
+    def load(self, key_ids: list[str], day: date) -> dict[str, tuple[int, bool]]:
+        """Returns ``(units_used, exhausted)`` for every key that has usage on ``day``."""
+        with self._lock:
+            return {key_id: tuple(self._usage[(key_id, day)]) for key_id in key_ids if (key_id, day) in self._usage}
+
+    def reserve(self, key_id: str, day: date, units: int, limit: int = None):
+        """
+        Atomically adds ``units`` to a key's usage. With a ``limit`` the reservation is
+        refused (None is returned) if the key is exhausted or would go over the limit.
+
+        Returns:
+            int: The key's new usage, or None if refused.
+        """
+        with self._lock:
+            used, exhausted = self._usage.get((key_id, day), (0, False))
+            if limit is not None and (exhausted or used + units > limit):
+                return None
+            self._usage[(key_id, day)] = (used + units, exhausted)
+            return used + units
+
+    def release(self, key_id: str, day: date, units: int):
+        with self._lock:
+            used, exhausted = self._usage.get((key_id, day), (0, False))
+            self._usage[(key_id, day)] = (max(used - units, 0), exhausted)
+
+    def mark_exhausted(self, key_id: str, day: date):
+        with self._lock:
+            used, _ = self._usage.get((key_id, day), (0, False))
+            self._usage[(key_id, day)] = (used, True)
+
+
+class PostgresQuotaLedger:
+    """
+    Quota ledger stored in the ``api_quota_usage`` table, shared by every script
+    process that talks to the same database. Reservations are single atomic
+    statements, so concurrent processes never hand out the same units twice.
+    """
+
+    def load(self, key_ids: list[str], day: date) -> dict[str, tuple[int, bool]]:
+        from src.db.database_client import fetch_quota_usage
+
+        return fetch_quota_usage(key_ids, day)
+
+    def reserve(self, key_id: str, day: date, units: int, limit: int = None):
+        from src.db.database_client import reserve_quota_units
+
+        return reserve_quota_units(key_id, day, units, limit)
+
+    def release(self, key_id: str, day: date, units: int):
+        from src.db.database_client import release_quota_units
+
+        release_quota_units(key_id, day, units)
+
+    def mark_exhausted(self, key_id: str, day: date):
+        from src.db.database_client import mark_quota_key_exhausted
+
+        mark_quota_key_exhausted(key_id, day)
+
+
+def create_quota_ledger(backend: str = "memory"):
+    """Builds the ledger named by ``youtube.quota_ledger`` in config.yaml."""
+    if backend == "memory":
+        return InMemoryQuotaLedger()
+    if backend == "postgres":
+        return PostgresQuotaLedger()
+    raise ValueError(f"Unknown quota ledger backend: {backend}")
@@ -1,44 +1,443 @@
 # api/quota_manager.py
 
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+from datetime import date, datetime
+from time import perf_counter, sleep
+from zoneinfo import ZoneInfo
+
 from googleapiclient.discovery import build
-from time import sleep
+from src.api.async_backend import AsyncYouTubeService, create_async_http_client
+from src.api.errors import classify_error, QuotaExhaustedError, ResourceNotFoundError, InvalidRequestError, \
+    TransientAPIError, RateLimitedError, QUOTA_EXHAUSTED, RATE_LIMITED, TRANSIENT, NOT_FOUND, INVALID
+from src.api.quota_ledger import InMemoryQuotaLedger, create_quota_ledger
+from src.api.response_cache import ConditionalHttp, create_response_cache
 from src.api.youtube_api_request import YouTubeAPIRequest
+from src.utils.metrics import metrics
+
+# Default daily quota of a YouTube Data API project, in units
+DEFAULT_DAILY_UNITS = 10_000
+
+# Quotas reset at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+# Backoff for server errors and timeouts: doubled per attempt, capped, with full jitter
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 32.0
+
+# Units reserved from the ledger at a time, so a shared ledger is not hit on every call
+LEDGER_BLOCK_UNITS = 50
+
+
+def quota_day(now: datetime = None) -> date:
+    """Returns the quota day ``now`` (default: current time) is billed against."""
+    now = now or datetime.now(QUOTA_TIMEZONE)
+    return now.astimezone(QUOTA_TIMEZONE).date()
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number ``attempt``."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Identifies a key in the ledger without storing the key itself."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
 
 class YouTubeQuotaManager:
-    def __init__(self, api_keys: list[str], max_retries: int = 3):
+    """
+    Schedules requests across several API keys against a per-key daily unit ledger.
+
+    Before every request the manager leases the estimated units from the key with
+    the most units left, so concurrent workers spread over all keys and a key is
+    rotated away from before it runs dry. ``reserve_units`` are kept back on every
+    key as a safety margin. The ledger resets at midnight Pacific time.
+
+    A request's whole estimate is leased on a single key, because all of its calls
+    (e.g. every page of a playlist) go out through that key's client; a request
+    estimated above what any one key has left fails with QuotaExhaustedError even
+    when the keys have enough together. A failed attempt is charged its full
+    estimate: the API bills failed calls too, and how many calls of a multi-call
+    request went out before it failed is not known, so the ledger overcounts
+    rather than lets a key run past its quota.
+
+    Failures are classified: quota errors take the key out of rotation for the
+    day and rate-limit errors move on to the next key, so every key gets a
+    chance; once every key with units left is rate limited, they are all tried
+    again after a backoff, up to ``max_retries`` rounds, before RateLimitedError
+    is raised (QuotaExhaustedError only means no key has units left). Server
+    errors and timeouts are retried on the same key with exponential backoff
+    and jitter up to ``max_retries`` times; 404 and other request errors fail
+    at once with a typed exception (see src.api.errors).
+
+    Usage is recorded in a ledger. With a shared one (e.g. PostgresQuotaLedger)
+    every process sees what the others spent: units are reserved from it
+    atomically in blocks of LEDGER_BLOCK_UNITS before any call is made, keys
+    already spent elsewhere are skipped, and ``close()`` hands unspent units back.
+
+    With a ``response_cache`` every GET is revalidated with its cached ETag, and
+    unchanged channels, playlists and videos are served from the cache on a 304.
+
+    ``execute_async`` runs requests over one pooled async HTTP client instead of
+    per-thread googleapiclient services; close it with ``aclose()``.
+
+    Args:
+        api_keys (list[str]): YouTube Data API keys.
+        max_retries (int): Retries of server errors and timeouts per request.
+        daily_units (int): Daily quota of each key.
+        reserve_units (int): Units never leased out on a key.
+        ledger: Quota ledger, defaults to a per-process InMemoryQuotaLedger.
+        response_cache (ResponseCache): ETag response cache shared by all keys, or None.
+        async_http_config (dict): The ``youtube.async_http`` section of config.yaml.
+    """
+
+    def __init__(self, api_keys: list[str], max_retries: int = 3, daily_units: int = DEFAULT_DAILY_UNITS,
+                 reserve_units: int = 0, ledger=None, response_cache=None, async_http_config: dict = None):
         self.api_keys = api_keys
         self.max_retries = max_retries
-        self.clients = [build("youtube", "v3", developerKey=key) for key in api_keys]
-        self.current_index = 0
+        self.daily_units = daily_units
+        self.reserve_units = reserve_units
         self.total_quota = 0
+        self.current_index = 0
+
+        self._lock = threading.Lock()
+        # Service objects wrap a non thread-safe httplib2 connection, so each thread
+        # gets its own, built on first use of each key
+        self._local = threading.local()
+
+        self.ledger = ledger or InMemoryQuotaLedger()
+        self.response_cache = response_cache
+        self.async_http_config = async_http_config or {}
+        self._async_client = None
+        self._async_services = {}
+        self._key_ids = [key_fingerprint(key) for key in api_keys]
+        self._day = None
+        self._roll_day()
+
+    @classmethod
+    def from_config(cls, api_keys: list[str], youtube_config: dict = None):
+        """Builds a manager from the ``youtube`` section of config.yaml."""
+        youtube_config = youtube_config or {}
+        return cls(
+            api_keys,
+            daily_units=youtube_config.get("daily_quota_per_key", DEFAULT_DAILY_UNITS),
+            ledger=create_quota_ledger(youtube_config.get("quota_ledger", "memory")),
+            response_cache=create_response_cache(youtube_config.get("response_cache")),
+            async_http_config=youtube_config.get("async_http")
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _build_client(self, index: int):
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = [None] * len(self.api_keys)
+        if clients[index] is None:
+            http = ConditionalHttp(self.response_cache) if self.response_cache is not None else None
+            clients[index] = build("youtube", "v3", developerKey=self.api_keys[index], http=http)
+        return clients[index]
 
-    def _get_next_client(self):
-        self.current_index = (self.current_index + 1) % len(self.clients)
-        return self.clients[self.current_index]
+    def _build_async_service(self, index: int) -> AsyncYouTubeService:
+        # Only ever called from the event loop thread, so no lock is needed
+        if self._async_client is None:
+            self._async_client = create_async_http_client(self.async_http_config)
+        if index not in self._async_services:
+            self._async_services[index] = AsyncYouTubeService(
+                self.api_keys[index], self._async_client, base_url=self.async_http_config.get("base_url")
+            )
+        return self._async_services[index]
 
-    def _get_client(self):
-        return self.clients[self.current_index]
+    async def aclose(self):
+        """Closes the async HTTP client and its pooled connections, then does what ``close`` does."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_services = {}
+        self.close()
+
+    def _roll_day(self):
+        # Caller holds self._lock (or is __init__)
+        today = quota_day()
+        if today == self._day:
+            return
+        self._day = today
+        self._used = [0] * len(self.api_keys)
+        self._leased = [0] * len(self.api_keys)
+        # Units reserved from the ledger but not leased to a request yet
+        self._block = [0] * len(self.api_keys)
+
+        usage = self.ledger.load(self._key_ids, today)
+        self._ledger_used = [usage.get(key_id, (0, False))[0] for key_id in self._key_ids]
+        self._exhausted = [usage.get(key_id, (0, False))[1] for key_id in self._key_ids]
+
+    def _limit(self) -> int:
+        return self.daily_units - self.reserve_units
+
+    def _available(self, index: int) -> int:
+        # Caller holds self._lock
+        if self._exhausted[index]:
+            return 0
+        return self._block[index] + max(0, self._limit() - self._ledger_used[index])
+
+    def _refill(self, index: int, units: int) -> bool:
+        # Caller holds self._lock
+        needed = units - self._block[index]
+        block = min(max(needed, LEDGER_BLOCK_UNITS), self._limit() - self._ledger_used[index])
+        new_total = self.ledger.reserve(self._key_ids[index], self._day, block, limit=self._limit()) \
+            if block >= needed else None
+        if new_total is None:
+            # Spent by another process; only what is already held locally is left
+            self._ledger_used[index] = self._limit()
+            return False
+        self._ledger_used[index] = new_total
+        self._block[index] += block
+        return True
+
+    def _lease(self, units: int, exclude: set = frozenset(), prefer: int = None):
+        """
+        Reserves ``units`` on ``prefer`` if it can take them, else on the key with the most units left.
+        The units are never split across keys (see the class docstring).
+
+        Returns:
+            tuple: ``(key index, quota day)`` of the lease, or None if no key has enough units.
+        """
+        with self._lock:
+            self._roll_day()
+            candidates = [i for i in range(len(self.api_keys)) if i not in exclude]
+            while candidates:
+                index = prefer if prefer in candidates else max(candidates, key=self._available)
+                prefer = None
+                if self._available(index) < units:
+                    return None
+                if self._block[index] >= units or self._refill(index, units):
+                    self._block[index] -= units
+                    self._leased[index] += units
+                    self.current_index = index
+                    return index, self._day
+                candidates.remove(index)
+            return None
+
+    def _settle(self, index: int, leased_units: int, spent_units: int, day: date):
+        with self._lock:
+            self.total_quota += spent_units
+            if day != self._day:
+                return
+            self._leased[index] -= leased_units
+            self._used[index] += spent_units
+            if spent_units <= leased_units:
+                self._block[index] += leased_units - spent_units
+            else:
+                # More calls than estimated (e.g. extra playlist pages), record them regardless
+                extra = spent_units - leased_units
+                self._ledger_used[index] = self.ledger.reserve(self._key_ids[index], self._day, extra)
+
+    def mark_exhausted(self, index: int):
+        """Takes a key out of rotation until the next quota day, in every process sharing the ledger."""
+        with self._lock:
+            self._exhausted[index] = True
+            self.ledger.mark_exhausted(self._key_ids[index], self._day)
+
+    def close(self):
+        """Returns units reserved from the ledger but never spent, and closes the response cache."""
+        with self._lock:
+            for index, units in enumerate(self._block):
+                if units:
+                    self.ledger.release(self._key_ids[index], self._day, units)
+                    self._ledger_used[index] -= units
+            self._block = [0] * len(self.api_keys)
+        if self.response_cache is not None:
+            self.response_cache.close()
 
     def execute(self, request_obj: YouTubeAPIRequest, *args, **kwargs):
-        retries = 0
-        while retries < self.max_retries:
+        units_per_call = request_obj.units_per_call()
+        estimated_units = request_obj.estimate_calls(*args, **kwargs) * units_per_call
+        request_name = type(request_obj).__name__
+        tried = set()
+        rate_limited = set()
+        transient_attempts = 0
+        rate_limit_rounds = 0
+        index = None
+
+        while True:
+            lease, rate_limit_rounds, delay = self._lease_or_wait(estimated_units, tried, rate_limited, index,
+                                                                  request_name, rate_limit_rounds)
+            if lease is None:
+                sleep(delay)
+                continue
+            index, day = lease
+            started = perf_counter()
             try:
-                client = self._get_client()
+                client = self._build_client(index)
                 result = request_obj.execute(client, *args, **kwargs)
-                self.total_quota += result[1]
-                return result[0]
             except Exception as e:
-                print(f"[QuotaManager] Error (key {self.current_index}): {e}")
-                retries += 1
-                self._get_next_client()
-                sleep(1)
-        raise RuntimeError(
-            "YouTube API request failed after exhausting all available API keys. \n"
-            "This may be due to quota limits being exceeded or repeated request errors.\n "
-            "Please check your API quota usage or verify the request parameters.\n"
-        )
+                # Failed calls are still billed, charge the estimate (see the class docstring)
+                self._settle(index, estimated_units, estimated_units, day)
+                if metrics.enabled:
+                    self._record_request(request_obj, index, started, estimated_units, classify_error(e))
+                transient_attempts, delay = self._handle_failure(e, index, request_name, tried, rate_limited,
+                                                                 transient_attempts)
+                if delay:
+                    sleep(delay)
+                continue
+
+            self._settle(index, estimated_units, result[1] * units_per_call, day)
+            if metrics.enabled:
+                self._record_request(request_obj, index, started, result[1] * units_per_call, "ok")
+            return result[0]
+
+    async def execute_async(self, request_obj: YouTubeAPIRequest, *args, **kwargs):
+        """
+        Like ``execute``, for requests with an ``execute_async`` implementation, over
+        the shared async HTTP client (see src.api.async_backend). Many calls can be
+        awaited concurrently from one event loop; leasing, key rotation and retries
+        work exactly as for ``execute``.
+
+        Raises:
+            NotImplementedError: The request has no ``execute_async``; nothing is leased or sent.
+        """
+        if not request_obj.supports_async():
+            raise NotImplementedError(f"{type(request_obj).__name__} has no async implementation")
+        units_per_call = request_obj.units_per_call()
+        estimated_units = request_obj.estimate_calls(*args, **kwargs) * units_per_call
+        request_name = type(request_obj).__name__
+        tried = set()
+        rate_limited = set()
+        transient_attempts = 0
+        rate_limit_rounds = 0
+        index = None
+
+        while True:
+            # Leases are served from the local block; only a refill every
+            # LEDGER_BLOCK_UNITS units touches the ledger, briefly blocking the loop
+            lease, rate_limit_rounds, delay = self._lease_or_wait(estimated_units, tried, rate_limited, index,
+                                                                  request_name, rate_limit_rounds)
+            if lease is None:
+                await asyncio.sleep(delay)
+                continue
+            index, day = lease
+            started = perf_counter()
+            try:
+                service = self._build_async_service(index)
+                result = await request_obj.execute_async(service, *args, **kwargs)
+            except Exception as e:
+                self._settle(index, estimated_units, estimated_units, day)
+                if metrics.enabled:
+                    self._record_request(request_obj, index, started, estimated_units, classify_error(e))
+                transient_attempts, delay = self._handle_failure(e, index, request_name, tried, rate_limited,
+                                                                 transient_attempts)
+                if delay:
+                    await asyncio.sleep(delay)
+                continue
+
+            self._settle(index, estimated_units, result[1] * units_per_call, day)
+            if metrics.enabled:
+                self._record_request(request_obj, index, started, result[1] * units_per_call, "ok")
+            return result[0]
+
+    def _record_request(self, request_obj: YouTubeAPIRequest, index: int, started: float, units: int,
+                        outcome: str):
+        """Records one attempt of a request: its latency and outcome per API method and key, and the units it cost."""
+        labels = {"method": request_obj.API_METHOD or "unknown", "request": type(request_obj).__name__,
+                  "key": self._key_ids[index]}
+        metrics.inc("youtube_api_requests_total", outcome=outcome, **labels)
+        metrics.observe("youtube_api_request_seconds", perf_counter() - started, **labels)
+        metrics.inc("youtube_quota_units_total", units, stage=metrics.current_stage(), **labels)
+
+    def _lease_or_wait(self, units: int, tried: set, rate_limited: set, prefer: int, request_name: str,
+                       rate_limit_rounds: int) -> tuple[tuple[int, date], int, float]:
+        """
+        Leases ``units`` on a key that has not failed or been rate limited for this request.
+
+        Returns:
+            tuple: ``(lease, rate_limit_rounds, delay)``. When only rate-limited keys
+            are left, ``lease`` is None: they are cleared from ``rate_limited`` and
+            should be tried again after ``delay`` seconds. Raises RateLimitedError
+            after ``max_retries`` such rounds, and QuotaExhaustedError when no key
+            has the units left at all.
+        """
+        lease = self._lease(units, exclude=tried | rate_limited, prefer=prefer)
+        if lease is not None:
+            return lease, rate_limit_rounds, 0
+        if not rate_limited:
+            raise QuotaExhaustedError(
+                f"{request_name}: no API key has {units} quota units left today "
+                f"({len(tried)} of {len(self.api_keys)} keys failed for this request)"
+            )
+        rate_limit_rounds += 1
+        if rate_limit_rounds > self.max_retries:
+            raise RateLimitedError(
+                f"{request_name}: {len(rate_limited)} keys still rate limited after {self.max_retries} backoffs"
+            )
+        delay = _backoff_delay(rate_limit_rounds)
+        logging.warning(f"[QuotaManager] {request_name}: every usable key is rate limited, "
+                        f"retrying them in {delay:.1f}s")
+        rate_limited.clear()
+        return None, rate_limit_rounds, delay
+
+    def _handle_failure(self, error: Exception, index: int, request_name: str, tried: set, rate_limited: set,
+                        transient_attempts: int) -> tuple[int, float]:
+        """
+        Classifies a failed attempt and decides how to go on.
+
+        Returns:
+            tuple: ``(transient_attempts, delay)`` to retry after ``delay`` seconds; keys
+            that must not be retried are added to ``tried``, throttled ones to
+            ``rate_limited``. Raises the typed error (or the original one, if
+            unclassified) when the request should fail.
+        """
+        error_class = classify_error(error)
+
+        if error_class == QUOTA_EXHAUSTED:
+            logging.warning(f"[QuotaManager] Key {index} out of quota, rotating: {error}")
+            self.mark_exhausted(index)
+            tried.add(index)
+            return transient_attempts, 0
+        if error_class == RATE_LIMITED:
+            logging.warning(f"[QuotaManager] Key {index} rate limited, rotating: {error}")
+            rate_limited.add(index)
+            return transient_attempts, 0
+        if error_class == TRANSIENT:
+            transient_attempts += 1
+            if transient_attempts > self.max_retries:
+                raise TransientAPIError(
+                    f"{request_name} failed after {self.max_retries} retries: {error}"
+                ) from error
+            delay = _backoff_delay(transient_attempts)
+            logging.warning(f"[QuotaManager] {request_name} transient error on key {index}, "
+                            f"retrying in {delay:.1f}s: {error}")
+            return transient_attempts, delay
+        if error_class == NOT_FOUND:
+            raise ResourceNotFoundError(f"{request_name}: resource not found (404): {error}") from error
+        if error_class == INVALID:
+            raise InvalidRequestError(f"{request_name}: request rejected: {error}") from error
+        raise error
+
+    def remaining_units(self, index: int = None) -> int:
+        """Units still available today on one key, or across all keys, including other processes' usage."""
+        with self._lock:
+            self._roll_day()
+            usage = self.ledger.load(self._key_ids, self._day)
+            for i, key_id in enumerate(self._key_ids):
+                used, exhausted = usage.get(key_id, (0, False))
+                self._ledger_used[i] = used
+                self._exhausted[i] = self._exhausted[i] or exhausted
+            if index is not None:
+                return self._available(index)
+            return sum(self._available(i) for i in range(len(self.api_keys)))
+
+    def units_used_today(self, index: int = None) -> int:
+        """Units this manager spent today on one key, or across all keys."""
+        with self._lock:
+            self._roll_day()
+            return self._used[index] if index is not None else sum(self._used)
 
     def get_active_key(self):
         return self.api_keys[self.current_index]
-
-    # TODO: Keeping track of quota usage
@@ -1,7 +1,13 @@
 # api/requests/get_channel_details.py
 
+import asyncio
+import math
+
 from googleapiclient.discovery import Resource
+from src.api.fields import fields_mask, parts_for
+from src.api.handle_cache import HandleCache
 from src.api.youtube_api_request import YouTubeAPIRequest
+from src.mappers.map_channel_metadata import CHANNEL_METADATA_FIELDS
 
 class GetChannelDataByHandleOrId(YouTubeAPIRequest):
     """
@@ -11,28 +17,43 @@ class GetChannelDataByHandleOrId(YouTubeAPIRequest):
     Args:
         service (Resource): Authorized YouTube API service.
         channel_ids (List[str]): List of channel IDs or handles.
-        part (str): Comma-separated parts to include in the response.
+        part (str): Comma-separated parts to include in the response. The default
+            parts are trimmed to the fields map_channel_metadata reads; any other
+            value returns those parts in full.
+
+    Handles cost a call each. With a HandleCache, cached handles are batched
+    with the channel IDs instead, and new resolutions are recorded in it.
 
     Returns:
         dict: Response from the YouTube API.
     """
 
-    DEFAULT_PARTS = "id,snippet,contentDetails,statistics,topicDetails,status"
+    DEFAULT_PARTS = parts_for(CHANNEL_METADATA_FIELDS)
+    FIELDS = fields_mask(CHANNEL_METADATA_FIELDS)
+    API_METHOD = "channels.list"
+    MAX_IDS_PER_REQUEST = 50
 
+    def __init__(self, handle_cache: HandleCache = None):
+        self.handle_cache = handle_cache
+
+    def estimate_calls(self, channel_ids: list[str], **kwargs) -> int:
+        handle_count = sum(1 for c in channel_ids if c.startswith("@"))
+        return math.ceil((len(channel_ids) - handle_count) / self.MAX_IDS_PER_REQUEST) + handle_count
 
     def execute(self, service: Resource, channel_ids: list[str], part: str = DEFAULT_PARTS) -> tuple[list[dict], int]:
         request_count = 0
-        handles = [c for c in channel_ids if c.startswith("@")]
-        ids = [c for c in channel_ids if not c.startswith("@")]
+        ids, handles = self._split(channel_ids)
 
+        fields = self.FIELDS if part == self.DEFAULT_PARTS else None
         items = []
 
         # Handle channel IDs (can be batched)
         if ids:
-            for i in range(0, len(ids), 50):  # YouTube API limit is 50 per request
+            for i in range(0, len(ids), self.MAX_IDS_PER_REQUEST):  # YouTube API limit is 50 per request
                 response = service.channels().list(
                     part=part,
-                    id=",".join(ids[i:i + 50])
+                    id=",".join(ids[i:i + self.MAX_IDS_PER_REQUEST]),
+                    fields=fields
                 ).execute()
                 items.extend(response.get("items", []))
                 request_count += 1
@@ -41,9 +62,57 @@ class GetChannelDataByHandleOrId(YouTubeAPIRequest):
         for handle in handles:
             response = service.channels().list(
                 part=part,
-                forHandle=handle
+                forHandle=handle,
+                fields=fields
             ).execute()
-            items.extend(response.get("items", []))
+            items.extend(self._handle_items(handle, response))
             request_count += 1
 
         return items, request_count
+
+    async def execute_async(self, service, channel_ids: list[str], part: str = DEFAULT_PARTS) \
+            -> tuple[list[dict], int]:
+        """Like ``execute``, with the ID chunks and the handle lookups all in flight at once."""
+        ids, handles = self._split(channel_ids)
+        fields = self.FIELDS if part == self.DEFAULT_PARTS else None
+
+        calls = [
+            service.channels().list(part=part, id=",".join(ids[i:i + self.MAX_IDS_PER_REQUEST]),
+                                    fields=fields).execute()
+            for i in range(0, len(ids), self.MAX_IDS_PER_REQUEST)
+        ]
+        id_count = len(calls)
+        calls += [service.channels().list(part=part, forHandle=handle, fields=fields).execute()
+                  for handle in handles]
+        responses = await asyncio.gather(*calls)
+
+        items = [item for response in responses[:id_count] for item in response.get("items", [])]
+        for handle, response in zip(handles, responses[id_count:]):
+            items.extend(self._handle_items(handle, response))
+        return items, len(responses)
+
+    def _split(self, channel_ids: list[str]) -> tuple[list[str], list[str]]:
+        """
+        Returns ``(ids, handles)`` to request: the channel IDs, plus those of cached
+        handles, and the handles that still need a call each.
+        """
+        handles = [c for c in channel_ids if c.startswith("@")]
+        ids = [c for c in channel_ids if not c.startswith("@")]
+
+        if self.handle_cache is not None and handles:
+            self.handle_cache.preload(handles)
+            unresolved = []
+            for handle in handles:
+                cached, channel_id = self.handle_cache.get(handle)
+                if not cached:
+                    unresolved.append(handle)
+                elif channel_id is not None and channel_id not in ids:
+                    ids.append(channel_id)
+            handles = unresolved
+        return ids, handles
+
+    def _handle_items(self, handle: str, response: dict) -> list[dict]:
+        handle_items = response.get("items", [])
+        if self.handle_cache is not None:
+            self.handle_cache.set(handle, handle_items[0]["id"] if handle_items else None)
+        return handle_items
@@ -0,0 +1,64 @@
+# api/requests/get_channel_id_for_handle.py
+
+from googleapiclient.discovery import Resource
+from src.api.fields import fields_mask
+from src.api.handle_cache import HandleCache
+from src.api.youtube_api_request import YouTubeAPIRequest
+
+
+class GetChannelIdForHandle(YouTubeAPIRequest):
+    """
+    Resolves a channel handle (e.g. "@veritasium") to its channel ID. The API only
+    takes one handle per call, so resolve many handles concurrently instead.
+
+    With a HandleCache, cached handles are answered without a call and new
+    resolutions are recorded in it.
+
+    Args:
+        service (Resource): Authorized YouTube API service.
+        handle (str): Channel handle, with or without the leading "@".
+
+    Returns:
+        str: The channel ID, or None if no channel has the handle.
+    """
+
+    API_METHOD = "channels.list"
+    FIELDS = fields_mask(("id",))
+
+    def __init__(self, handle_cache: HandleCache = None):
+        self.handle_cache = handle_cache
+
+    def execute(self, service: Resource, handle: str) -> tuple[str, int]:
+        if self.handle_cache is not None:
+            cached, channel_id = self.handle_cache.get(handle)
+            if cached:
+                return channel_id, 0
+
+        response = service.channels().list(
+            part="id",
+            forHandle=handle,
+            fields=self.FIELDS
+        ).execute()
+
+        return self._resolved(handle, response), 1
+
+    async def execute_async(self, service, handle: str) -> tuple[str, int]:
+        if self.handle_cache is not None:
+            cached, channel_id = self.handle_cache.get(handle)
+            if cached:
+                return channel_id, 0
+
+        response = await service.channels().list(
+            part="id",
+            forHandle=handle,
+            fields=self.FIELDS
+        ).execute()
+
+        return self._resolved(handle, response), 1
+
+    def _resolved(self, handle: str, response: dict) -> str:
+        items = response.get("items", [])
+        channel_id = items[0]["id"] if items else None
+        if self.handle_cache is not None:
+            self.handle_cache.set(handle, channel_id)
+        return channel_id
@@ -0,0 +1,70 @@
+# api/requests/get_channel_uploads_playlists.py
+
+import asyncio
+import math
+
+from googleapiclient.discovery import Resource
+from src.api.fields import fields_mask
+from src.api.youtube_api_request import YouTubeAPIRequest
+
+
+class GetChannelUploadsPlaylists(YouTubeAPIRequest):
+    """
+    Resolves the uploads playlist ID of one or more channels, 50 channels per call.
+
+    Args:
+        service (Resource): Authorized YouTube API service.
+        channel_ids (list[str]): YouTube channel IDs (e.g. 'UC...').
+
+    Returns:
+        dict: Uploads playlist ID keyed by channel ID. Channels the API does not
+        return (deleted or terminated) are absent.
+    """
+
+    API_METHOD = "channels.list"
+    MAX_IDS_PER_REQUEST = 50
+    FIELDS = fields_mask(("id", "contentDetails/relatedPlaylists/uploads"))
+
+    def estimate_calls(self, channel_ids: list[str], **kwargs) -> int:
+        return math.ceil(len(channel_ids) / self.MAX_IDS_PER_REQUEST)
+
+    def execute(self, service: Resource, channel_ids: list[str]) -> tuple[dict[str, str], int]:
+        request_count = 0
+        playlists = {}
+
+        for i in range(0, len(channel_ids), self.MAX_IDS_PER_REQUEST):
+            chunk = channel_ids[i:i + self.MAX_IDS_PER_REQUEST]
+            response = service.channels().list(
+                part="contentDetails",
+                id=",".join(chunk),
+                maxResults=self.MAX_IDS_PER_REQUEST,
+                fields=self.FIELDS
+            ).execute()
+
+            request_count += 1
+            self._collect(response, playlists)
+
+        return playlists, request_count
+
+    async def execute_async(self, service, channel_ids: list[str]) -> tuple[dict[str, str], int]:
+        """Like ``execute``, with every 50-channel chunk in flight at once."""
+        responses = await asyncio.gather(*(
+            service.channels().list(
+                part="contentDetails",
+                id=",".join(channel_ids[i:i + self.MAX_IDS_PER_REQUEST]),
+                maxResults=self.MAX_IDS_PER_REQUEST,
+                fields=self.FIELDS
+            ).execute()
+            for i in range(0, len(channel_ids), self.MAX_IDS_PER_REQUEST)
+        ))
+        playlists = {}
+        for response in responses:
+            self._collect(response, playlists)
+        return playlists, len(responses)
+
+    @staticmethod
+    def _collect(response: dict, playlists: dict[str, str]):
+        for item in response.get("items", []):
+            uploads = item.get("contentDetails", {}).get("relatedPlaylists", {}).get("uploads")
+            if uploads:
+                playlists[item["id"]] = uploads
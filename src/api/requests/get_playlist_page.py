@@ -0,0 +1,54 @@
+# api/requests/get_playlist_page.py
+
+from googleapiclient.discovery import Resource
+from src.api.fields import fields_mask
+from src.api.youtube_api_request import YouTubeAPIRequest
+
+
+class GetPlaylistPage(YouTubeAPIRequest):
+    """
+    Retrieves one page of a playlist, newest first for uploads playlists. Unlike
+    GetPlaylistVideos it does not page on by itself, so callers can store the
+    page token and continue a long playlist later, e.g. on another quota day.
+
+    Args:
+        service (Resource): Authorized YouTube API service.
+        playlist_id (str): Playlist ID (e.g. a channel's uploads playlist 'UU...').
+        page_token (str): Token of the page to fetch; None for the first page.
+
+    Returns:
+        tuple: ``(video_ids, next_page_token)``; the token is None on the last page.
+    """
+
+    API_METHOD = "playlistItems.list"
+    MAX_RESULTS_PER_PAGE = 50
+    FIELDS = fields_mask(("contentDetails/videoId",), top_level=("nextPageToken",))
+
+    def execute(self, service: Resource, playlist_id: str, page_token: str = None) \
+            -> tuple[tuple[list[str], str], int]:
+        response = service.playlistItems().list(
+            part="contentDetails",
+            playlistId=playlist_id,
+            maxResults=self.MAX_RESULTS_PER_PAGE,
+            pageToken=page_token,
+            fields=self.FIELDS
+        ).execute()
+
+        return self._page(response), 1
+
+    async def execute_async(self, service, playlist_id: str, page_token: str = None) \
+            -> tuple[tuple[list[str], str], int]:
+        response = await service.playlistItems().list(
+            part="contentDetails",
+            playlistId=playlist_id,
+            maxResults=self.MAX_RESULTS_PER_PAGE,
+            pageToken=page_token,
+            fields=self.FIELDS
+        ).execute()
+
+        return self._page(response), 1
+
+    @staticmethod
+    def _page(response: dict) -> tuple[list[str], str]:
+        video_ids = [item["contentDetails"]["videoId"] for item in response.get("items", [])]
+        return video_ids, response.get("nextPageToken")
@@ -2,6 +2,8 @@
 from datetime import datetime, timezone
 
 from googleapiclient.discovery import Resource
+from src.api.errors import ResourceNotFoundError
+from src.api.fields import fields_mask
 from src.api.youtube_api_request import YouTubeAPIRequest
 
 
@@ -10,19 +12,33 @@ class GetPlaylistVideos(YouTubeAPIRequest):
     Retrieves the most recent videos from a YouTube playlist,
     using either a playlist ID or a channel ID (which maps to its uploads playlist).
 
+    Paging stops at the first video published at or before ``since_datetime`` or
+    at ``stop_at_video_id`` (the newest video already known), whichever comes first.
+
     Args:
         service (Resource): Authorized YouTube API service.
         identifier (str): Playlist ID or Channel ID.
-        max_results (int): Number of videos to retrieve (default 50).
+        since_datetime (datetime): Only return videos published after this datetime (UTC).
+        stop_at_video_id (str): Stop when this video is reached.
 
     Returns:
         list: List of video items (dicts).
     """
 
+    API_METHOD = "playlistItems.list"
     MAX_RESULTS_PER_PAGE = 50
 
-    def execute(self, service: Resource, identifier: str, since_datetime: datetime = None) \
-            -> tuple[list[dict], int]:
+    # Only the fields read below are requested
+    PLAYLIST_FIELDS = fields_mask(("contentDetails/videoId", "contentDetails/videoPublishedAt"),
+                                  top_level=("nextPageToken",))
+    CHANNEL_FIELDS = fields_mask(("contentDetails/relatedPlaylists/uploads",))
+
+    def estimate_calls(self, identifier: str, **kwargs) -> int:
+        # Page count is unknown up front; recent-upload scans usually need one page
+        return 2 if identifier.startswith("UC") else 1
+
+    def execute(self, service: Resource, identifier: str, since_datetime: datetime = None,
+                stop_at_video_id: str = None) -> tuple[list[str], int]:
         requests_count = 0
         video_ids = []
         next_page_token = None
@@ -32,39 +48,91 @@ class GetPlaylistVideos(YouTubeAPIRequest):
         if identifier.startswith("UC"):
             channel_response = service.channels().list(
                 part="contentDetails",
-                id=identifier
+                id=identifier,
+                fields=self.CHANNEL_FIELDS
             ).execute()
-            playlist_id = channel_response["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
             requests_count += 1
+            playlist_id = self._uploads_playlist(identifier, channel_response)
 
         while True:
             response = service.playlistItems().list(
                 part="contentDetails",
                 playlistId=playlist_id,
                 maxResults=self.MAX_RESULTS_PER_PAGE,
-                pageToken=next_page_token
+                pageToken=next_page_token,
+                fields=self.PLAYLIST_FIELDS
             ).execute()
 
             requests_count += 1
-            items = response["items"]
+            if self._collect(response, video_ids, since_datetime, stop_at_video_id):
+                return video_ids, requests_count
 
-            for item in items:
-                content = item["contentDetails"]
-                published_at_str = content.get("videoPublishedAt")
+            next_page_token = response.get("nextPageToken")
+            if not next_page_token:
+                break
 
-                if not published_at_str:
-                    continue  # skip malformed entries
+        return video_ids, requests_count
 
-                published_at = datetime.strptime(published_at_str, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    async def execute_async(self, service, identifier: str, since_datetime: datetime = None,
+                            stop_at_video_id: str = None) -> tuple[list[str], int]:
+        """Like ``execute``; pages depend on each other, so concurrency comes from scanning many playlists."""
+        requests_count = 0
+        video_ids = []
+        next_page_token = None
 
-                # Stop if this video is older than since_datetime
-                if since_datetime and published_at <= since_datetime:
-                    return video_ids, requests_count
+        playlist_id = identifier
+        if identifier.startswith("UC"):
+            channel_response = await service.channels().list(
+                part="contentDetails",
+                id=identifier,
+                fields=self.CHANNEL_FIELDS
+            ).execute()
+            requests_count += 1
+            playlist_id = self._uploads_playlist(identifier, channel_response)
 
-                video_ids.append(content["videoId"])
+        while True:
+            response = await service.playlistItems().list(
+                part="contentDetails",
+                playlistId=playlist_id,
+                maxResults=self.MAX_RESULTS_PER_PAGE,
+                pageToken=next_page_token,
+                fields=self.PLAYLIST_FIELDS
+            ).execute()
+
+            requests_count += 1
+            if self._collect(response, video_ids, since_datetime, stop_at_video_id):
+                return video_ids, requests_count
 
             next_page_token = response.get("nextPageToken")
             if not next_page_token:
                 break
 
         return video_ids, requests_count
+
+    @staticmethod
+    def _uploads_playlist(channel_id: str, channel_response: dict) -> str:
+        if not channel_response.get("items"):
+            raise ResourceNotFoundError(f"Channel {channel_id} not found")
+        return channel_response["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
+
+    @staticmethod
+    def _collect(response: dict, video_ids: list[str], since_datetime: datetime, stop_at_video_id: str) -> bool:
+        """Appends a page's new video IDs; returns True once the scan reached its stopping point."""
+        for item in response.get("items", []):
+            content = item["contentDetails"]
+            if stop_at_video_id and content.get("videoId") == stop_at_video_id:
+                return True
+
+            published_at_str = content.get("videoPublishedAt")
+
+            if not published_at_str:
+                continue  # skip malformed entries
+
+            published_at = datetime.strptime(published_at_str, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+
+            # Stop if this video is older than since_datetime
+            if since_datetime and published_at <= since_datetime:
+                return True
+
+            video_ids.append(content["videoId"])
+        return False
@@ -1,7 +1,12 @@
 # api/requests/get_video_details.py
 
+import asyncio
+import math
+
 from googleapiclient.discovery import Resource
+from src.api.fields import fields_mask, parts_for
 from src.api.youtube_api_request import YouTubeAPIRequest
+from src.mappers.map_video_metadata import VIDEO_METADATA_FIELDS
 
 
 class GetVideoDetails(YouTubeAPIRequest):
@@ -11,28 +16,62 @@ class GetVideoDetails(YouTubeAPIRequest):
     Args:
         service (Resource): Authorized YouTube API service.
         video_ids (list[str] or str): One or more YouTube video IDs.
-        part (str): Comma-separated parts to include in the response.
+        part (str): Comma-separated parts to include in the response. The default
+            parts are trimmed to the fields map_video_metadata reads; any other
+            value returns those parts in full.
+        raw (bool): Return the undecoded response bodies instead, so decoding can
+            happen elsewhere (see src/mappers/video_rows.py).
 
     Returns:
-        list: List of video detail items from the YouTube API.
+        list: List of video detail items from the YouTube API, or of response
+        bodies (bytes) with ``raw``.
     """
 
-    DEFAULT_PARTS = "id,snippet,contentDetails,statistics,status,topicDetails"
+    DEFAULT_PARTS = parts_for(VIDEO_METADATA_FIELDS)
+    FIELDS = fields_mask(VIDEO_METADATA_FIELDS)
+    API_METHOD = "videos.list"
     MAX_IDS_PER_REQUEST = 50
 
-    def execute(self, service: Resource, video_ids: list[str], part: str = DEFAULT_PARTS) -> tuple[list[dict], int]:
+    def estimate_calls(self, video_ids: list[str], **kwargs) -> int:
+        return math.ceil(len(video_ids) / self.MAX_IDS_PER_REQUEST)
+
+    def execute(self, service: Resource, video_ids: list[str], part: str = DEFAULT_PARTS,
+                raw: bool = False) -> tuple[list, int]:
         request_count = 0
         all_items = []
 
         for i in range(0, len(video_ids), self.MAX_IDS_PER_REQUEST):
             chunk = video_ids[i:i + self.MAX_IDS_PER_REQUEST]
-            response = service.videos().list(
+            request = service.videos().list(
                 part=part,
-                id=",".join(chunk)
-            ).execute()
+                id=",".join(chunk),
+                fields=self.FIELDS if part == self.DEFAULT_PARTS else None
+            )
+            if raw:
+                # Error statuses still raise HttpError, before postproc runs
+                request.postproc = _response_body
+                all_items.append(request.execute())
+                request_count += 1
+                continue
 
+            response = request.execute()
             request_count += 1
             items = response.get("items", [])
             all_items.extend(items)
 
         return all_items, request_count
+
+    async def execute_async(self, service, video_ids: list[str], part: str = DEFAULT_PARTS) \
+            -> tuple[list[dict], int]:
+        """Like ``execute``, with every 50-ID chunk in flight at once."""
+        fields = self.FIELDS if part == self.DEFAULT_PARTS else None
+        responses = await asyncio.gather(*(
+            service.videos().list(part=part, id=",".join(video_ids[i:i + self.MAX_IDS_PER_REQUEST]),
+                                  fields=fields).execute()
+            for i in range(0, len(video_ids), self.MAX_IDS_PER_REQUEST)
+        ))
+        return [item for response in responses for item in response.get("items", [])], len(responses)
+
+
+def _response_body(response, content: bytes) -> bytes:
+    return content
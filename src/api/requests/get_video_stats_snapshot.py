@@ -1,7 +1,12 @@
 # src/api/requests/get_video_stats_snapshot.py
 
+import asyncio
+import math
+
 from googleapiclient.discovery import Resource
+from src.api.fields import fields_mask, parts_for
 from src.api.youtube_api_request import YouTubeAPIRequest
+from src.mappers.map_video_stats import VIDEO_STATS_FIELDS, VideoStatsBatch
 
 
 class GetVideoStatsSnapshot(YouTubeAPIRequest):
@@ -14,28 +19,52 @@ class GetVideoStatsSnapshot(YouTubeAPIRequest):
         video_ids (list[str] or str): One or more YouTube video IDs.
 
     Returns:
-        list: List of dictionaries with partial video statistics.
+        VideoStatsBatch: Stats of the returned videos in columnar form, parsed page
+        by page so raw response items do not pile up. Deleted or private videos
+        are absent.
     """
 
-    PART = "id,statistics"
+    PART = parts_for(VIDEO_STATS_FIELDS)
+    FIELDS = fields_mask(VIDEO_STATS_FIELDS)
+    API_METHOD = "videos.list"
     MAX_IDS_PER_REQUEST = 50
 
-    def execute(self, service: Resource, video_ids) -> tuple[list[dict], int]:
+    def estimate_calls(self, video_ids, **kwargs) -> int:
+        if isinstance(video_ids, str):
+            return 1
+        return math.ceil(len(video_ids) / self.MAX_IDS_PER_REQUEST)
+
+    def execute(self, service: Resource, video_ids) -> tuple[VideoStatsBatch, int]:
         request_count = 0
         if isinstance(video_ids, str):
             video_ids = [video_ids]
 
-        all_items = []
+        batch = VideoStatsBatch()
 
         for i in range(0, len(video_ids), self.MAX_IDS_PER_REQUEST):
             chunk = video_ids[i:i + self.MAX_IDS_PER_REQUEST]
             response = service.videos().list(
                 part=self.PART,
-                id=",".join(chunk)
+                id=",".join(chunk),
+                fields=self.FIELDS
             ).execute()
 
             request_count += 1
-            items = response.get("items", [])
-            all_items.extend(items)
+            batch.extend_items(response.get("items", []))
+
+        return batch, request_count
+
+    async def execute_async(self, service, video_ids) -> tuple[VideoStatsBatch, int]:
+        """Like ``execute``, with every 50-ID chunk in flight at once."""
+        if isinstance(video_ids, str):
+            video_ids = [video_ids]
 
-        return all_items, request_count
+        responses = await asyncio.gather(*(
+            service.videos().list(part=self.PART, id=",".join(video_ids[i:i + self.MAX_IDS_PER_REQUEST]),
+                                  fields=self.FIELDS).execute()
+            for i in range(0, len(video_ids), self.MAX_IDS_PER_REQUEST)
+        ))
+        batch = VideoStatsBatch()
+        for response in responses:
+            batch.extend_items(response.get("items", []))
+        return batch, len(responses)
@@ -0,0 +1,220 @@
+# api/response_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httplib2
+
+# Default size of the on-disk cache; least recently used responses are evicted beyond it
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Endpoints whose responses are cached by default: the ones polled again with the same
+# parameters, where unchanged data is common. videos.list is fetched for fresh stats.
+DEFAULT_ENDPOINTS = ("channels", "playlistItems")
+
+# Pending last_used updates written to the database at once
+TOUCH_FLUSH_SIZE = 1000
+
+
+class ResponseCache:
+    """
+    Size-bounded, on-disk store of API responses and their ETags, in SQLite.
+
+    Entries are evicted least recently used first once the stored bodies exceed
+    ``max_bytes``. Reads only note when an entry was used; those timestamps are
+    written in batches, before evicting and on close, so a hit costs no write.
+    One cache can be shared by every thread and every key of a
+    YouTubeQuotaManager; hit and miss counters cover all of them.
+
+    Args:
+        path (str): SQLite database file, created with its directory if missing.
+        max_bytes (int): Upper bound on the total size of the cached bodies.
+        endpoints (Iterable[str]): API resources whose responses are cached, e.g.
+            ``channels`` for channels.list; every other request bypasses the cache.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, endpoints=DEFAULT_ENDPOINTS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.endpoints = frozenset(endpoints)
+        self.hits = 0
+        self.misses = 0
+        self._touched = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                cache_key TEXT PRIMARY KEY,
+                etag TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, cache_key: str):
+        """Returns ``(etag, headers, body)`` for a cached response, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, headers, body FROM responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[cache_key] = time.time()
+            if len(self._touched) >= TOUCH_FLUSH_SIZE:
+                self._flush_touched()
+                self._conn.commit()
+        etag, headers, body = row
+        return etag, json.loads(headers), bytes(body)
+
+    def cacheable(self, uri: str) -> bool:
+        """Whether responses for ``uri`` are cached, from its resource (the last path segment)."""
+        return urlsplit(uri).path.rstrip("/").rsplit("/", 1)[-1] in self.endpoints
+
+    def set(self, cache_key: str, etag: str, headers: dict, body: bytes):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (cache_key, etag, headers, body, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, etag, json.dumps(headers), sqlite3.Binary(body), size, time.time())
+            )
+            self._size += size - (previous[0] if previous else 0)
+            self._touched.pop(cache_key, None)
+            self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        # Caller holds self._lock and commits
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET last_used = ? WHERE cache_key = ?",
+                [(last_used, cache_key) for cache_key, last_used in self._touched.items()]
+            )
+            self._touched = {}
+
+    def _evict(self):
+        # Caller holds self._lock
+        if self._size <= self.max_bytes:
+            return
+        self._flush_touched()
+        while self._size > self.max_bytes:
+            oldest = self._conn.execute(
+                "SELECT cache_key, size FROM responses ORDER BY last_used LIMIT 100"
+            ).fetchall()
+            if not oldest:
+                self._size = 0
+                return
+            for cache_key, size in oldest:
+                if self._size <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE cache_key = ?", (cache_key,))
+                self._size -= size
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size, e.g. for the end-of-run log line."""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "bytes": self._size,
+            }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+
+def cache_key_for(uri: str) -> str:
+    """Drops the API key from the URI, so every key shares the cached responses."""
+    parts = urlsplit(uri)
+    query = urlencode(sorted((name, value) for name, value in parse_qsl(parts.query) if name != "key"))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+
+class ConditionalHttp:
+    """
+    httplib2.Http stand-in for googleapiclient services that revalidates GET
+    requests against a ResponseCache.
+
+    A cached ETag is sent as ``If-None-Match``; on ``304 Not Modified`` the cached
+    body is returned as a 200, so request classes see the same payload as before.
+    Fresh 200 responses carrying an ETag replace the cached entry. Only the
+    cache's ``endpoints`` are cached; other requests go straight through.
+
+    Args:
+        cache (ResponseCache): Shared response cache.
+        http: The wrapped transport, a new httplib2.Http by default.
+    """
+
+    def __init__(self, cache: ResponseCache, http=None):
+        self.cache = cache
+        self.http = http or httplib2.Http()
+
+    def __getattr__(self, name):
+        # Everything besides request() (timeouts, credentials, ...) is the wrapped transport's
+        return getattr(self.http, name)
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if method != "GET" or not self.cache.cacheable(uri):
+            return self.http.request(uri, method, body=body, headers=headers, **kwargs)
+
+        cache_key = cache_key_for(uri)
+        cached = self.cache.get(cache_key)
+        headers = dict(headers or {})
+        if cached is not None:
+            headers["if-none-match"] = cached[0]
+
+        response, content = self.http.request(uri, method, body=body, headers=headers, **kwargs)
+
+        if response.status == 304 and cached is not None:
+            self.cache.record(hit=True)
+            etag, cached_headers, cached_body = cached
+            return httplib2.Response(cached_headers), cached_body
+
+        self.cache.record(hit=False)
+        etag = response.get("etag")
+        if response.status == 200 and etag:
+            self.cache.set(cache_key, etag, dict(response), content)
+        return response, content
+
+
+def create_response_cache(cache_config: dict = None):
+    """Builds the cache described by ``youtube.response_cache`` in config.yaml, or None if disabled."""
+    cache_config = cache_config or {}
+    if not cache_config.get("enabled", False):
+        return None
+    return ResponseCache(
+        cache_config.get("path", "data/youtube_response_cache.sqlite"),
+        max_bytes=cache_config.get("max_bytes", DEFAULT_MAX_BYTES),
+        endpoints=cache_config.get("endpoints", DEFAULT_ENDPOINTS),
+    )
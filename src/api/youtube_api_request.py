@@ -3,8 +3,34 @@
 from abc import ABC, abstractmethod
 from googleapiclient.discovery import Resource
 
+# Documented quota cost of each API method used here, in units per call
+UNIT_COSTS = {
+    "videos.list": 1,
+    "channels.list": 1,
+    "playlistItems.list": 1,
+}
+
 
 class YouTubeAPIRequest(ABC):
+    # API method the request calls, used to price it against the daily quota
+    API_METHOD = None
+
     @abstractmethod
     def execute(self, service: Resource, *args, **kwargs) -> tuple:
         pass
+
+    async def execute_async(self, service, *args, **kwargs) -> tuple:
+        """Awaitable ``execute`` over an AsyncYouTubeService, for requests that support it."""
+        raise NotImplementedError(f"{type(self).__name__} has no async implementation")
+
+    @classmethod
+    def supports_async(cls) -> bool:
+        """Whether the request overrides ``execute_async``; checked before any quota is leased for it."""
+        return cls.execute_async is not YouTubeAPIRequest.execute_async
+
+    def estimate_calls(self, *args, **kwargs) -> int:
+        """Number of API calls the request is expected to make, used to reserve quota up front."""
+        return 1
+
+    def units_per_call(self) -> int:
+        return UNIT_COSTS.get(self.API_METHOD, 1)
@@ -1,16 +1,25 @@
 # api/youtube_client.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, Iterable, Iterator, List
 
+from src.api.handle_cache import HandleCache
+from src.api.playlist_scanner import PlaylistScanner
+from src.api.requests.get_channel_uploads_playlists import GetChannelUploadsPlaylists
 from src.api.requests.get_playlist_videos import GetPlaylistVideos
 from src.api.quota_manager import YouTubeQuotaManager
 from src.api.requests.get_channel_details import GetChannelDataByHandleOrId
+from src.api.requests.get_channel_id_for_handle import GetChannelIdForHandle
 from src.api.requests.get_video_details import GetVideoDetails
+from src.api.requests.get_video_stats_snapshot import GetVideoStatsSnapshot
 
 
 class YouTubeClient:
-    def __init__(self, quota_manager: YouTubeQuotaManager):
+    def __init__(self, quota_manager: YouTubeQuotaManager, handle_cache: HandleCache = None):
         self.qm = quota_manager
+        # Consulted before resolving any channel handle through the API
+        self.handle_cache = handle_cache
 
     def fetch_video_details(self, video_ids: List[str], part: str = None):
         """
@@ -40,12 +49,62 @@ class YouTubeClient:
         Returns:
             list: List of channel metadata dictionaries.
         """
-        request = GetChannelDataByHandleOrId()
+        request = GetChannelDataByHandleOrId(handle_cache=self.handle_cache)
         raw_items = self.qm.execute(request, channel_ids=channel_ids) if part is None \
             else self.qm.execute(request, channel_ids=channel_ids, part=part)
 
         return raw_items
 
+    def resolve_channel_handles(self, handles: List[str], max_workers: int = 8) \
+            -> Iterator[tuple[str, str, Exception]]:
+        """
+        Resolves channel handles to channel IDs, ``max_workers`` handles at a time.
+
+        Args:
+            handles (list[str]): Channel handles (e.g. '@veritasium').
+            max_workers (int): Maximum number of handles resolved at the same time.
+
+        Returns:
+            Iterator of (handle, channel_id, error) tuples, yielded as each handle completes.
+            ``channel_id`` is None for handles no channel has, or when ``error`` is set.
+        """
+        if self.handle_cache is not None:
+            # Cached handles need no quota, answer them before leasing any
+            self.handle_cache.preload(handles)
+            unresolved = []
+            for handle in handles:
+                cached, channel_id = self.handle_cache.get(handle)
+                if cached:
+                    yield handle, channel_id, None
+                else:
+                    unresolved.append(handle)
+            handles = unresolved
+        if not handles:
+            return
+
+        request = GetChannelIdForHandle(handle_cache=self.handle_cache)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="handle-resolve") as executor:
+            futures = {executor.submit(self.qm.execute, request, handle=handle): handle for handle in handles}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+
+    def resolve_uploads_playlists(self, channel_ids: List[str]) -> dict[str, str]:
+        """
+        Resolves uploads playlist IDs, batching 50 channels per channels.list call.
+
+        Args:
+            channel_ids (list[str]): YouTube channel IDs.
+
+        Returns:
+            dict: Uploads playlist ID keyed by channel ID; unknown channels are absent.
+        """
+        if not channel_ids:
+            return {}
+        return self.qm.execute(GetChannelUploadsPlaylists(), channel_ids=channel_ids)
+
     def get_recent_uploads(self, channel_id: str, since: datetime = None):
         """
         Fetch recent uploads from a channel's uploads playlist.
@@ -64,3 +123,100 @@ class YouTubeClient:
             identifier=channel_id,
             since_datetime=since
         )
+
+    def scan_recent_uploads(self, channel_ids: Iterable[str], since: datetime = None,
+                            max_workers: int = PlaylistScanner.DEFAULT_MAX_WORKERS) \
+            -> Iterator[tuple[str, list[str], Exception]]:
+        """
+        Fetch recent uploads from many channels concurrently.
+
+        Args:
+            channel_ids (Iterable[str]): Channel or uploads playlist IDs, may be a generator.
+            since (datetime): Only return videos published after this datetime (UTC).
+            max_workers (int): Maximum number of playlists fetched at the same time.
+
+        Returns:
+            Iterator of (channel_id, video_ids, error) tuples, yielded as each channel completes.
+        """
+        scanner = PlaylistScanner(self.qm, max_workers=max_workers)
+        return scanner.scan(channel_ids, since=since)
+
+    def scan_new_uploads(self, targets: Iterable[tuple[str, datetime, str]],
+                         max_workers: int = PlaylistScanner.DEFAULT_MAX_WORKERS) \
+            -> Iterator[tuple[str, list[str], Exception]]:
+        """
+        Fetch uploads newer than a per-channel high-water mark, concurrently.
+
+        Args:
+            targets (Iterable[tuple]): ``(playlist_id, since, last_seen_video_id)`` per channel;
+                scanning a playlist stops at whichever of the two it reaches first.
+            max_workers (int): Maximum number of playlists fetched at the same time.
+
+        Returns:
+            Iterator of (playlist_id, video_ids, error) tuples, yielded as each channel completes.
+        """
+        scanner = PlaylistScanner(self.qm, max_workers=max_workers)
+        return scanner.scan_incremental(targets)
+
+
+    async def fetch_video_details_async(self, video_ids: List[str], part: str = None):
+        """Like ``fetch_video_details``, over the async HTTP backend; the 50-ID chunks are fetched concurrently."""
+        request = GetVideoDetails()
+        if part is None:
+            return await self.qm.execute_async(request, video_ids=video_ids)
+        return await self.qm.execute_async(request, video_ids=video_ids, part=part)
+
+    async def fetch_video_stats_async(self, video_ids: List[str]):
+        """Fetches a VideoStatsBatch of current statistics over the async HTTP backend."""
+        return await self.qm.execute_async(GetVideoStatsSnapshot(), video_ids=video_ids)
+
+    async def get_recent_uploads_async(self, channel_id: str, since: datetime = None,
+                                       stop_at_video_id: str = None) -> list[str]:
+        """Like ``get_recent_uploads``, over the async HTTP backend."""
+        return await self.qm.execute_async(
+            GetPlaylistVideos(),
+            identifier=channel_id,
+            since_datetime=since,
+            stop_at_video_id=stop_at_video_id
+        )
+
+    async def scan_new_uploads_async(self, targets: Iterable[tuple[str, datetime, str]],
+                                     max_in_flight: int = 100) \
+            -> AsyncIterator[tuple[str, list[str], Exception]]:
+        """
+        Async counterpart of ``scan_new_uploads``: up to ``max_in_flight`` playlists
+        are scanned at once as coroutines on one event loop instead of threads.
+
+        Args:
+            targets (Iterable[tuple]): ``(playlist_id, since, last_seen_video_id)`` per channel.
+            max_in_flight (int): Maximum number of playlists scanned at the same time.
+
+        Returns:
+            Async iterator of (playlist_id, video_ids, error) tuples, yielded as each channel completes.
+        """
+        pending = iter(targets)
+        in_flight = {}
+
+        def submit_next() -> bool:
+            target = next(pending, None)
+            if target is None:
+                return False
+            identifier, since, stop_at_video_id = target
+            task = asyncio.ensure_future(self.get_recent_uploads_async(identifier, since, stop_at_video_id))
+            in_flight[task] = identifier
+            return True
+
+        while len(in_flight) < max_in_flight and submit_next():
+            pass
+
+        try:
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    identifier = in_flight.pop(task)
+                    error = task.exception()
+                    yield identifier, ([] if error else task.result()), error
+                    submit_next()
+        finally:
+            for task in in_flight:
+                task.cancel()
@@ -1,19 +1,56 @@
+import json
 import os
+import queue
+import threading
+import time
+import uuid
 from datetime import timezone, datetime
+from typing import Iterator
 import logging
 
 from dotenv import load_dotenv
-from google.cloud import bigquery
 
-# Initialize client
+from src.utils.metrics import metrics
+
 load_dotenv()
-client = bigquery.Client(project=os.getenv("GCP_PROJECT_ID"))
 dataset_id = os.getenv("BQ_DATASET_ID")
 
-# Table references
-video_metadata_table = f"{client.project}.{dataset_id}.video_metadata"
-video_stats_table = f"{client.project}.{dataset_id}.video_stats"
-channel_metadata_table = f"{client.project}.{dataset_id}.channel_metadata"
+# Client, created on first use (see get_client) or injected with set_client
+client = None
+_client_lock = threading.Lock()
+
+# Table names
+VIDEO_METADATA_TABLE = "video_metadata"
+VIDEO_STATS_TABLE = "video_stats"
+CHANNEL_METADATA_TABLE = "channel_metadata"
+
+
+def get_client():
+    """
+    Returns the shared BigQuery client, building it on first use.
+
+    google-cloud-bigquery is imported here so scripts that never write to BigQuery
+    do not pay for the import or the credential lookup.
+    """
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from google.cloud import bigquery
+
+                client = bigquery.Client(project=os.getenv("GCP_PROJECT_ID"))
+    return client
+
+
+def set_client(bq_client):
+    """Injects a BigQuery client (or a local fake with the same methods)."""
+    global client
+    client = bq_client
+
+
+def table_ref(table_name: str, bq_client=None) -> str:
+    project = os.getenv("GCP_PROJECT_ID") or (bq_client or get_client()).project
+    return f"{project}.{dataset_id}.{table_name}"
 
 
 def _parse_timestamp(ts: str) -> datetime:
@@ -24,14 +61,51 @@ def _parse_timestamp(ts: str) -> datetime:
         return datetime.now(timezone.utc)
 
 
-def _insert_row(table_id: str, row: dict):
-    def convert(value):
-        if isinstance(value, datetime):
-            return value.isoformat()
-        return value
+def _record_request(operation: str, table_id: str, started: float, inserted: int, failed: int = 0):
+    """Records a BigQuery insert or load job: its latency, the rows it landed and the rows reported failed."""
+    table = table_id.rsplit(".", 1)[-1]
+    metrics.observe("bigquery_request_seconds", time.perf_counter() - started, operation=operation, table=table)
+    metrics.inc("bigquery_rows_total", inserted, operation=operation, table=table)
+    if failed:
+        metrics.inc("bigquery_rows_failed_total", failed, operation=operation, table=table)
+
+
+def _convert(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def stats_batch_rows(batch, recorded_at: datetime, sample_indexes: dict[str, int],
+                     fetched_from: str) -> Iterator[dict]:
+    """
+    Yields video stats rows, ready to send, straight from a VideoStatsBatch.
 
-    sanitized_row = {k: convert(v) for k, v in row.items()}
-    errors = client.insert_rows_json(table_id, [sanitized_row])
+    Only videos with a sample index (the ones stored in Postgres) get a row. The
+    timestamp is formatted once for the whole batch instead of once per row.
+    """
+    recorded_at = _convert(recorded_at)
+    for video_id, view_count, like_count, _, comment_count in batch.rows():
+        sample_index = sample_indexes.get(video_id)
+        if sample_index is None:
+            continue
+        yield {
+            "videoId": video_id,
+            "recordedAt": recorded_at,
+            "viewCount": view_count,
+            "likeCount": like_count,
+            "commentCount": comment_count,
+            "dayIndex": sample_index,
+            "fetchedFrom": fetched_from,
+        }
+
+
+def _insert_row(table_id: str, row: dict):
+    sanitized_row = {k: _convert(v) for k, v in row.items()}
+    started = time.perf_counter()
+    errors = get_client().insert_rows_json(table_id, [sanitized_row])
+    if metrics.enabled:
+        _record_request("insert_rows", table_id, started, 0 if errors else 1, 1 if errors else 0)
     if errors:
         logging.error(f"Error inserting row into {table_id}: {errors}")
     else:
@@ -41,15 +115,360 @@ def _insert_row(table_id: str, row: dict):
 def insert_video_stats(stats_data: dict):
     if "recordedAt" in stats_data and isinstance(stats_data["recordedAt"], str):
         stats_data["recordedAt"] = _parse_timestamp(stats_data["recordedAt"])
-    _insert_row(video_stats_table, stats_data)
+    _insert_row(table_ref(VIDEO_STATS_TABLE), stats_data)
 
 
 def insert_bulk_video_stats(rows: list[dict]):
     for row in rows:
         if "recordedAt" in row and isinstance(row["recordedAt"], str):
             row["recordedAt"] = _parse_timestamp(row["recordedAt"])
-    errors = client.insert_rows_json(video_stats_table, rows)
+    video_stats_table = table_ref(VIDEO_STATS_TABLE)
+    started = time.perf_counter()
+    errors = get_client().insert_rows_json(video_stats_table, rows)
+    if metrics.enabled:
+        _record_request("insert_rows", video_stats_table, started, len(rows) - len(errors), len(errors))
     if errors:
         logging.error(f"BigQuery insert errors: {errors}")
     else:
         logging.info(f"Inserted {len(rows)} rows into {video_stats_table}")
+
+
+class BigQueryStatsSink:
+    """
+    Buffers stats rows and streams them to BigQuery from a background thread.
+
+    Rows are flushed when the buffer reaches ``max_rows`` rows or ``max_bytes`` of
+    JSON payload, or when ``flush_interval`` seconds pass, whichever comes first.
+    Defaults stay well inside the streaming insert request limits. Only the rows
+    BigQuery reports as failed are retried; rows rejected as invalid are dropped
+    and logged.
+
+    Usage:
+        with BigQueryStatsSink() as sink:
+            sink.add(row)
+            sink.add_stats_batch(batch, recorded_at, sample_indexes, "hourly_script")
+
+    Args:
+        table_id (str): Destination table, defaults to the video stats table.
+        bq_client (bigquery.Client): Client used for the inserts.
+        max_rows (int): Maximum rows per insert request.
+        max_bytes (int): Maximum JSON payload bytes per insert request.
+        flush_interval (float): Seconds after which a partial buffer is flushed.
+        max_retries (int): Attempts per row before it is given up on.
+    """
+
+    MAX_ROWS_PER_REQUEST = 500
+    MAX_BYTES_PER_REQUEST = 5 * 1024 * 1024
+    FLUSH_INTERVAL_SECONDS = 5.0
+    MAX_RETRIES = 5
+
+    def __init__(self, table_id: str = None, bq_client=None, max_rows: int = MAX_ROWS_PER_REQUEST,
+                 max_bytes: int = MAX_BYTES_PER_REQUEST, flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                 max_retries: int = MAX_RETRIES):
+        self.client = bq_client or get_client()
+        self.table_id = table_id or table_ref(VIDEO_STATS_TABLE, self.client)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self.inserted_count = 0
+        self.failed_count = 0
+
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._batches = queue.Queue()
+        self._closed = False
+        # First unexpected error of the background thread, re-raised by close()
+        self._error = None
+        self._worker = threading.Thread(target=self._run, name="bigquery-stats-sink", daemon=True)
+        self._worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, row: dict):
+        if self._closed:
+            raise RuntimeError("BigQueryStatsSink is closed")
+
+        if "recordedAt" in row and isinstance(row["recordedAt"], str):
+            row["recordedAt"] = _parse_timestamp(row["recordedAt"])
+        self._add_sanitized({k: _convert(v) for k, v in row.items()})
+
+    def add_stats_batch(self, batch, recorded_at: datetime, sample_indexes: dict[str, int], fetched_from: str):
+        """Adds a row per stored video of a VideoStatsBatch, see stats_batch_rows."""
+        if self._closed:
+            raise RuntimeError("BigQueryStatsSink is closed")
+        for row in stats_batch_rows(batch, recorded_at, sample_indexes, fetched_from):
+            self._add_sanitized(row)
+
+    def _add_sanitized(self, sanitized_row: dict):
+        row_size = len(json.dumps(sanitized_row))
+
+        with self._lock:
+            if self._buffer and self._buffer_bytes + row_size > self.max_bytes:
+                self._hand_off()
+            # insertId is fixed per row so retries are deduplicated by BigQuery
+            self._buffer.append((str(uuid.uuid4()), sanitized_row))
+            self._buffer_bytes += row_size
+            if len(self._buffer) >= self.max_rows:
+                self._hand_off()
+
+    def flush(self):
+        """Hands the current buffer to the background thread without waiting for it."""
+        with self._lock:
+            self._hand_off()
+
+    def close(self):
+        """
+        Flushes the buffer and waits until every pending batch has been sent.
+        Raises the first unexpected error of the background thread, if any, once
+        every batch has been handled.
+        """
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._batches.put(None)
+        self._worker.join()
+        logging.info(
+            f"BigQueryStatsSink closed: {self.inserted_count} rows inserted, "
+            f"{self.failed_count} rows failed into {self.table_id}"
+        )
+        if self._error is not None:
+            raise RuntimeError(
+                f"BigQueryStatsSink failed to send some batches to {self.table_id}: {self._error}"
+            ) from self._error
+
+    def _hand_off(self):
+        # Caller holds self._lock
+        if self._buffer:
+            self._batches.put(self._buffer)
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._last_flush = time.monotonic()
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._batches.get(timeout=self.flush_interval)
+            except queue.Empty:
+                batch = []
+
+            if batch is None:
+                break
+            if batch:
+                self._send(batch)
+
+            with self._lock:
+                if time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._hand_off()
+
+    def _send(self, batch: list[tuple]):
+        """
+        Sends a batch, retrying the rows BigQuery reports as failed, and counts
+        every row as inserted or failed. An unexpected error only loses the rows
+        not settled yet; it is kept for close() and the thread moves on.
+        """
+        pending = batch
+        attempt = 0
+        try:
+            while pending:
+                attempt += 1
+                row_ids = [row_id for row_id, _ in pending]
+                rows = [row for _, row in pending]
+                started = time.perf_counter()
+                try:
+                    errors = self.client.insert_rows_json(self.table_id, rows, row_ids=row_ids)
+                except Exception as e:
+                    logging.warning(f"BigQuery insert of {len(pending)} rows failed (attempt {attempt}): {e}")
+                    errors = [
+                        {"index": index, "errors": [{"reason": "requestFailed"}]} for index in range(len(pending))
+                    ]
+                if metrics.enabled:
+                    _record_request("insert_rows", self.table_id, started, len(pending) - len(errors), len(errors))
+
+                retry = []
+                rejected = 0
+                for error in errors:
+                    reasons = {e.get("reason") for e in error.get("errors", [])}
+                    if "invalid" in reasons:
+                        logging.error(f"BigQuery rejected row {pending[error['index']][1]}: {error['errors']}")
+                        rejected += 1
+                    else:
+                        retry.append(pending[error["index"]])
+
+                self._count(inserted=len(pending) - len(errors), failed=rejected)
+                pending = retry
+
+                if pending and attempt >= self.max_retries:
+                    logging.error(f"Giving up on {len(pending)} rows for {self.table_id} after {attempt} attempts")
+                    self._count(failed=len(pending))
+                    return
+                if pending:
+                    time.sleep(min(2 ** attempt, 30))
+        except Exception as e:
+            logging.exception(f"Sending {len(pending)} rows to {self.table_id} failed: {e}")
+            self._count(failed=len(pending))
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+
+    def _count(self, inserted: int = 0, failed: int = 0):
+        # The counters are read by the adding threads and by close()
+        with self._lock:
+            self.inserted_count += inserted
+            self.failed_count += failed
+
+
+class BigQueryLoadJobSink:
+    """
+    Stages stats rows to local newline-delimited JSON files and lands them with
+    batch load jobs instead of streaming inserts.
+
+    Exposes the same interface as BigQueryStatsSink (``add``, ``add_stats_batch``, ``flush``, ``close``,
+    context manager and the inserted/failed counters), so callers can switch
+    backends through config. A staged file is submitted when it reaches
+    ``max_rows`` rows and on ``flush``/``close``. Files whose load job fails are
+    kept in ``staging_dir`` so they can be loaded again by hand.
+
+    Args:
+        table_id (str): Destination table, defaults to the video stats table.
+        bq_client (bigquery.Client): Client used to submit the load jobs.
+        staging_dir (str): Directory for the staged files.
+        max_rows (int): Maximum rows per staged file / load job.
+        job_config (bigquery.LoadJobConfig): Config of every load job; defaults to
+            appending newline-delimited JSON, built on the first submit.
+    """
+
+    STAGING_DIR = "data/bigquery_staging"
+    MAX_ROWS_PER_FILE = 1_000_000
+
+    def __init__(self, table_id: str = None, bq_client=None, staging_dir: str = STAGING_DIR,
+                 max_rows: int = MAX_ROWS_PER_FILE, job_config=None):
+        self.client = bq_client or get_client()
+        self.table_id = table_id or table_ref(VIDEO_STATS_TABLE, self.client)
+        self.staging_dir = staging_dir
+        self.max_rows = max_rows
+        self.job_config = job_config
+
+        self.inserted_count = 0
+        self.failed_count = 0
+
+        self._file = None
+        self._file_path = None
+        self._file_rows = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        os.makedirs(self.staging_dir, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, row: dict):
+        if self._closed:
+            raise RuntimeError("BigQueryLoadJobSink is closed")
+
+        if "recordedAt" in row and isinstance(row["recordedAt"], str):
+            row["recordedAt"] = _parse_timestamp(row["recordedAt"])
+        self._write_line(json.dumps({k: _convert(v) for k, v in row.items()}))
+
+    def add_stats_batch(self, batch, recorded_at: datetime, sample_indexes: dict[str, int], fetched_from: str):
+        """Stages a row per stored video of a VideoStatsBatch, see stats_batch_rows."""
+        if self._closed:
+            raise RuntimeError("BigQueryLoadJobSink is closed")
+        for row in stats_batch_rows(batch, recorded_at, sample_indexes, fetched_from):
+            self._write_line(json.dumps(row))
+
+    def _write_line(self, line: str):
+        with self._lock:
+            if self._file is None:
+                self._file_path = os.path.join(self.staging_dir, f"video_stats_{uuid.uuid4().hex}.ndjson")
+                self._file = open(self._file_path, "w")
+            self._file.write(line + "\n")
+            self._file_rows += 1
+            if self._file_rows >= self.max_rows:
+                self._submit()
+
+    def flush(self):
+        """Submits the staged file, if any, as a load job and waits for it."""
+        with self._lock:
+            self._submit()
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        logging.info(
+            f"BigQueryLoadJobSink closed: {self.inserted_count} rows loaded, "
+            f"{self.failed_count} rows failed into {self.table_id}"
+        )
+
+    def _submit(self):
+        # Caller holds self._lock
+        if self._file is None:
+            return
+
+        self._file.close()
+        path, row_count = self._file_path, self._file_rows
+        self._file, self._file_path, self._file_rows = None, None, 0
+
+        if self.job_config is None:
+            self.job_config = _ndjson_append_job_config()
+        started = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                job = self.client.load_table_from_file(f, self.table_id, job_config=self.job_config)
+            job.result()
+        except Exception as e:
+            logging.error(f"Load job for {path} ({row_count} rows) into {self.table_id} failed: {e}")
+            self.failed_count += row_count
+            if metrics.enabled:
+                _record_request("load_job", self.table_id, started, 0, row_count)
+            return
+        if metrics.enabled:
+            _record_request("load_job", self.table_id, started, row_count)
+
+        os.remove(path)
+        self.inserted_count += row_count
+        logging.info(f"Loaded {row_count} rows into {self.table_id}")
+
+
+def _ndjson_append_job_config():
+    """Load job config appending newline-delimited JSON; google-cloud-bigquery is only imported here."""
+    from google.cloud import bigquery
+
+    return bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+    )
+
+
+def create_stats_sink(config: dict = None, table_id: str = None, bq_client=None):
+    """
+    Builds the stats sink selected by the ``bigquery`` section of config.yaml.
+
+    ``stats_backend: streaming`` (default) returns a BigQueryStatsSink and
+    ``stats_backend: load_job`` a BigQueryLoadJobSink staging under ``staging_dir``.
+    """
+    config = config or {}
+    backend = config.get("stats_backend", "streaming")
+
+    if backend == "streaming":
+        return BigQueryStatsSink(table_id=table_id, bq_client=bq_client)
+    if backend == "load_job":
+        return BigQueryLoadJobSink(
+            table_id=table_id,
+            bq_client=bq_client,
+            staging_dir=config.get("staging_dir", BigQueryLoadJobSink.STAGING_DIR)
+        )
+    raise ValueError(f"Unknown BigQuery stats backend: {backend}")
@@ -1,43 +1,189 @@
 # src/db/database_client.py
 
+import json
 import os
-import psycopg2
-from psycopg2 import pool
+import re
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
 from dotenv import load_dotenv
 
+from src.utils.metrics import metrics
+
+
 load_dotenv()
 
-# Environment variables
-DB_HOST = os.getenv("DATABASE_HOST")
-DB_PORT = os.getenv("DATABASE_PORT", "5432")
-DB_NAME = os.getenv("DATABASE_NAME")
-DB_USER = os.getenv("DATABASE_USER")
-DB_PASSWORD = os.getenv("DATABASE_PASSWORD")
-
-# Initialize connection pool
-try:
-    conn_pool = psycopg2.pool.SimpleConnectionPool(
-        1, 10,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT,
-        database=DB_NAME
-    )
-except Exception as e:
-    raise RuntimeError(f"Unable to connect to Supabase DB: {e}")
+# Connection pool, created on first use (see get_pool) or injected with set_pool
+conn_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the shared connection pool, opening it on first use.
+
+    psycopg2 is imported here rather than at module import so scripts only pay for
+    it, and only fail on an unreachable database, once they actually query. The
+    pool is shared by the scan, pipeline and quota ledger threads, so it is a
+    ThreadedConnectionPool of up to DATABASE_MAX_CONNECTIONS connections (10 by
+    default), wrapped so threads wait for a free connection instead of failing.
+    """
+    global conn_pool
+    if conn_pool is None:
+        with _pool_lock:
+            if conn_pool is None:
+                from psycopg2 import pool
+
+                max_connections = int(os.getenv("DATABASE_MAX_CONNECTIONS", "10"))
+                try:
+                    conn_pool = BlockingConnectionPool(pool.ThreadedConnectionPool(
+                        1, max_connections,
+                        user=os.getenv("DATABASE_USER"),
+                        password=os.getenv("DATABASE_PASSWORD"),
+                        host=os.getenv("DATABASE_HOST"),
+                        port=os.getenv("DATABASE_PORT", "5432"),
+                        database=os.getenv("DATABASE_NAME")
+                    ), max_connections)
+                except Exception as e:
+                    raise RuntimeError(f"Unable to connect to Supabase DB: {e}")
+    return conn_pool
+
+
+def set_pool(db_pool):
+    """Injects a connection pool (anything with getconn/putconn), e.g. for tests or tools."""
+    global conn_pool
+    conn_pool = db_pool
+
+
+class BlockingConnectionPool:
+    """
+    Wraps a connection pool so ``getconn`` waits while all ``max_connections`` are
+    checked out, where psycopg2's pools raise PoolError.
+
+    A job may run more threads than there are connections (e.g. the backfill's
+    channel and store workers plus quota ledger leases). Every function here holds
+    a connection only for its own statements and never asks for a second one
+    meanwhile, so waiting threads always get one once another thread is done.
+
+    Args:
+        db_pool: The wrapped pool (anything with getconn/putconn).
+        max_connections (int): Connections the wrapped pool hands out at most.
+    """
+
+    def __init__(self, db_pool, max_connections: int):
+        self.pool = db_pool
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def getconn(self):
+        self._slots.acquire()
+        try:
+            return self.pool.getconn()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        try:
+            self.pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self.pool.closeall()
+
+
+def _execute_values(cur, query, rows, **kwargs):
+    from psycopg2.extras import execute_values
+
+    started = time.perf_counter()
+    result = execute_values(cur, query, rows, **kwargs)
+    if metrics.enabled:
+        _record_statement(query, started, len(rows))
+    return result
+
+
+# Verb and table a statement is reported under, e.g. "insert videos"
+_STATEMENT_RE = re.compile(r"\b(SELECT\b.*?\bFROM|INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+(\w+)",
+                           re.IGNORECASE | re.DOTALL)
+
+
+@lru_cache(maxsize=256)
+def _statement_label(query: str) -> str:
+    match = _STATEMENT_RE.search(query)
+    if match is None:
+        return "other"
+    return f"{match.group(1).split()[0].lower()} {match.group(2)}"
+
+
+def _record_statement(query: str, started: float, rows: int):
+    """Records a statement's latency and the rows it read or wrote, per verb and table."""
+    statement = _statement_label(query)
+    metrics.observe("db_statement_seconds", time.perf_counter() - started, statement=statement)
+    metrics.inc("db_statement_rows_total", rows, statement=statement)
+
+# Bulk write settings and per-row outcomes
+DEFAULT_BULK_CHUNK_SIZE = 500
+
+BULK_INSERTED = "inserted"
+BULK_SKIPPED = "skipped"
+BULK_FAILED = "failed"
+
+VIDEO_COLUMNS = (
+    "id",
+    "published_at",
+    "channel_id",
+    "title",
+    "description",
+    "localized_title",
+    "localized_description",
+    "thumbnail_default",
+    "thumbnail_medium",
+    "thumbnail_high",
+    "tags",
+    "category_id",
+    "live_broadcast_content",
+    "default_language",
+    "default_audio_language",
+    "video_duration",
+    "view_count",
+    "likes_count",
+    "favourite_count",
+    "comment_count",
+    "inserted_at",
+)
+
+CHANNEL_COLUMNS = (
+    "id",
+    "title",
+    "custom_url",
+    "country",
+    "uploads_playlist_id",
+    "view_count",
+    "subscriber_count",
+    "last_checked_at",
+    "is_active",
+)
+
+VIDEO_SCHEDULE_COLUMNS = (
+    "video_id",
+    "upload_datetime",
+    "current_sample",
+    "bin_id",
+    "next_sample_at",
+)
 
 
 def get_conn():
     try:
-        return conn_pool.getconn()
+        return get_pool().getconn()
     except Exception as e:
         raise RuntimeError(f"Error acquiring DB connection: {e}")
 
 
 def release_conn(conn):
     try:
-        conn_pool.putconn(conn)
+        get_pool().putconn(conn)
     except Exception as e:
         raise RuntimeError(f"Error releasing DB connection: {e}")
 
@@ -45,10 +191,13 @@ def release_conn(conn):
 def execute_query(query: str, params: tuple = None, fetch: bool = False):
     conn = get_conn()
     try:
+        started = time.perf_counter()
         with conn.cursor() as cur:
             cur.execute(query, params)
             result = cur.fetchall() if fetch else None
             conn.commit()
+            if metrics.enabled:
+                _record_statement(query, started, len(result) if fetch else max(cur.rowcount, 0))
             return result
     except Exception as e:
         conn.rollback()
@@ -57,6 +206,57 @@ def execute_query(query: str, params: tuple = None, fetch: bool = False):
         release_conn(conn)
 
 
+def execute_bulk(query: str, rows: list[tuple], keys: list, chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> list[tuple]:
+    """
+    Writes rows with a multi-row VALUES statement, one transaction per chunk.
+
+    The query must contain a single ``VALUES %s`` placeholder and return the key
+    column of every row it actually wrote (``RETURNING ...``). If a chunk fails,
+    it is rolled back and retried row by row so one bad record does not take
+    the rest of the chunk down with it.
+
+    Args:
+        query (str): INSERT statement with ``VALUES %s`` and a RETURNING clause.
+        rows (list[tuple]): Parameter tuples, one per row.
+        keys (list): Key of each row, in the same order as ``rows``.
+        chunk_size (int): Maximum number of rows per statement/transaction.
+
+    Returns:
+        list[tuple]: ``(key, outcome, error)`` per row in input order, where outcome
+        is one of BULK_INSERTED, BULK_SKIPPED or BULK_FAILED.
+    """
+    outcomes = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        chunk_keys = keys[start:start + chunk_size]
+
+        conn = get_conn()
+        try:
+            try:
+                with conn.cursor() as cur:
+                    returned = _execute_values(cur, query, chunk, page_size=len(chunk), fetch=True)
+                conn.commit()
+                written = {row[0] for row in returned}
+                outcomes.extend(
+                    (key, BULK_INSERTED if key in written else BULK_SKIPPED, None) for key in chunk_keys
+                )
+            except Exception:
+                conn.rollback()
+                for key, row in zip(chunk_keys, chunk):
+                    try:
+                        with conn.cursor() as cur:
+                            returned = _execute_values(cur, query, [row], fetch=True)
+                        conn.commit()
+                        outcomes.append((key, BULK_INSERTED if returned else BULK_SKIPPED, None))
+                    except Exception as row_error:
+                        conn.rollback()
+                        outcomes.append((key, BULK_FAILED, str(row_error)))
+        finally:
+            release_conn(conn)
+
+    return outcomes
+
+
 def insert_video(video_id, title, publish_time):
     query = """
     INSERT INTO videos (video_id, title, publish_time)
@@ -66,15 +266,6 @@ def insert_video(video_id, title, publish_time):
     execute_query(query, (video_id, title, publish_time))
 
 
-def fetch_unpolled_channels(limit=100):
-    query = """
-    SELECT channel_id FROM channels
-    WHERE last_polled IS NULL OR last_polled < NOW() - INTERVAL '6 hours'
-    LIMIT %s;
-    """
-    return execute_query(query, (limit,), fetch=True)
-
-
 def insert_channel(channel: dict):
     query = """
     INSERT INTO channels (
@@ -115,44 +306,185 @@ def insert_channel(channel: dict):
 
     execute_query(query, params)
 
-def fetch_channels_batch(limit=100, offset=0):
+def iterate_keyset(query: str, params: tuple = (), chunk_size: int = 1000, start_after: str = ""):
+    """
+    Streams a query's rows in chunks using keyset pagination.
+
+    The query must select the key as its first column, filter on ``key > %s`` with
+    that placeholder after ``params``, order by the key and end with ``LIMIT %s``.
+    Every page is a short indexed query, so cost stays linear in table size and
+    rows inserted or updated mid-scan are neither skipped nor repeated.
+
+    Yields:
+        list[tuple]: Up to ``chunk_size`` rows per chunk.
+    """
+    last_key = start_after
+    while True:
+        rows = execute_query(query, (*params, last_key, chunk_size), fetch=True)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last_key = rows[-1][0]
+
+def iter_active_channels(chunk_size: int = 1000):
+    """
+    Yields chunks of ``(channel_id, uploads_playlist_id, last_seen_published_at, last_seen_video_id)``
+    for active channels; the playlist and high-water mark may be None.
+    """
+    query = """
+    SELECT id, uploads_playlist_id, last_seen_published_at, last_seen_video_id
+    FROM channels
+    WHERE is_active = TRUE AND id > %s
+    ORDER BY id
+    LIMIT %s;
+    """
+    return iterate_keyset(query, chunk_size=chunk_size)
+
+def iter_all_channel_ids(chunk_size: int = 1000):
+    """Yields chunks of channel IDs, active or not."""
     query = """
-            SELECT id
-            FROM channels
-            WHERE is_active = TRUE
-            LIMIT %s OFFSET %s; \
-            """
-    return execute_query(query, (limit, offset), fetch=True)
+    SELECT id
+    FROM channels
+    WHERE id > %s
+    ORDER BY id
+    LIMIT %s;
+    """
+    for rows in iterate_keyset(query, chunk_size=chunk_size):
+        yield [row[0] for row in rows]
 
-def fetch_channel_upload_playlist_ids_batch(limit=100, offset=0):
+def update_channel_uploads_playlists(playlists: dict[str, str]):
+    """Stores resolved uploads playlist IDs, keyed by channel ID, in one statement."""
+    if not playlists:
+        return
     query = """
-            SELECT uploads_playlist_id
-            FROM channels
-            WHERE is_active = TRUE
-            LIMIT %s OFFSET %s; \
-            """
-    return execute_query(query, (limit, offset), fetch=True)
+    UPDATE channels c
+    SET uploads_playlist_id = p.uploads_playlist_id
+    FROM (VALUES %s) AS p (id, uploads_playlist_id)
+    WHERE c.id = p.id;
+    """
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            _execute_values(cur, query, list(playlists.items()), page_size=len(playlists))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise RuntimeError(f"Database query failed: {e}")
+    finally:
+        release_conn(conn)
 
-def fetch_all_channels(batch_size=100):
+def fetch_all_channels(batch_size=1000):
     all_channels = []
-    offset = 0
+    for rows in iter_active_channels(chunk_size=batch_size):
+        all_channels.extend((row[0],) for row in rows)
+    return all_channels
 
-    while True:
-        batch = fetch_channels_batch(limit=batch_size, offset=offset)
-        if not batch:
-            break
-        all_channels.extend(batch)
-        offset += batch_size
+def iter_due_channels(now, chunk_size: int = 1000):
+    """
+    Yields chunks of active channels due for polling at ``now`` (naive UTC) as
+    ``(channel_id, uploads_playlist_id, last_seen_published_at, last_seen_video_id,
+    uploads_per_day, last_checked_at, poll_tier)`` rows; ``poll_tier`` is None for
+    channels never polled yet.
+    """
+    query = """
+    SELECT id, uploads_playlist_id, last_seen_published_at, last_seen_video_id, uploads_per_day, last_checked_at,
+        poll_tier
+    FROM channels
+    WHERE is_active = TRUE AND (next_poll_at IS NULL OR next_poll_at <= %s) AND id > %s
+    ORDER BY id
+    LIMIT %s;
+    """
+    return iterate_keyset(query, (now,), chunk_size=chunk_size)
 
-    return all_channels
+def refresh_channel_upload_rates(history_days: int, now, stale_hours: int):
+    """
+    Recomputes uploads_per_day from the last ``history_days`` of videos for the
+    active channels that are due at ``now`` (naive UTC) or whose rate is older
+    than ``stale_hours``. Channels never polled yet (no poll_tier) keep NULL, as
+    their stored videos say nothing about their cadence yet.
+    """
+    query = """
+    UPDATE channels c
+    SET
+        uploads_per_day = (
+            SELECT COUNT(*)
+            FROM videos v
+            WHERE v.channel_id = c.id
+                AND v.published_at >= %s - make_interval(days => %s)
+        )::real / %s,
+        upload_rate_refreshed_at = %s
+    WHERE c.is_active = TRUE
+        AND c.poll_tier IS NOT NULL
+        AND (
+            c.next_poll_at <= %s
+            OR c.upload_rate_refreshed_at IS NULL
+            OR c.upload_rate_refreshed_at < %s - make_interval(hours => %s)
+        );
+    """
+    execute_query(query, (now, history_days, history_days, now, now, now, stale_hours))
+
+def update_channel_poll_schedule(schedules: list[tuple]):
+    """Records polls as ``(channel_id, poll_tier, last_checked_at, next_poll_at)`` rows in one statement."""
+    if not schedules:
+        return
+    query = """
+    UPDATE channels c
+    SET
+        poll_tier = p.poll_tier,
+        last_checked_at = p.last_checked_at,
+        next_poll_at = p.next_poll_at
+    FROM (VALUES %s) AS p (id, poll_tier, last_checked_at, next_poll_at)
+    WHERE c.id = p.id;
+    """
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            _execute_values(cur, query, schedules, template="(%s, %s, %s::timestamp, %s::timestamp)",
+                            page_size=len(schedules))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise RuntimeError(f"Database query failed: {e}")
+    finally:
+        release_conn(conn)
+
+def update_channel_high_water_marks(marks: dict[str, tuple]):
+    """
+    Advances each channel's high-water mark, keyed by channel ID, to
+    ``(published_at, video_id)`` of its newest stored upload. Marks never move back.
+    """
+    if not marks:
+        return
+    query = """
+    UPDATE channels c
+    SET
+        last_seen_published_at = m.published_at,
+        last_seen_video_id = m.video_id
+    FROM (VALUES %s) AS m (id, published_at, video_id)
+    WHERE c.id = m.id
+        AND (c.last_seen_published_at IS NULL OR m.published_at > c.last_seen_published_at);
+    """
+    rows = [(channel_id, published_at, video_id) for channel_id, (published_at, video_id) in marks.items()]
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            _execute_values(cur, query, rows, template="(%s, %s::timestamp, %s)", page_size=len(rows))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise RuntimeError(f"Database query failed: {e}")
+    finally:
+        release_conn(conn)
 
 def mark_channel_inactive(channel_id: str):
     query = """
     UPDATE channels
     SET is_active = FALSE
-    WHERE uploads_playlist_id = %s;
+    WHERE id = %s OR uploads_playlist_id = %s;
     """
-    execute_query(query, (channel_id,))
+    execute_query(query, (channel_id, channel_id))
 
 def insert_video(
     id,
@@ -265,6 +597,87 @@ def increment_video_sample(video_id: str):
     """
     execute_query(query, (video_id,))
 
+def update_video_stats_bulk(batch, next_samples: dict = None,
+                            chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> tuple[dict[str, int], list[tuple]]:
+    """
+    Applies a VideoStatsBatch from GetVideoStatsSnapshot in a handful of statements.
+
+    For every chunk a single statement updates the stats on ``videos``, increments
+    ``video_schedule.current_sample``, records the sample on the schedule row and
+    returns the sample index each video had before the increment, all in one
+    transaction.
+
+    Args:
+        batch (VideoStatsBatch): Stats returned by GetVideoStatsSnapshot.
+        next_samples (dict): Optional new ``next_sample_at`` (UTC datetime, or None to
+            stop sampling) keyed by video ID; videos not in it keep their schedule.
+        chunk_size (int): Maximum number of videos per statement/transaction.
+
+    Returns:
+        tuple[dict[str, int], list[tuple]]: Pre-increment sample index keyed by video
+        ID, without the videos that have no schedule row, and ``(video_ids, error)``
+        for every chunk that failed and was rolled back.
+    """
+    query = """
+    WITH stats (id, view_count, likes_count, favourite_count, comment_count, reschedule, next_sample_at) AS (
+        VALUES %s
+    ),
+    updated_videos AS (
+        UPDATE videos v
+        SET
+            view_count = s.view_count,
+            likes_count = s.likes_count,
+            favourite_count = s.favourite_count,
+            comment_count = s.comment_count
+        FROM stats s
+        WHERE v.id = s.id
+        RETURNING v.id
+    )
+    UPDATE video_schedule vs
+    SET
+        current_sample = vs.current_sample + 1,
+        last_sampled_at = NOW() AT TIME ZONE 'UTC',
+        last_view_count = s.view_count,
+        next_sample_at = CASE WHEN s.reschedule THEN s.next_sample_at ELSE vs.next_sample_at END
+    FROM stats s
+    WHERE vs.video_id = s.id
+    RETURNING vs.video_id, vs.current_sample - 1;
+    """
+    template = "(%s, %s::bigint, %s::bigint, %s::bigint, %s::bigint, %s::boolean, %s::timestamp)"
+    next_samples = next_samples or {}
+
+    # A video listed twice in one statement would be updated twice, keep the last snapshot
+    rows_by_id = {}
+    for video_id, view_count, likes_count, favourite_count, comment_count in batch.rows():
+        rows_by_id[video_id] = (
+            video_id,
+            view_count,
+            likes_count,
+            favourite_count,
+            comment_count,
+            video_id in next_samples,
+            next_samples.get(video_id),
+        )
+    rows = list(rows_by_id.values())
+
+    previous_samples = {}
+    failed_chunks = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        conn = get_conn()
+        try:
+            with conn.cursor() as cur:
+                returned = _execute_values(cur, query, chunk, template=template, page_size=len(chunk), fetch=True)
+            conn.commit()
+            previous_samples.update({video_id: sample for video_id, sample in returned})
+        except Exception as e:
+            conn.rollback()
+            failed_chunks.append(([row[0] for row in chunk], str(e)))
+        finally:
+            release_conn(conn)
+
+    return previous_samples, failed_chunks
+
 def get_current_sample(video_id: str) -> int:
     query = """
     SELECT current_sample
@@ -275,13 +688,408 @@ def get_current_sample(video_id: str) -> int:
     result = execute_query(query, (video_id,), fetch=True)
     return result[0] if result else None
 
-def fetch_videos_for_bin_paginated(bin_id: int, batch_size: int = 100, offset: int = 0):
+def iter_due_videos(now, limit: int, chunk_size: int = 1000, start_after: tuple = None):
+    """
+    Yields chunks of videos whose next sample is due at ``now``, most overdue first,
+    up to ``limit`` videos in total.
+
+    Pages on ``(next_sample_at, video_id)`` so the scan stays an index range read;
+    ``start_after`` continues a scan after that key, e.g. from a checkpoint.
+
+    Yields:
+        list[tuple]: ``(video_id, upload_datetime, last_sampled_at, last_view_count, next_sample_at)`` rows.
+    """
+    query = """
+    SELECT video_id, upload_datetime, last_sampled_at, last_view_count, next_sample_at
+    FROM video_schedule
+    WHERE next_sample_at <= %s AND (next_sample_at, video_id) > (%s, %s)
+    ORDER BY next_sample_at, video_id
+    LIMIT %s;
+    """
+    last_key = start_after or (datetime.min, "")
+    remaining = limit
+    while remaining > 0:
+        rows = execute_query(query, (now, *last_key, min(chunk_size, remaining)), fetch=True)
+        if not rows:
+            return
+        yield rows
+        remaining -= len(rows)
+        if len(rows) < chunk_size:
+            return
+        last_key = (rows[-1][4], rows[-1][0])
+
+def filter_unknown_video_ids(video_ids: list[str]) -> list[str]:
+    """Returns the IDs, in input order, that are not in the videos table yet."""
+    if not video_ids:
+        return []
+    query = """
+    SELECT id
+    FROM videos
+    WHERE id = ANY(%s);
+    """
+    known = {row[0] for row in execute_query(query, (list(video_ids),), fetch=True)}
+    return [video_id for video_id in video_ids if video_id not in known]
+
+def filter_unknown_channel_ids(channel_ids: list[str]) -> list[str]:
+    """Returns the IDs, in input order, that are not in the channels table yet."""
+    if not channel_ids:
+        return []
+    query = """
+    SELECT id
+    FROM channels
+    WHERE id = ANY(%s);
+    """
+    known = {row[0] for row in execute_query(query, (list(channel_ids),), fetch=True)}
+    return [channel_id for channel_id in channel_ids if channel_id not in known]
+
+def _iter_ids_by_time(table: str, time_column: str, start_after: tuple, chunk_size: int):
+    query = f"""
+    SELECT id, {time_column}
+    FROM {table}
+    WHERE ({time_column}, id) > (%s, %s)
+    ORDER BY {time_column}, id
+    LIMIT %s;
+    """
+    last_key = start_after or (datetime.min, "")
+    while True:
+        rows = execute_query(query, (*last_key, chunk_size), fetch=True)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last_key = (rows[-1][1], rows[-1][0])
+
+def iter_video_ids_inserted_after(start_after: tuple = None, chunk_size: int = 10_000):
+    """
+    Yields chunks of ``(video_id, inserted_at)`` in insertion order, after the
+    ``(inserted_at, video_id)`` key ``start_after`` (from the start if None).
+    """
+    return _iter_ids_by_time("videos", "inserted_at", start_after, chunk_size)
+
+def iter_channel_ids_created_after(start_after: tuple = None, chunk_size: int = 10_000):
+    """Like iter_video_ids_inserted_after, for channels by ``created_at``."""
+    return _iter_ids_by_time("channels", "created_at", start_after, chunk_size)
+
+def end_video_sampling(video_ids: list[str]):
+    """Stops sampling videos, e.g. ones the API no longer returns."""
+    query = """
+    UPDATE video_schedule
+    SET next_sample_at = NULL
+    WHERE video_id = ANY(%s);
+    """
+    execute_query(query, (list(video_ids),))
+
+def insert_videos_bulk(videos: list[dict], chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> list[tuple]:
+    """
+    Inserts mapped video records (see map_video_metadata) in chunks.
+
+    Returns:
+        list[tuple]: ``(video_id, outcome, error)`` per record, see execute_bulk.
+    """
+    rows = [tuple(video[column] for column in VIDEO_COLUMNS) for video in videos]
+    return insert_video_rows_bulk(rows, chunk_size=chunk_size)
+
+def insert_video_rows_bulk(rows: list[tuple], chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> list[tuple]:
+    """Like insert_videos_bulk, for rows already in VIDEO_COLUMNS order (see src/mappers/video_rows.py)."""
+    query = f"""
+    INSERT INTO videos ({", ".join(VIDEO_COLUMNS)})
+    VALUES %s
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id;
+    """
+    keys = [row[0] for row in rows]
+    return execute_bulk(query, rows, keys, chunk_size=chunk_size)
+
+def upsert_channels_bulk(channels: list[dict], chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> list[tuple]:
+    """
+    Inserts or refreshes mapped channel records (see map_channel_metadata) in chunks,
+    like insert_channel. Channels must be unique by ID within a call.
+
+    Returns:
+        list[tuple]: ``(channel_id, outcome, error)`` per record, see execute_bulk.
+    """
+    updates = ",\n        ".join(f"{column} = EXCLUDED.{column}" for column in CHANNEL_COLUMNS[1:])
+    query = f"""
+    INSERT INTO channels ({", ".join(CHANNEL_COLUMNS)})
+    VALUES %s
+    ON CONFLICT (id) DO UPDATE
+    SET
+        {updates}
+    RETURNING id;
+    """
+    rows = [tuple(channel[column] for column in CHANNEL_COLUMNS) for channel in channels]
+    keys = [channel["id"] for channel in channels]
+    return execute_bulk(query, rows, keys, chunk_size=chunk_size)
+
+def insert_video_schedules_bulk(schedules: list[dict], chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> list[tuple]:
+    """
+    Inserts mapped schedule records (see map_video_schedule_metadata) in chunks.
+
+    Returns:
+        list[tuple]: ``(video_id, outcome, error)`` per record, see execute_bulk.
+    """
+    rows = [tuple(schedule[column] for column in VIDEO_SCHEDULE_COLUMNS) for schedule in schedules]
+    return insert_video_schedule_rows_bulk(rows, chunk_size=chunk_size)
+
+def insert_video_schedule_rows_bulk(rows: list[tuple], chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> list[tuple]:
+    """Like insert_video_schedules_bulk, for rows already in VIDEO_SCHEDULE_COLUMNS order."""
+    query = f"""
+    INSERT INTO video_schedule ({", ".join(VIDEO_SCHEDULE_COLUMNS)})
+    VALUES %s
+    ON CONFLICT (video_id) DO NOTHING
+    RETURNING video_id;
+    """
+    keys = [row[0] for row in rows]
+    return execute_bulk(query, rows, keys, chunk_size=chunk_size)
+
+def fetch_channel_handles(handles: list[str]) -> dict[str, tuple]:
+    """Returns ``(channel_id, resolved_at)`` for every cached handle; channel_id is None for unknown handles."""
+    if not handles:
+        return {}
+    query = """
+    SELECT handle, channel_id, resolved_at
+    FROM channel_handles
+    WHERE handle = ANY(%s);
+    """
+    rows = execute_query(query, (list(handles),), fetch=True)
+    return {handle: (channel_id, resolved_at) for handle, channel_id, resolved_at in rows}
+
+def upsert_channel_handles(rows: list[tuple]):
+    """Stores ``(handle, channel_id, resolved_at)`` rows, replacing earlier resolutions."""
+    if not rows:
+        return
+    query = """
+    INSERT INTO channel_handles (handle, channel_id, resolved_at)
+    VALUES %s
+    ON CONFLICT (handle) DO UPDATE
+    SET channel_id = EXCLUDED.channel_id, resolved_at = EXCLUDED.resolved_at;
+    """
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            _execute_values(cur, query, rows)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise RuntimeError(f"Database query failed: {e}")
+    finally:
+        release_conn(conn)
+
+def count_video_samples_due_before(before) -> int:
+    """Number of tracked videos whose next stats sample falls before ``before`` (naive UTC)."""
+    query = """
+    SELECT COUNT(*)
+    FROM video_schedule
+    WHERE next_sample_at < %s;
+    """
+    return execute_query(query, (before,), fetch=True)[0][0]
+
+def enqueue_channel_backfills(channel_ids: list[str] = None, restart: bool = False) -> int:
+    """
+    Queues channels for a full upload-history backfill: the given ones, or every
+    active channel that was never queued. Channels already queued keep their
+    progress unless ``restart`` is set.
+
+    Returns:
+        int: Number of channels queued or restarted.
+    """
+    if channel_ids is None:
+        query = """
+        INSERT INTO channel_backfills (channel_id)
+        SELECT c.id
+        FROM channels c
+        WHERE c.is_active = TRUE
+          AND NOT EXISTS (SELECT 1 FROM channel_backfills b WHERE b.channel_id = c.id)
+        RETURNING channel_id;
+        """
+        return len(execute_query(query, fetch=True))
+    if not channel_ids:
+        return 0
+
+    on_conflict = """
+    DO UPDATE SET status = 'pending', page_token = NULL, pages_fetched = 0, videos_inserted = 0,
+        error = NULL, queued_at = NOW(), updated_at = NOW(), completed_at = NULL
+    """ if restart else "DO NOTHING"
+    query = f"""
+    INSERT INTO channel_backfills (channel_id)
+    SELECT id FROM channels WHERE id = ANY(%s)
+    ON CONFLICT (channel_id) {on_conflict}
+    RETURNING channel_id;
+    """
+    return len(execute_query(query, (list(channel_ids),), fetch=True))
+
+def retry_failed_channel_backfills() -> int:
+    """Puts failed backfills back in the queue, from the page they failed on."""
+    query = """
+    UPDATE channel_backfills
+    SET status = 'pending', error = NULL, updated_at = NOW()
+    WHERE status = 'failed'
+    RETURNING channel_id;
+    """
+    return len(execute_query(query, fetch=True))
+
+def iter_pending_channel_backfills(chunk_size: int = 1000):
+    """
+    Yields chunks of ``(channel_id, uploads_playlist_id, page_token)`` for queued
+    backfills, oldest first; the playlist may be None.
+    """
+    query = """
+    SELECT b.channel_id, c.uploads_playlist_id, b.page_token, b.queued_at
+    FROM channel_backfills b
+    JOIN channels c ON c.id = b.channel_id
+    WHERE b.status = 'pending' AND (b.queued_at, b.channel_id) > (%s, %s)
+    ORDER BY b.queued_at, b.channel_id
+    LIMIT %s;
+    """
+    last_key = (datetime.min, "")
+    while True:
+        rows = execute_query(query, (*last_key, chunk_size), fetch=True)
+        if not rows:
+            return
+        yield [row[:3] for row in rows]
+        if len(rows) < chunk_size:
+            return
+        last_key = (rows[-1][3], rows[-1][0])
+
+def update_channel_backfill_progress(channel_id: str, page_token: str, pages: int, videos: int):
+    """Records stored pages: the next page to fetch and the pages and videos added."""
+    query = """
+    UPDATE channel_backfills
+    SET page_token = %s, pages_fetched = pages_fetched + %s, videos_inserted = videos_inserted + %s,
+        updated_at = NOW()
+    WHERE channel_id = %s;
+    """
+    execute_query(query, (page_token, pages, videos, channel_id))
+
+def finish_channel_backfill(channel_id: str, status: str, error: str = None):
+    query = """
+    UPDATE channel_backfills
+    SET status = %s, error = %s, updated_at = NOW(),
+        completed_at = CASE WHEN %s = 'completed' THEN NOW() ELSE completed_at END
+    WHERE channel_id = %s;
+    """
+    execute_query(query, (status, error, status, channel_id))
+
+def fetch_quota_usage(key_ids: list[str], quota_day) -> dict[str, tuple[int, bool]]:
+    query = """
+    SELECT key_id, units_used, exhausted
+    FROM api_quota_usage
+    WHERE key_id = ANY(%s) AND quota_day = %s;
+    """
+    rows = execute_query(query, (list(key_ids), quota_day), fetch=True)
+    return {key_id: (units_used, exhausted) for key_id, units_used, exhausted in rows}
+
+def reserve_quota_units(key_id: str, quota_day, units: int, limit: int = None):
+    """
+    Atomically adds ``units`` to a key's usage for the day.
+
+    With a ``limit`` the reservation only succeeds if the key is not exhausted and
+    the new total stays within the limit; without one it always succeeds.
+
+    Returns:
+        int: The key's new usage, or None if the reservation was refused.
+    """
+    if limit is not None and units > limit:
+        return None
+
+    query = """
+    INSERT INTO api_quota_usage (key_id, quota_day, units_used)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (key_id, quota_day) DO UPDATE
+    SET
+        units_used = api_quota_usage.units_used + EXCLUDED.units_used,
+        updated_at = NOW()
+    WHERE %s::int IS NULL
+        OR (NOT api_quota_usage.exhausted AND api_quota_usage.units_used + EXCLUDED.units_used <= %s::int)
+    RETURNING units_used;
+    """
+    result = execute_query(query, (key_id, quota_day, units, limit, limit), fetch=True)
+    return result[0][0] if result else None
+
+def release_quota_units(key_id: str, quota_day, units: int):
+    query = """
+    UPDATE api_quota_usage
+    SET units_used = GREATEST(units_used - %s, 0), updated_at = NOW()
+    WHERE key_id = %s AND quota_day = %s;
+    """
+    execute_query(query, (units, key_id, quota_day))
+
+def mark_quota_key_exhausted(key_id: str, quota_day):
+    query = """
+    INSERT INTO api_quota_usage (key_id, quota_day, exhausted)
+    VALUES (%s, %s, TRUE)
+    ON CONFLICT (key_id, quota_day) DO UPDATE
+    SET exhausted = TRUE, updated_at = NOW();
+    """
+    execute_query(query, (key_id, quota_day))
+
+def create_job_run(job_name: str, state: dict) -> int:
+    """Starts a job run and returns its ID; unfinished earlier runs of the job are abandoned."""
+    abandon = """
+    UPDATE job_runs
+    SET status = 'abandoned', updated_at = NOW()
+    WHERE job_name = %s AND status IN ('running', 'failed');
+    """
+    execute_query(abandon, (job_name,))
+
+    query = """
+    INSERT INTO job_runs (job_name, state)
+    VALUES (%s, %s::jsonb)
+    RETURNING id;
+    """
+    return execute_query(query, (job_name, json.dumps(state)), fetch=True)[0][0]
+
+def fetch_resumable_job_run(job_name: str):
+    """Returns ``(run_id, state)`` of the job's latest run if it did not complete, else None."""
+    query = """
+    SELECT id, status, state
+    FROM job_runs
+    WHERE job_name = %s AND status <> 'abandoned'
+    ORDER BY started_at DESC, id DESC
+    LIMIT 1;
+    """
+    rows = execute_query(query, (job_name,), fetch=True)
+    if not rows or rows[0][1] == "completed":
+        return None
+    return rows[0][0], rows[0][2]
+
+def update_job_run(run_id: int, status: str = None, state: dict = None):
+    query = """
+    UPDATE job_runs
+    SET
+        status = COALESCE(%s, status),
+        state = COALESCE(%s::jsonb, state),
+        updated_at = NOW()
+    WHERE id = %s;
+    """
+    execute_query(query, (status, json.dumps(state) if state is not None else None, run_id))
+
+def insert_job_run_items(run_id: int, item_keys: list[str]):
+    if not item_keys:
+        return
+    query = """
+    INSERT INTO job_run_items (run_id, item_key)
+    VALUES %s
+    ON CONFLICT DO NOTHING;
+    """
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            _execute_values(cur, query, [(run_id, key) for key in item_keys], page_size=len(item_keys))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise RuntimeError(f"Database query failed: {e}")
+    finally:
+        release_conn(conn)
+
+def fetch_job_run_items(run_id: int, chunk_size: int = 10_000) -> set[str]:
     query = """
-    SELECT vs.video_id
-    FROM video_schedule vs
-    WHERE vs.bin_id = %s AND vs.current_sample < 31
-    ORDER BY vs.upload_datetime
-    OFFSET %s
+    SELECT item_key
+    FROM job_run_items
+    WHERE run_id = %s AND item_key > %s
+    ORDER BY item_key
     LIMIT %s;
     """
-    return execute_query(query, (bin_id, offset, batch_size), fetch=True)
+    return {row[0] for rows in iterate_keyset(query, (run_id,), chunk_size=chunk_size) for row in rows}
@@ -0,0 +1,270 @@
+# src/db/known_ids.py
+
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from src.db.database_client import iter_video_ids_inserted_after, iter_channel_ids_created_after, \
+    filter_unknown_video_ids, filter_unknown_channel_ids
+
+DEFAULT_DIRECTORY = "data/known_ids"
+DEFAULT_CAPACITY = 10_000_000
+DEFAULT_ERROR_RATE = 0.001
+
+# Rows are re-read this far behind the last synced insertion time: video inserted_at
+# is stamped when a video is mapped, so rows can commit later than their timestamp says
+SYNC_OVERLAP = timedelta(minutes=10)
+
+# The JSON header line is padded to this size, so it can be rewritten in place in
+# front of the memory-mapped bits
+HEADER_SIZE = 4096
+
+# Per kind: the incremental ID scan and the exact check for positive hits
+KINDS = {
+    "videos": (iter_video_ids_inserted_after, filter_unknown_video_ids),
+    "channels": (iter_channel_ids_created_after, filter_unknown_channel_ids),
+}
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over string IDs, sized for ``capacity`` IDs at a
+    false-positive rate of ``error_rate``. Bit positions come from one blake2b
+    digest split into two hashes (Kirsch-Mitzenmacher double hashing).
+    """
+
+    def __init__(self, capacity: int, error_rate: float, bits: bytearray = None, num_hashes: int = None,
+                 count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        if bits is None:
+            # Whole bytes, so the size survives a save and load unchanged
+            num_bytes = max(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2 / 8), 1)
+            bits = bytearray(num_bytes)
+        self.bits = bits
+        self.num_bits = len(bits) * 8
+        self.num_hashes = num_hashes or max(round(self.num_bits / capacity * math.log(2)), 1)
+        # IDs added that were not already (seemingly) present
+        self.count = count
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> bool:
+        """Adds ``item``; returns False if it was (possibly) present already."""
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            byte = self.bits[position >> 3]
+            if not byte & mask:
+                self.bits[position >> 3] = byte | mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class KnownIdsIndex:
+    """
+    On-disk Bloom filter of the video or channel IDs stored in Postgres, so
+    scripts can drop already stored IDs before spending API quota on them.
+
+    ``sync`` adds rows inserted since the last sync, paging on the insertion time,
+    so keeping the index current costs one indexed range scan per run. Misses are
+    certain (the ID is not stored, as of the last sync); hits are confirmed in the
+    database by ``filter_unknown``, so a false positive costs a query, never a video.
+    Once more IDs than ``capacity`` are stored, the filter is rebuilt at twice the size.
+
+    The file is memory-mapped, so a run only reads the pages its lookups touch and
+    ``save`` writes back only the pages that changed, followed by the header.
+
+    Args:
+        kind (str): ``"videos"`` or ``"channels"``.
+        directory (str): Where ``<kind>.bloom`` is kept.
+        capacity (int): IDs the filter is sized for.
+        error_rate (float): Target false-positive rate at ``capacity``.
+    """
+
+    def __init__(self, kind: str, directory: str = DEFAULT_DIRECTORY, capacity: int = DEFAULT_CAPACITY,
+                 error_rate: float = DEFAULT_ERROR_RATE):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown ID kind {kind!r}, expected one of {sorted(KINDS)}")
+        self.kind = kind
+        self.path = os.path.join(directory, f"{kind}.bloom")
+        self._lock = threading.Lock()
+        self._iter_ids, self._filter_unknown = KINDS[kind]
+
+        # Insertion-time key of the last synced row
+        self.synced_through = None
+        # The mapped file and the filter on it; a rebuilt filter is not mapped until saved
+        self._mmap = None
+        self._mapped_bloom = None
+        # Whether anything changed since the filter was loaded
+        self._dirty = False
+        self.bloom = self._load() or BloomFilter(capacity, error_rate)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r+b") as f:
+            header = json.loads(f.readline())
+            offset = f.tell()
+            num_bytes = os.fstat(f.fileno()).st_size - offset
+            if offset != HEADER_SIZE or header.get("kind") != self.kind or num_bytes * 8 != header["num_bits"]:
+                logging.warning(f"[KnownIds] Ignoring unreadable index {self.path}, rebuilding it")
+                return None
+            self._mmap = mmap.mmap(f.fileno(), 0)
+        if header.get("synced_through"):
+            synced_at, synced_id = header["synced_through"]
+            self.synced_through = (datetime.fromisoformat(synced_at), synced_id)
+        bits = memoryview(self._mmap)[HEADER_SIZE:]
+        self._mapped_bloom = BloomFilter(header["capacity"], header["error_rate"], bits, header["num_hashes"],
+                                         header["count"])
+        return self._mapped_bloom
+
+    def sync(self) -> int:
+        """Adds IDs stored since the last sync; returns how many were new to the filter."""
+        if self.bloom.count > self.bloom.capacity:
+            logging.info(f"[KnownIds] {self.kind} index holds {self.bloom.count} IDs, "
+                         f"rebuilding it for {self.bloom.capacity * 2}")
+            with self._lock:
+                self.bloom = BloomFilter(self.bloom.capacity * 2, self.bloom.error_rate)
+                self.synced_through = None
+                self._dirty = True
+
+        start_after = None
+        if self.synced_through is not None:
+            start_after = (self.synced_through[0] - SYNC_OVERLAP, "")
+
+        added = 0
+        for rows in self._iter_ids(start_after):
+            with self._lock:
+                added += sum(self.bloom.add(record_id) for record_id, _ in rows)
+                # Rows are in key order, so the last one is the furthest synced
+                last_id, last_time = rows[-1]
+                if last_time is not None and (self.synced_through is None or last_time > self.synced_through[0]):
+                    self.synced_through = (last_time, last_id)
+                    self._dirty = True
+        if added:
+            self._dirty = True
+        logging.info(f"[KnownIds] Synced {added} new {self.kind} IDs ({self.bloom.count} known)")
+        return added
+
+    def add(self, ids: Iterable[str]):
+        """Records IDs this process has just stored."""
+        with self._lock:
+            for record_id in ids:
+                if self.bloom.add(record_id):
+                    self._dirty = True
+
+    def might_contain(self, record_id: str) -> bool:
+        with self._lock:
+            return record_id in self.bloom
+
+    def filter_unknown(self, ids: list[str]) -> list[str]:
+        """
+        Returns the IDs, in input order, that are not stored yet. IDs the filter has
+        never seen are returned without a query; only hits are checked in the database.
+        """
+        with self._lock:
+            hits = [record_id for record_id in ids if record_id in self.bloom]
+        if not hits:
+            return list(ids)
+        stored = set(hits) - set(self._filter_unknown(hits))
+        return [record_id for record_id in ids if record_id not in stored]
+
+    def save(self):
+        """
+        Writes the filter out if it changed. A mapped filter gets its changed pages
+        flushed, then its header rewritten in place; a new or rebuilt one is written
+        next to a temporary name and swapped in, so a crash never leaves half a file.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            header = self._header()
+            if self._mmap is not None and self.bloom is self._mapped_bloom:
+                # Bits first: the header's synced_through must never get ahead of them
+                self._mmap.flush()
+                self._mmap[:HEADER_SIZE] = header
+                self._mmap.flush(0, HEADER_SIZE)
+                self._dirty = False
+                return
+            bits = bytes(self.bloom.bits)
+            self._dirty = False
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(bits)
+        os.replace(tmp_path, self.path)
+
+    def _header(self) -> bytes:
+        # Caller holds self._lock
+        header = json.dumps({
+            "kind": self.kind,
+            "capacity": self.bloom.capacity,
+            "error_rate": self.bloom.error_rate,
+            "num_bits": self.bloom.num_bits,
+            "num_hashes": self.bloom.num_hashes,
+            "count": self.bloom.count,
+            "synced_through": self.synced_through and [self.synced_through[0].isoformat(), self.synced_through[1]],
+        }).encode()
+        return header.ljust(HEADER_SIZE - 1) + b"\n"
+
+
+class DatabaseKnownIds:
+    """
+    KnownIdsIndex's interface without a local filter, for when no index directory
+    is configured: ``filter_unknown`` asks the database about every ID.
+    """
+
+    def __init__(self, kind: str):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown ID kind {kind!r}, expected one of {sorted(KINDS)}")
+        self.kind = kind
+        self._filter_unknown = KINDS[kind][1]
+
+    def filter_unknown(self, ids: list[str]) -> list[str]:
+        return self._filter_unknown(ids)
+
+    def add(self, ids: Iterable[str]):
+        pass
+
+    def save(self):
+        pass
+
+
+def create_known_ids_index(kind: str, known_ids_config: dict = None):
+    """
+    Builds the ``kind`` index described by ``known_ids`` in config.yaml and syncs it.
+
+    The index is only worth keeping in a directory that survives between runs: a
+    new one is filled from every stored ID first. Without a ``directory`` a
+    DatabaseKnownIds is returned instead.
+    """
+    known_ids_config = known_ids_config or {}
+    directory = known_ids_config.get("directory")
+    if not directory:
+        return DatabaseKnownIds(kind)
+    index = KnownIdsIndex(
+        kind,
+        directory=directory,
+        capacity=known_ids_config.get(f"{kind[:-1]}_capacity", DEFAULT_CAPACITY),
+        error_rate=known_ids_config.get("error_rate", DEFAULT_ERROR_RATE),
+    )
+    index.sync()
+    return index
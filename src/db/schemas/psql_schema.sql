@@ -13,6 +13,23 @@ CREATE TABLE IF NOT EXISTS channels (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- High-water mark of the newest stored upload, where incremental scans stop
+ALTER TABLE channels ADD COLUMN IF NOT EXISTS last_seen_published_at TIMESTAMP;
+ALTER TABLE channels ADD COLUMN IF NOT EXISTS last_seen_video_id TEXT;
+
+-- Activity-based polling (see src/scheduling/channel_polling.py)
+ALTER TABLE channels ADD COLUMN IF NOT EXISTS uploads_per_day REAL; -- Learned from the videos history
+ALTER TABLE channels ADD COLUMN IF NOT EXISTS poll_tier TEXT; -- hourly, daily or weekly
+ALTER TABLE channels ADD COLUMN IF NOT EXISTS next_poll_at TIMESTAMP; -- NULL means due now
+ALTER TABLE channels ADD COLUMN IF NOT EXISTS upload_rate_refreshed_at TIMESTAMP; -- When uploads_per_day was last recomputed
+
+-- Channel handles resolved through the API (see src/api/handle_cache.py); channel_id NULL means no such channel
+CREATE TABLE IF NOT EXISTS channel_handles (
+    handle TEXT PRIMARY KEY, -- Lowercased, with the leading "@"
+    channel_id TEXT,
+    resolved_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
 -- Videos Table
 CREATE TABLE IF NOT EXISTS videos (
     id TEXT PRIMARY KEY,
@@ -38,6 +55,15 @@ CREATE TABLE IF NOT EXISTS videos (
     inserted_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Upload cadence per channel
+CREATE INDEX IF NOT EXISTS idx_videos_channel_published ON videos (channel_id, published_at);
+
+-- Incremental known-ID syncs (see src/db/known_ids.py) page on insertion time
+UPDATE videos SET inserted_at = NOW() AT TIME ZONE 'UTC' WHERE inserted_at IS NULL;
+UPDATE channels SET created_at = NOW() AT TIME ZONE 'UTC' WHERE created_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_videos_inserted ON videos (inserted_at, id);
+CREATE INDEX IF NOT EXISTS idx_channels_created ON channels (created_at, id);
+
 -- Video Scheduling Metadata Table
 CREATE TABLE IF NOT EXISTS video_schedule (
     video_id TEXT PRIMARY KEY REFERENCES videos(id),
@@ -46,6 +72,19 @@ CREATE TABLE IF NOT EXISTS video_schedule (
     bin_id INT -- Used for bin-based sampling rotation
 );
 
+-- Adaptive sampling state (see src/scheduling/sampling_scheduler.py)
+ALTER TABLE video_schedule ADD COLUMN IF NOT EXISTS next_sample_at TIMESTAMP; -- NULL once sampling has ended
+ALTER TABLE video_schedule ADD COLUMN IF NOT EXISTS last_sampled_at TIMESTAMP;
+ALTER TABLE video_schedule ADD COLUMN IF NOT EXISTS last_view_count BIGINT;
+
+-- Due-video scans (WHERE next_sample_at <= ? ORDER BY next_sample_at, video_id)
+CREATE INDEX IF NOT EXISTS idx_video_schedule_next_sample ON video_schedule (next_sample_at, video_id);
+
+-- Videos scheduled before adaptive sampling are due right away
+UPDATE video_schedule
+SET next_sample_at = NOW() AT TIME ZONE 'UTC'
+WHERE next_sample_at IS NULL AND last_sampled_at IS NULL AND current_sample < 31;
+
 -- Config Table (singleton config)
 CREATE TABLE IF NOT EXISTS config (
     key TEXT PRIMARY KEY,
@@ -56,3 +95,47 @@ CREATE TABLE IF NOT EXISTS config (
 INSERT INTO config (key, value)
 VALUES ('current_bin_id', '0')
 ON CONFLICT (key) DO NOTHING;
+
+-- YouTube API quota usage per key and quota day (shared by all script processes)
+CREATE TABLE IF NOT EXISTS api_quota_usage (
+    key_id TEXT, -- Fingerprint of the API key, never the key itself
+    quota_day DATE, -- Day in Pacific time, when the API quota resets
+    units_used INT DEFAULT 0,
+    exhausted BOOLEAN DEFAULT FALSE,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (key_id, quota_day)
+);
+
+-- Script runs and their progress, so an interrupted run can be resumed (--resume)
+CREATE TABLE IF NOT EXISTS job_runs (
+    id BIGSERIAL PRIMARY KEY,
+    job_name TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running', -- running, completed, failed or abandoned
+    state JSONB NOT NULL DEFAULT '{}', -- Job-specific cursors and counters
+    started_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_job_started ON job_runs (job_name, started_at);
+
+-- Work items (e.g. channels) a job run has finished
+CREATE TABLE IF NOT EXISTS job_run_items (
+    run_id BIGINT REFERENCES job_runs(id) ON DELETE CASCADE,
+    item_key TEXT,
+    PRIMARY KEY (run_id, item_key)
+);
+
+-- Full upload-history backfills (scripts/backfill_channels.py), resumable across days
+CREATE TABLE IF NOT EXISTS channel_backfills (
+    channel_id TEXT PRIMARY KEY REFERENCES channels(id),
+    status TEXT NOT NULL DEFAULT 'pending', -- pending, completed or failed
+    page_token TEXT, -- Next uploads playlist page to fetch; NULL starts at the newest upload
+    pages_fetched INT NOT NULL DEFAULT 0,
+    videos_inserted INT NOT NULL DEFAULT 0,
+    error TEXT,
+    queued_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    completed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_channel_backfills_status ON channel_backfills (status, queued_at);
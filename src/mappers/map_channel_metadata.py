@@ -2,6 +2,17 @@
 
 from datetime import datetime
 
+# Response fields map_channel_metadata reads; GetChannelDataByHandleOrId requests exactly these (see src/api/fields.py)
+CHANNEL_METADATA_FIELDS = (
+    "id",
+    "snippet/title",
+    "snippet/customUrl",
+    "snippet/country",
+    "contentDetails/relatedPlaylists/uploads",
+    "statistics/viewCount",
+    "statistics/subscriberCount",
+)
+
 
 def map_channel_metadata(channel: dict) -> dict:
     snippet = channel.get("snippet", {})
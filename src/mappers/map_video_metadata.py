@@ -2,6 +2,30 @@
 
 from datetime import datetime
 
+# Response fields map_video_metadata reads; GetVideoDetails requests exactly these (see src/api/fields.py)
+VIDEO_METADATA_FIELDS = (
+    "id",
+    "snippet/publishedAt",
+    "snippet/channelId",
+    "snippet/title",
+    "snippet/description",
+    "snippet/localized/title",
+    "snippet/localized/description",
+    "snippet/thumbnails/default/url",
+    "snippet/thumbnails/medium/url",
+    "snippet/thumbnails/high/url",
+    "snippet/tags",
+    "snippet/categoryId",
+    "snippet/liveBroadcastContent",
+    "snippet/defaultLanguage",
+    "snippet/defaultAudioLanguage",
+    "contentDetails/duration",
+    "statistics/viewCount",
+    "statistics/likeCount",
+    "statistics/favoriteCount",
+    "statistics/commentCount",
+)
+
 
 def map_video_metadata(video: dict) -> dict:
     snippet = video.get("snippet", {})
@@ -35,10 +59,12 @@ def map_video_metadata(video: dict) -> dict:
         "inserted_at": datetime.utcnow()
     }
 
-def map_video_schedule_metadata(video_id: str, upload_datetime: datetime, current_sample: int = 0, bin_id: int = None) -> dict:
+def map_video_schedule_metadata(video_id: str, upload_datetime: datetime, current_sample: int = 0, bin_id: int = None,
+                                next_sample_at: datetime = None) -> dict:
     return {
         "video_id": video_id,
         "upload_datetime": upload_datetime,
         "current_sample": current_sample,
-        "bin_id": bin_id
+        "bin_id": bin_id,
+        "next_sample_at": next_sample_at
     }
@@ -0,0 +1,77 @@
+# src/mappers/map_video_stats.py
+
+from array import array
+from typing import Iterable, Iterator
+
+# Response fields map_video_stats_snapshot and VideoStatsBatch read; GetVideoStatsSnapshot requests exactly these (see src/api/fields.py)
+VIDEO_STATS_FIELDS = (
+    "id",
+    "statistics/viewCount",
+    "statistics/likeCount",
+    "statistics/favoriteCount",
+    "statistics/commentCount",
+)
+
+
+def map_video_stats_snapshot(video: dict) -> dict:
+    statistics = video.get("statistics", {})
+
+    return {
+        "video_id": video.get("id"),
+        "view_count": int(statistics.get("viewCount", 0)),
+        "likes_count": int(statistics.get("likeCount", 0)),
+        "favourite_count": int(statistics.get("favoriteCount", 0)),
+        "comment_count": int(statistics.get("commentCount", 0)),
+    }
+
+
+class VideoStatsBatch:
+    """
+    Columnar batch of stats snapshots: one list of video IDs and one packed
+    64-bit integer column per counter, instead of a nested dict per video.
+
+    Pages of GetVideoStatsSnapshot are parsed straight into the columns with
+    ``extend_items``, so the raw response items can be freed page by page.
+    Counters the API hides (e.g. disabled likes) are stored as 0, as in
+    map_video_stats_snapshot.
+    """
+
+    __slots__ = ("video_ids", "view_counts", "like_counts", "favourite_counts", "comment_counts", "_positions")
+
+    def __init__(self):
+        self.video_ids = []
+        self.view_counts = array("q")
+        self.like_counts = array("q")
+        self.favourite_counts = array("q")
+        self.comment_counts = array("q")
+        self._positions = None
+
+    @classmethod
+    def from_items(cls, items: Iterable[dict]):
+        batch = cls()
+        batch.extend_items(items)
+        return batch
+
+    def extend_items(self, items: Iterable[dict]):
+        """Appends raw ``videos.list`` items (``id`` and ``statistics``)."""
+        for item in items:
+            statistics = item.get("statistics", {})
+            self.video_ids.append(item.get("id"))
+            self.view_counts.append(int(statistics.get("viewCount", 0)))
+            self.like_counts.append(int(statistics.get("likeCount", 0)))
+            self.favourite_counts.append(int(statistics.get("favoriteCount", 0)))
+            self.comment_counts.append(int(statistics.get("commentCount", 0)))
+        self._positions = None
+
+    def __len__(self) -> int:
+        return len(self.video_ids)
+
+    def position(self, video_id: str):
+        """Row of ``video_id`` in the batch (the last one if listed twice), or None."""
+        if self._positions is None:
+            self._positions = {video_id: i for i, video_id in enumerate(self.video_ids)}
+        return self._positions.get(video_id)
+
+    def rows(self) -> Iterator[tuple]:
+        """Yields ``(video_id, view_count, likes_count, favourite_count, comment_count)`` per video."""
+        return zip(self.video_ids, self.view_counts, self.like_counts, self.favourite_counts, self.comment_counts)
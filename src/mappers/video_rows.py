@@ -0,0 +1,85 @@
+# src/mappers/video_rows.py
+
+import json
+
+from dateutil import parser
+
+from src.mappers.map_video_metadata import map_video_metadata, map_video_schedule_metadata
+from src.scheduling.sampling_scheduler import SamplingScheduler
+
+
+def map_video_page(videos: list[dict], scheduler: SamplingScheduler, video_columns: tuple,
+                   schedule_columns: tuple) -> tuple[list[tuple], list[tuple]]:
+    """
+    Maps a page of ``videos.list`` items to insert rows.
+
+    Args:
+        videos (list[dict]): ``videos.list`` items.
+        scheduler (SamplingScheduler): Sets each video's first stats sample.
+        video_columns (tuple): Column order of the video rows (the table's VIDEO_COLUMNS).
+        schedule_columns (tuple): Column order of the schedule rows (VIDEO_SCHEDULE_COLUMNS).
+
+    Returns:
+        tuple: ``(rows, failures)``. ``rows`` holds a ``(video_row, schedule_row)`` pair
+        per video; ``schedule_row`` is None for videos without a publish time.
+        ``failures`` holds ``(video_id, error)`` for items that could not be mapped.
+    """
+    rows = []
+    failures = []
+    for video in videos:
+        try:
+            video_record = map_video_metadata(video)
+            published_at = video_record["published_at"]
+            upload_datetime = parser.isoparse(published_at) if published_at else None
+
+            schedule_row = None
+            if upload_datetime:
+                # bin_id is the hour of the upload time (0-23)
+                schedule_record = map_video_schedule_metadata(
+                    video_id=video_record["id"],
+                    upload_datetime=upload_datetime,
+                    current_sample=0,
+                    bin_id=upload_datetime.hour,
+                    next_sample_at=scheduler.first_sample_at(upload_datetime)
+                )
+                schedule_row = tuple(schedule_record[column] for column in schedule_columns)
+            rows.append((tuple(video_record[column] for column in video_columns), schedule_row))
+        except Exception as e:
+            failures.append((video.get("id"), repr(e)))
+    return rows, failures
+
+
+def map_video_responses(bodies: list[bytes], scheduler: SamplingScheduler, video_columns: tuple,
+                        schedule_columns: tuple) -> tuple[list[tuple], list[tuple]]:
+    """Like map_video_page, for undecoded ``videos.list`` response bodies (see GetVideoDetails ``raw``)."""
+    rows = []
+    failures = []
+    for body in bodies:
+        page_rows, page_failures = map_video_page(
+            json.loads(body).get("items", []), scheduler, video_columns, schedule_columns
+        )
+        rows.extend(page_rows)
+        failures.extend(page_failures)
+    return rows, failures
+
+
+class VideoPageMapper:
+    """
+    Maps pages of video items to insert rows (see map_video_page) in a fixed column order.
+
+    Args:
+        video_columns (tuple): Column order of the video rows.
+        schedule_columns (tuple): Column order of the schedule rows.
+        sampling_config (dict): The ``stats_sampling`` section of config.yaml.
+    """
+
+    def __init__(self, video_columns: tuple, schedule_columns: tuple, sampling_config: dict = None):
+        self.video_columns = video_columns
+        self.schedule_columns = schedule_columns
+        self.scheduler = SamplingScheduler(sampling_config)
+
+    def map_page(self, videos: list[dict]) -> tuple[list[tuple], list[tuple]]:
+        return map_video_page(videos, self.scheduler, self.video_columns, self.schedule_columns)
+
+    def map_responses(self, bodies: list[bytes]) -> tuple[list[tuple], list[tuple]]:
+        return map_video_responses(bodies, self.scheduler, self.video_columns, self.schedule_columns)
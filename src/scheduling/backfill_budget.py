@@ -0,0 +1,69 @@
+# src/scheduling/backfill_budget.py
+
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.api.quota_manager import YouTubeQuotaManager, quota_day, QUOTA_TIMEZONE
+from src.api.requests.get_video_stats_snapshot import GetVideoStatsSnapshot
+from src.db.database_client import count_video_samples_due_before
+from src.utils.timestamps import to_naive_utc
+
+
+class BackfillBudget:
+    """
+    How much quota a backfill may spend today without starving the other jobs.
+
+    The backfill takes everything above a reserve: ``reserve_units`` for the
+    upload polls, plus what the hourly stats job needs for the videos due before
+    the quota resets (one unit per 50 videos). Quota left and the reserve are
+    re-read from the shared ledger every ``REFRESH_SECONDS``, so whatever the
+    other jobs spend meanwhile comes out of the backfill's share, not theirs.
+    ``max_units`` optionally caps a single run.
+
+    Args:
+        quota_manager (YouTubeQuotaManager): The backfill's quota manager.
+        backfill_config (dict): The ``backfill`` section of config.yaml.
+        max_units (int): Cap on the units this run spends, None for no cap.
+    """
+
+    REFRESH_SECONDS = 60
+
+    def __init__(self, quota_manager: YouTubeQuotaManager, backfill_config: dict = None, max_units: int = None):
+        backfill_config = backfill_config or {}
+        self.qm = quota_manager
+        self.reserve_units = backfill_config.get("reserve_units", 1000)
+        self.max_units = max_units if max_units is not None else backfill_config.get("max_units_per_run")
+        self.reserve = 0
+        self._start_spent = quota_manager.total_quota
+        self._available = 0
+        self._spent_at_refresh = 0
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, now: datetime = None):
+        """Re-reads the quota left across keys and the stats job's needs until the reset."""
+        now = now or datetime.now(timezone.utc)
+        reset = datetime.combine(quota_day(now) + timedelta(days=1), datetime.min.time(), tzinfo=QUOTA_TIMEZONE)
+        due_samples = count_video_samples_due_before(to_naive_utc(reset))
+        reserve = self.reserve_units + math.ceil(due_samples / GetVideoStatsSnapshot.MAX_IDS_PER_REQUEST)
+        remaining = self.qm.remaining_units()
+        with self._lock:
+            self.reserve = reserve
+            self._available = remaining - reserve
+            self._spent_at_refresh = self.qm.total_quota
+            self._refreshed_at = time.monotonic()
+
+    def spent(self) -> int:
+        """Units this run has spent so far."""
+        return self.qm.total_quota - self._start_spent
+
+    def allows(self, units: int) -> bool:
+        """Whether the backfill may spend ``units`` more now."""
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.REFRESH_SECONDS:
+            self.refresh()
+        if self.max_units is not None and self.spent() + units > self.max_units:
+            return False
+        with self._lock:
+            return self._available - (self.qm.total_quota - self._spent_at_refresh) >= units
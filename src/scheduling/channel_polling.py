@@ -0,0 +1,111 @@
+# src/scheduling/channel_polling.py
+
+import heapq
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from src.utils.timestamps import to_naive_utc
+
+TIER_HOURLY = "hourly"
+TIER_DAILY = "daily"
+TIER_WEEKLY = "weekly"
+
+TIER_INTERVAL_HOURS = {
+    TIER_HOURLY: 1,
+    TIER_DAILY: 24,
+    TIER_WEEKLY: 168,
+}
+
+
+class ChannelPollingPlanner:
+    """
+    Decides which channels a fetch_new_uploads run scans, from each channel's
+    upload cadence (``uploads_per_day``, learned from the videos history).
+
+    Channels uploading at least ``hourly_min_uploads_per_day`` are polled hourly,
+    at least ``daily_min_uploads_per_day`` daily, the rest weekly. Of the channels
+    that are due, the run takes those with the most expected new uploads per quota
+    unit first, up to the run's budget. Channels never polled yet (no poll tier,
+    e.g. newly imported) come first and start out hourly. Upload rates are
+    recomputed for due channels and otherwise every ``rate_refresh_hours``.
+
+    Timestamps passed to and returned for the database are naive UTC.
+
+    Args:
+        polling_config (dict): The ``channel_polling`` section of config.yaml.
+    """
+
+    # Quota units of one scan: one playlistItems.list page, plus a share of a
+    # 50-channel channels.list call when the uploads playlist is not stored yet
+    SCAN_UNITS = 1
+    RESOLVE_UNITS = 1 / 50
+
+    JITTER = 0.1
+
+    def __init__(self, polling_config: dict = None):
+        polling_config = polling_config or {}
+        self.history_days = polling_config.get("history_days", 90)
+        self.hourly_min_uploads_per_day = polling_config.get("hourly_min_uploads_per_day", 1.0)
+        self.daily_min_uploads_per_day = polling_config.get("daily_min_uploads_per_day", 1 / 7)
+        self.quota_share = polling_config.get("quota_share", 0.5)
+        self.rate_refresh_hours = polling_config.get("rate_refresh_hours", 24)
+
+    def tier(self, uploads_per_day: float) -> str:
+        if uploads_per_day is None or uploads_per_day >= self.hourly_min_uploads_per_day:
+            return TIER_HOURLY
+        if uploads_per_day >= self.daily_min_uploads_per_day:
+            return TIER_DAILY
+        return TIER_WEEKLY
+
+    def next_poll(self, uploads_per_day: float, now: datetime) -> tuple[str, datetime]:
+        """Returns ``(tier, next_poll_at)`` for a channel polled at ``now``."""
+        tier = self.tier(uploads_per_day)
+        hours = TIER_INTERVAL_HOURS[tier] * (1 + random.uniform(-self.JITTER, self.JITTER))
+        return tier, to_naive_utc(now) + timedelta(hours=hours)
+
+    def priority(self, uploads_per_day: float, last_checked_at: datetime, has_playlist: bool,
+                 now: datetime, polled: bool = True) -> float:
+        """
+        Expected new uploads per quota unit if the channel is scanned at ``now``;
+        infinite for channels never polled or without an upload rate yet.
+        """
+        if not polled or uploads_per_day is None:
+            return math.inf
+        if last_checked_at is None:
+            hours_since_check = self.history_days * 24
+        else:
+            hours_since_check = max((to_naive_utc(now) - last_checked_at).total_seconds() / 3600, 0)
+        expected_uploads = uploads_per_day * hours_since_check / 24
+        units = self.SCAN_UNITS + (0 if has_playlist else self.RESOLVE_UNITS)
+        return expected_uploads / units
+
+    def channel_budget(self, remaining_units: int) -> int:
+        """How many channels this run may scan given the quota left today."""
+        return int(remaining_units * self.quota_share / self.SCAN_UNITS)
+
+    def plan(self, due_channels: Iterable[tuple], budget: int, now: datetime = None) -> list[tuple]:
+        """
+        Picks up to ``budget`` channels from ``due_channels`` (rows from
+        iter_due_channels), highest priority first. Only ``budget`` rows are kept
+        in memory however many channels are due.
+        """
+        now = now or datetime.now(timezone.utc)
+        if budget <= 0:
+            return []
+
+        # Min-heap of the best ``budget`` channels seen so far; the sequence number breaks ties
+        heap = []
+        for sequence, channel in enumerate(due_channels):
+            _, playlist_id, _, _, uploads_per_day, last_checked_at, poll_tier = channel
+            priority = self.priority(uploads_per_day, last_checked_at, bool(playlist_id), now,
+                                     polled=poll_tier is not None)
+            entry = (priority, -sequence, channel)
+            if len(heap) < budget:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        return [channel for _, _, channel in sorted(heap, reverse=True)]
+
@@ -0,0 +1,77 @@
+# src/scheduling/checkpoint.py
+
+import logging
+import threading
+from typing import Iterable
+
+from src.db.database_client import create_job_run, fetch_resumable_job_run, update_job_run, \
+    insert_job_run_items, fetch_job_run_items
+
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+class JobCheckpoint:
+    """
+    Progress of one script run, stored in the ``job_runs`` and ``job_run_items``
+    tables so an interrupted run can be picked up again with ``--resume``.
+
+    ``state`` holds the job's cursors and counters (anything JSON-serializable) and
+    is saved whenever the job calls ``save``; ``done`` holds the keys of finished
+    work items (e.g. channel IDs), recorded as they finish. A resumed run gets both
+    back and skips what is already done, so no quota is spent on it twice.
+
+    Starting a run without ``resume`` abandons any unfinished run of the same job.
+    """
+
+    def __init__(self, job_name: str, run_id: int, state: dict = None, done: set = None, resumed: bool = False):
+        self.job_name = job_name
+        self.run_id = run_id
+        self.state = state or {}
+        self.done = done or set()
+        self.resumed = resumed
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls, job_name: str, resume: bool = False, state: dict = None):
+        """
+        Resumes the job's last unfinished run if ``resume`` is set and there is one,
+        otherwise starts a new run with the given initial ``state``.
+        """
+        if resume:
+            previous = fetch_resumable_job_run(job_name)
+            if previous is not None:
+                run_id, previous_state = previous
+                done = fetch_job_run_items(run_id)
+                logging.info(f"[Checkpoint] Resuming {job_name} run {run_id} ({len(done)} items already done)")
+                return cls(job_name, run_id, previous_state, done, resumed=True)
+            logging.info(f"[Checkpoint] No unfinished {job_name} run to resume, starting a new one")
+
+        state = state or {}
+        return cls(job_name, create_job_run(job_name, state), state)
+
+    def is_done(self, key: str) -> bool:
+        with self._lock:
+            return key in self.done
+
+    def mark_done(self, keys: Iterable[str]):
+        """Records finished work items; call it once their results are stored."""
+        keys = [key for key in keys if key not in self.done]
+        if not keys:
+            return
+        insert_job_run_items(self.run_id, keys)
+        with self._lock:
+            self.done.update(keys)
+
+    def save(self, **state):
+        """Merges ``state`` into the run's state and stores it."""
+        with self._lock:
+            self.state.update(state)
+            snapshot = dict(self.state)
+        update_job_run(self.run_id, state=snapshot)
+
+    def complete(self):
+        update_job_run(self.run_id, status=STATUS_COMPLETED)
+
+    def fail(self):
+        update_job_run(self.run_id, status=STATUS_FAILED)
@@ -0,0 +1,89 @@
+# src/scheduling/sampling_scheduler.py
+
+import random
+from datetime import datetime, timedelta, timezone
+
+from src.api.quota_manager import quota_day, QUOTA_TIMEZONE
+from src.api.requests.get_video_stats_snapshot import GetVideoStatsSnapshot
+from src.utils.timestamps import to_naive_utc
+
+
+class SamplingScheduler:
+    """
+    Decides when each tracked video is sampled next and how many videos an hourly
+    run may sample.
+
+    A video's base interval grows with its age (hourly while it is fresh, daily
+    once it is a week old). The base is halved while views grow quickly and doubled
+    while they are flat, within ``min_interval_hours`` and ``max_interval_hours``.
+    Sampling stops after ``max_tracking_days``. A little jitter keeps videos
+    uploaded together from staying due in the same hour.
+
+    Each run gets an even share of the quota left until the daily reset: the
+    remaining units times ``quota_share``, divided by the hours left in the quota
+    day, at 50 videos per unit.
+
+    Timestamps passed to and returned for the database are naive UTC, like the
+    rest of the schema.
+
+    Args:
+        sampling_config (dict): The ``stats_sampling`` section of config.yaml.
+    """
+
+    # Base interval (hours) by video age (hours), first match wins
+    AGE_INTERVALS = (
+        (24, 1),
+        (72, 3),
+        (168, 6),
+        (None, 24),
+    )
+
+    # Relative view growth per hour above which sampling speeds up / below which it slows down
+    FAST_GROWTH_PER_HOUR = 0.01
+    FLAT_GROWTH_PER_HOUR = 0.0001
+
+    JITTER = 0.1
+
+    def __init__(self, sampling_config: dict = None):
+        sampling_config = sampling_config or {}
+        self.max_tracking_days = sampling_config.get("max_tracking_days", 31)
+        self.min_interval_hours = sampling_config.get("min_interval_hours", 1)
+        self.max_interval_hours = sampling_config.get("max_interval_hours", 168)
+        self.quota_share = sampling_config.get("quota_share", 0.8)
+
+    def first_sample_at(self, upload_datetime: datetime) -> datetime:
+        """When a newly stored video is first sampled."""
+        return to_naive_utc(upload_datetime) + timedelta(hours=self.min_interval_hours)
+
+    def next_sample_at(self, now: datetime, upload_datetime: datetime, last_sampled_at: datetime,
+                       last_view_count: int, view_count: int):
+        """
+        Returns when the video should be sampled next, or None when tracking ends.
+        """
+        now = to_naive_utc(now)
+        age_hours = (now - to_naive_utc(upload_datetime)).total_seconds() / 3600 if upload_datetime else 0
+        if age_hours >= self.max_tracking_days * 24:
+            return None
+
+        interval = next(hours for max_age, hours in self.AGE_INTERVALS if max_age is None or age_hours < max_age)
+
+        if last_sampled_at is not None and last_view_count is not None:
+            elapsed_hours = max((now - last_sampled_at).total_seconds() / 3600, 1 / 60)
+            growth = (view_count - last_view_count) / max(last_view_count, 1) / elapsed_hours
+            if growth >= self.FAST_GROWTH_PER_HOUR:
+                interval /= 2
+            elif growth <= self.FLAT_GROWTH_PER_HOUR:
+                interval *= 2
+
+        interval = min(max(interval, self.min_interval_hours), self.max_interval_hours)
+        interval *= 1 + random.uniform(-self.JITTER, self.JITTER)
+        return now + timedelta(hours=interval)
+
+    def hourly_video_budget(self, remaining_units: int, now: datetime = None) -> int:
+        """How many videos this run may sample given the quota left today."""
+        now = now or datetime.now(timezone.utc)
+        reset = datetime.combine(quota_day(now) + timedelta(days=1), datetime.min.time(), tzinfo=QUOTA_TIMEZONE)
+        hours_left = max((reset - now).total_seconds() / 3600, 1)
+        units = int(remaining_units * self.quota_share / hours_left)
+        return units * GetVideoStatsSnapshot.MAX_IDS_PER_REQUEST
+
@@ -0,0 +1,14 @@
+# src/utils/iterables.py
+
+from itertools import islice
+from typing import Iterable, Iterator
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Yields lists of up to ``size`` items from any iterable, including generators."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,242 @@
+# src/utils/metrics.py
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Derived in run summaries, name -> (counter, histogram): per series, the counter's value per second spent
+# in the timed calls (summed over threads, so a per-worker rate)
+RATES = {
+    "db_rows_per_second": ("db_statement_rows_total", "db_statement_seconds"),
+    "bigquery_rows_per_second": ("bigquery_rows_total", "bigquery_request_seconds"),
+    "pipeline_items_per_second": ("pipeline_stage_items_total", "pipeline_stage_seconds"),
+}
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (the largest value seen for the last one)."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class MetricsRegistry:
+    """
+    Counters and latency histograms of one script run, keyed by name and labels.
+
+    Disabled by default: every recording method returns at once, so instrumented
+    code only pays for the flag check. Hot paths check ``enabled`` themselves
+    before they take timestamps or build labels.
+
+    ``current_stage()`` names what the calling thread is working on, as set with
+    ``stage()`` (Pipeline workers run inside their stage's name), or the job name
+    outside any stage; series labelled with it, like quota units, add up per stage.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.job = None
+        self.started_at = None
+        self._started = None
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def configure(self, job: str, enabled: bool = True):
+        """Starts a run of ``job``, dropping anything recorded before."""
+        with self._lock:
+            self.job = job
+            self.enabled = enabled
+            self.started_at = datetime.now(timezone.utc)
+            self._started = time.monotonic()
+            self._counters = {}
+            self._histograms = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: tuple = LATENCY_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Attributes what the calling thread records inside the block to stage ``name``."""
+        previous = getattr(self._local, "stage", None)
+        self._local.stage = name
+        try:
+            yield
+        finally:
+            self._local.stage = previous
+
+    def current_stage(self) -> str:
+        return getattr(self._local, "stage", None) or self.job or "main"
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started if self.started_at else 0.0
+
+    def to_prometheus(self) -> str:
+        """Everything recorded so far in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            lines = []
+            typed = set()
+            for (name, labels), value in counters:
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in histograms:
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """
+        The run as a JSON-serializable dict: counters with their per-second rate
+        over the run, histograms with count, sum, mean, max, p50 and p95 (bucket
+        bounds), and the RATES derived from both.
+        """
+        seconds = self.elapsed()
+        with self._lock:
+            counters = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "value": value,
+                    "per_second": value / seconds if seconds else 0.0,
+                })
+            histograms = {}
+            for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                histograms.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                    "max": histogram.max,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                })
+            rates = {}
+            for rate_name, (counter_name, histogram_name) in RATES.items():
+                for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    value = self._counters.get((counter_name, labels))
+                    if name == histogram_name and value is not None and histogram.sum:
+                        series = "/".join(str(label) for _, label in labels) or "all"
+                        rates.setdefault(rate_name, {})[series] = value / histogram.sum
+
+        return {
+            "job": self.job,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "seconds": seconds,
+            "counters": counters,
+            "histograms": histograms,
+            "rates": rates,
+        }
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# The process-wide registry the instrumented modules record into
+metrics = MetricsRegistry()
+
+
+def configure_metrics(job: str, metrics_config: dict = None):
+    """Enables the registry for a run of ``job`` if the ``metrics`` section of config.yaml asks for it."""
+    metrics_config = metrics_config or {}
+    metrics.configure(job, enabled=metrics_config.get("enabled", False))
+
+
+def write_run_metrics(metrics_config: dict = None) -> list[str]:
+    """
+    Writes the run's metrics to ``directory`` at the end of a script: ``<job>.prom``
+    for node_exporter's textfile collector (replaced atomically on every run) and
+    a ``<job>-<start time>.json`` run summary, as enabled in the ``metrics``
+    section. Returns the paths written; nothing is written while disabled.
+    """
+    metrics_config = metrics_config or {}
+    if not metrics.enabled:
+        return []
+
+    directory = metrics_config.get("directory", "data/metrics")
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    try:
+        if metrics_config.get("prometheus", True):
+            path = os.path.join(directory, f"{metrics.job}.prom")
+            _write_atomically(path, metrics.to_prometheus())
+            paths.append(path)
+        if metrics_config.get("json_summary", True):
+            path = os.path.join(directory, f"{metrics.job}-{metrics.started_at:%Y%m%dT%H%M%SZ}.json")
+            _write_atomically(path, json.dumps(metrics.summary(), indent=2))
+            paths.append(path)
+    except OSError as e:
+        logging.error(f"Failed to write run metrics to {directory}: {e}")
+    return paths
+
+
+def _write_atomically(path: str, content: str):
+    # Scrapers must never see a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
@@ -0,0 +1,195 @@
+# src/utils/pipeline.py
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterable
+
+from src.utils.metrics import metrics
+
+# End-of-input marker passed down the queues, one per worker of the receiving stage
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a Pipeline.
+
+    ``fn`` is called with each input item (or, with ``batch_size``, with lists of up
+    to that many items) and returns an iterable of items for the next stage, or
+    None. An exception fails that item only: it is handed to ``on_error`` (logged
+    by default) and the stage carries on with the next one. Anything else that
+    escapes ``fn`` (e.g. KeyboardInterrupt) stops the whole pipeline.
+
+    Args:
+        name (str): Stage name, used in thread names, logs and stats.
+        fn (Callable): The work done per item or batch.
+        workers (int): Threads running ``fn`` concurrently.
+        batch_size (int): Collect this many items per ``fn`` call; the remainder is
+            flushed when the input ends.
+        on_error (Callable): Called with ``(item_or_batch, exception)`` on failure.
+    """
+
+    def __init__(self, name: str, fn: Callable, workers: int = 1, batch_size: int = None,
+                 on_error: Callable = None):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.batch_size = batch_size
+        self.on_error = on_error
+
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        # Time spent in fn, summed over the stage's workers
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _count(self, items_in: int = 0, items_out: int = 0, errors: int = 0, seconds: float = 0.0):
+        with self._lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.errors += errors
+            self.seconds += seconds
+        if metrics.enabled:
+            metrics.observe("pipeline_stage_seconds", seconds, stage=self.name)
+            metrics.inc("pipeline_stage_items_total", items_in, stage=self.name)
+            if errors:
+                metrics.inc("pipeline_stage_errors_total", errors, stage=self.name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in": self.items_in, "out": self.items_out, "errors": self.errors,
+                    "seconds": round(self.seconds, 3)}
+
+
+class Pipeline:
+    """
+    Runs Stages concurrently, connected by bounded queues.
+
+    Every stage works on its own threads, so a run takes about as long as its
+    slowest stage rather than the sum of all of them. Queues hold at most
+    ``queue_size`` items, so a slow stage holds back the ones before it
+    (backpressure) instead of letting work pile up in memory. Items leave the
+    last stage as soon as it is done with them.
+
+    When a stage is stopped by an error that is not an Exception, the source is
+    no longer read and every stage drops what is still queued, so no thread is
+    left blocked on a full queue; ``run`` then re-raises the error.
+
+    Args:
+        stages (list[Stage]): Stages in processing order.
+        queue_size (int): Capacity of the queue in front of each stage.
+    """
+
+    def __init__(self, stages: list[Stage], queue_size: int = 8):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(self, source: Iterable):
+        """
+        Feeds ``source`` through the stages from the calling thread and returns once
+        every item has left the last stage. An exception raised by ``source``
+        itself is re-raised after the stages have drained, as is an error that
+        stopped a stage.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        remaining_workers = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+        threads = []
+        # Set once a stage is stopped by an error; the first such error is re-raised
+        stopped = threading.Event()
+        stop_errors = []
+
+        def emit(index: int, outputs):
+            if outputs is None or index + 1 >= len(self.stages):
+                return
+            for output in outputs:
+                queues[index + 1].put(output)
+
+        def process(index: int, payload, size: int):
+            stage = self.stages[index]
+            started = time.perf_counter()
+            try:
+                outputs = stage.fn(payload)
+                outputs = list(outputs) if outputs is not None else []
+            except Exception as e:
+                stage._count(items_in=size, errors=1, seconds=time.perf_counter() - started)
+                if stage.on_error is not None:
+                    try:
+                        stage.on_error(payload, e)
+                    except Exception:
+                        logging.exception(f"[Pipeline] {stage.name}: error handler failed")
+                else:
+                    logging.exception(f"[Pipeline] {stage.name} failed: {e}")
+                return
+            stage._count(items_in=size, items_out=len(outputs), seconds=time.perf_counter() - started)
+            emit(index, outputs)
+
+        def work(index: int):
+            # Quota units and other metrics recorded by this thread count towards its stage
+            with metrics.stage(self.stages[index].name):
+                consume(index)
+            finish(index)
+
+        def consume(index: int):
+            stage = self.stages[index]
+            batch = []
+            done = False
+            try:
+                while True:
+                    item = queues[index].get()
+                    if item is _DONE:
+                        done = True
+                        break
+                    if stopped.is_set():
+                        continue
+                    if stage.batch_size is None:
+                        process(index, item, 1)
+                        continue
+                    batch.append(item)
+                    if len(batch) >= stage.batch_size:
+                        process(index, batch, len(batch))
+                        batch = []
+                if batch and not stopped.is_set():
+                    process(index, batch, len(batch))
+            except BaseException as e:
+                logging.error(f"[Pipeline] {stage.name} stopped the pipeline: {e!r}")
+                stop_errors.append(e)
+                stopped.set()
+                # Keep taking items, so the stages before this one never block on its queue
+                while not done:
+                    done = queues[index].get() is _DONE
+
+        def finish(index: int):
+            # The last worker of a stage to finish signals every worker of the next one
+            with remaining_lock:
+                remaining_workers[index] -= 1
+                last = remaining_workers[index] == 0
+            if last and index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].workers):
+                    queues[index + 1].put(_DONE)
+
+        for index, stage in enumerate(self.stages):
+            for worker in range(stage.workers):
+                thread = threading.Thread(target=work, args=(index,), name=f"{stage.name}-{worker}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        try:
+            for item in source:
+                if stopped.is_set():
+                    break
+                queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+        if stop_errors:
+            raise stop_errors[0]
+
+    def stats(self) -> dict:
+        """Items in and out, failures and seconds spent per stage, keyed by stage name."""
+        return {stage.name: stage.stats() for stage in self.stages}
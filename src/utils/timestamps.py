@@ -0,0 +1,10 @@
+# src/utils/timestamps.py
+
+from datetime import datetime, timezone
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Converts to the naive UTC timestamps the Postgres schema stores; naive values are assumed UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,63 @@
+# tests/conftest.py
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Scripts and tests import the code as the ``src`` package from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import database_client  # noqa: E402
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "db", "schemas", "psql_schema.sql")
+
+
+@pytest.fixture(scope="session")
+def postgres_pool():
+    """
+    A connection pool on a database with the schema applied. Uses the disposable
+    database at TEST_DATABASE_URL, else a throwaway server from the pgserver
+    package; the tests that need it are skipped when neither is available.
+    """
+    from psycopg2 import pool
+
+    url = os.getenv("TEST_DATABASE_URL")
+    server = None
+    if not url:
+        pgserver = pytest.importorskip("pgserver", reason="set TEST_DATABASE_URL or install pgserver")
+        server = pgserver.get_server(tempfile.mkdtemp(prefix="pgdata-"), cleanup_mode="delete")
+        url = server.get_uri()
+
+    db_pool = pool.ThreadedConnectionPool(1, 20, url)
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur, open(SCHEMA_PATH) as f:
+            cur.execute(f.read())
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
+    yield db_pool
+    db_pool.closeall()
+    if server is not None:
+        server.cleanup()
+
+
+@pytest.fixture
+def postgres(postgres_pool):
+    """Empties every table and points database_client at the test database."""
+    conn = postgres_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public';")
+            tables = ", ".join(row[0] for row in cur.fetchall())
+            cur.execute(f"TRUNCATE {tables} RESTART IDENTITY CASCADE;")
+        conn.commit()
+    finally:
+        postgres_pool.putconn(conn)
+
+    previous_pool = database_client.conn_pool
+    database_client.set_pool(postgres_pool)
+    yield postgres_pool
+    database_client.set_pool(previous_pool)
@@ -0,0 +1,151 @@
+# tests/test_async_backend.py
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from src.api import quota_manager as quota_manager_module
+from src.api.errors import QuotaExhaustedError
+from src.api.quota_manager import YouTubeQuotaManager
+from src.api.requests.get_channel_details import GetChannelDataByHandleOrId
+from src.api.requests.get_channel_id_for_handle import GetChannelIdForHandle
+from src.api.requests.get_channel_uploads_playlists import GetChannelUploadsPlaylists
+from src.api.requests.get_playlist_page import GetPlaylistPage
+from src.api.requests.get_playlist_videos import GetPlaylistVideos
+from src.api.requests.get_video_details import GetVideoDetails
+from src.api.requests.get_video_stats_snapshot import GetVideoStatsSnapshot
+from src.api.youtube_api_request import YouTubeAPIRequest
+
+httpx = pytest.importorskip("httpx")
+
+BASE_URL = "http://youtube.mock/youtube/v3"
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "api", "requests")
+
+
+def load_sample(name: str) -> list[dict]:
+    with open(os.path.join(SAMPLES_DIR, name)) as f:
+        sample = json.load(f)
+    return sample["items"] if isinstance(sample, dict) else sample
+
+
+VIDEOS = load_sample("get_video_details_response.json")
+CHANNELS = load_sample("get_channel_details_response.json")
+PLAYLIST_ITEMS = load_sample("get_playlist_videos_response.json")
+UPLOADS_PLAYLIST = CHANNELS[0]["contentDetails"]["relatedPlaylists"]["uploads"]
+
+
+class MockYouTube:
+    """
+    httpx.MockTransport handler serving the bundled sample responses per
+    resource. ``errors`` are answered first, one per request, as
+    ``(status, reason)`` API errors. Every request is recorded.
+    """
+
+    def __init__(self, errors: list = ()):
+        self.errors = list(errors)
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        if self.errors:
+            status, reason = self.errors.pop(0)
+            return httpx.Response(status, json={"error": {"code": status, "errors": [{"reason": reason}]}})
+        resource = request.url.path.rsplit("/", 1)[-1]
+        items = {"videos": VIDEOS, "channels": CHANNELS, "playlistItems": PLAYLIST_ITEMS}[resource]
+        return httpx.Response(200, json={"items": items})
+
+
+@pytest.fixture
+def make_manager(monkeypatch):
+    monkeypatch.setattr(quota_manager_module, "_backoff_delay", lambda attempt: 0)
+
+    def make_manager(server: MockYouTube) -> YouTubeQuotaManager:
+        manager = YouTubeQuotaManager(["key-a", "key-b"], max_retries=2, async_http_config={"base_url": BASE_URL})
+        manager._async_client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+        return manager
+
+    return make_manager
+
+
+def run(manager: YouTubeQuotaManager, request: YouTubeAPIRequest, **kwargs):
+    async def execute():
+        try:
+            return await manager.execute_async(request, **kwargs)
+        finally:
+            await manager.aclose()
+
+    return asyncio.run(execute())
+
+
+# (request, arguments, expected result) for every request class
+CASES = {
+    "video details": (GetVideoDetails(), {"video_ids": [VIDEOS[0]["id"]]}, VIDEOS),
+    "video stats": (GetVideoStatsSnapshot(), {"video_ids": [VIDEOS[0]["id"]]}, [VIDEOS[0]["id"]]),
+    "channel details": (
+        GetChannelDataByHandleOrId(), {"channel_ids": [CHANNELS[0]["id"], "@veritasium"]}, CHANNELS * 2,
+    ),
+    "channel id for handle": (GetChannelIdForHandle(), {"handle": "@veritasium"}, CHANNELS[0]["id"]),
+    "uploads playlists": (
+        GetChannelUploadsPlaylists(), {"channel_ids": [CHANNELS[0]["id"]]}, {CHANNELS[0]["id"]: UPLOADS_PLAYLIST},
+    ),
+    "playlist videos": (
+        GetPlaylistVideos(), {"identifier": CHANNELS[0]["id"]},
+        [item["contentDetails"]["videoId"] for item in PLAYLIST_ITEMS],
+    ),
+    "playlist page": (
+        GetPlaylistPage(), {"playlist_id": UPLOADS_PLAYLIST},
+        ([item["contentDetails"]["videoId"] for item in PLAYLIST_ITEMS], None),
+    ),
+}
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_every_request_runs_over_the_async_backend(make_manager, case):
+    request, arguments, expected = CASES[case]
+    server = MockYouTube()
+
+    result = run(make_manager(server), request, **arguments)
+
+    if isinstance(request, GetVideoStatsSnapshot):
+        result = result.video_ids
+    assert result == expected
+    for sent in server.requests:
+        assert sent.url.params["key"] == "key-a"
+        assert sent.url.params["fields"].startswith("items(")
+
+
+def test_rate_limited_call_is_retried_on_another_key(make_manager):
+    server = MockYouTube(errors=[(429, "rateLimitExceeded")])
+
+    result = run(make_manager(server), GetPlaylistPage(), playlist_id=UPLOADS_PLAYLIST)
+
+    assert result[0] == [item["contentDetails"]["videoId"] for item in PLAYLIST_ITEMS]
+    assert [sent.url.params["key"] for sent in server.requests] == ["key-a", "key-b"]
+
+
+def test_exhausted_keys_raise_quota_exhausted(make_manager):
+    server = MockYouTube(errors=[(403, "quotaExceeded")] * 2)
+    manager = make_manager(server)
+
+    with pytest.raises(QuotaExhaustedError):
+        run(manager, GetVideoDetails(), video_ids=[VIDEOS[0]["id"]])
+    assert manager.remaining_units() == 0
+
+
+def test_requests_without_async_support_are_rejected_before_leasing(make_manager):
+    class SyncOnlyRequest(YouTubeAPIRequest):
+        API_METHOD = "videos.list"
+
+        def execute(self, service, *args, **kwargs):
+            return "ok", 1
+
+    server = MockYouTube()
+    manager = make_manager(server)
+    remaining = manager.remaining_units()
+
+    with pytest.raises(NotImplementedError):
+        run(manager, SyncOnlyRequest())
+    assert manager.remaining_units() == remaining
+    assert server.requests == []
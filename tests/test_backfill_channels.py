@@ -0,0 +1,179 @@
+# tests/test_backfill_channels.py
+
+import json
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from scripts import backfill_channels as backfill
+from src.api.requests.get_playlist_page import GetPlaylistPage
+from src.db import database_client
+from src.db.database_client import BULK_FAILED, BULK_INSERTED, VIDEO_COLUMNS, VIDEO_SCHEDULE_COLUMNS, \
+    BlockingConnectionPool, enqueue_channel_backfills, execute_query
+from src.mappers.video_rows import VideoPageMapper
+from src.scheduling.sampling_scheduler import SamplingScheduler
+
+NOW = datetime(2025, 7, 1)
+
+
+class FakeMapper:
+    """Maps the "bodies" FakeQuotaManager returns (the video IDs); ``unmappable`` IDs fail."""
+
+    def __init__(self, unmappable: set = frozenset()):
+        self.unmappable = unmappable
+        self.scheduler = SamplingScheduler()
+
+    def map_responses(self, bodies):
+        rows = [((video_id,), (video_id, NOW)) for video_id in bodies if video_id not in self.unmappable]
+        failures = [(video_id, "KeyError('snippet')") for video_id in bodies if video_id in self.unmappable]
+        return rows, failures
+
+
+class FakeQuotaManager:
+    def __init__(self):
+        self.requested = []
+
+    def execute(self, request, video_ids, raw=False):
+        self.requested.append(list(video_ids))
+        return list(video_ids)
+
+
+class FakeKnownIds:
+    def __init__(self):
+        self.known = set()
+
+    def filter_unknown(self, ids):
+        return [video_id for video_id in ids if video_id not in self.known]
+
+    def add(self, ids):
+        self.known.update(ids)
+
+
+class FakeVideoTables:
+    """The videos and video_schedule tables; inserting a ``failing`` ID fails."""
+
+    def __init__(self, monkeypatch, failing: set = frozenset()):
+        self.failing = set(failing)
+        self.videos = set()
+        self.schedules = set()
+        monkeypatch.setattr(backfill, "insert_video_rows_bulk", self.insert_videos)
+        monkeypatch.setattr(backfill, "insert_video_schedule_rows_bulk", self.insert_schedules)
+
+    def insert_videos(self, video_rows):
+        outcomes = []
+        for (video_id,) in video_rows:
+            if video_id in self.failing:
+                outcomes.append((video_id, BULK_FAILED, "deadlock detected"))
+            else:
+                self.videos.add(video_id)
+                outcomes.append((video_id, BULK_INSERTED, None))
+        return outcomes
+
+    def insert_schedules(self, schedule_rows):
+        self.schedules.update(schedule_row[0] for schedule_row in schedule_rows)
+        return []
+
+
+def make_run(mapper: FakeMapper) -> backfill.BackfillRun:
+    return backfill.BackfillRun(FakeQuotaManager(), budget=None, known_videos=FakeKnownIds(), mapper=mapper, now=NOW)
+
+
+def test_unmappable_videos_are_skipped_without_failing_the_page(monkeypatch):
+    tables = FakeVideoTables(monkeypatch)
+    run = make_run(FakeMapper(unmappable={"broken"}))
+
+    assert run.store_page(["a", "broken", "b"]) == 2
+
+    assert tables.videos == tables.schedules == run.known_videos.known == {"a", "b"}
+    assert run.unmapped_count == 1
+
+
+def test_failed_inserts_fail_the_page_after_storing_the_rest(monkeypatch):
+    tables = FakeVideoTables(monkeypatch, failing={"b"})
+    run = make_run(FakeMapper())
+
+    with pytest.raises(RuntimeError, match="1 videos could not be stored"):
+        run.store_page(["a", "b", "c"])
+    # The stored videos are scheduled and known, so only the failed one is fetched on retry
+    assert tables.schedules == run.known_videos.known == {"a", "c"}
+
+    tables.failing.clear()
+    assert run.store_page(["a", "b", "c"]) == 1
+    assert run.qm.requested == [["a", "b", "c"], ["b"]]
+    assert tables.schedules == {"a", "b", "c"}
+
+
+class CappedPool:
+    """Raises once more than ``max_connections`` are checked out, like psycopg2's pools; records the peak."""
+
+    def __init__(self, db_pool, max_connections: int):
+        self.pool = db_pool
+        self.max_connections = max_connections
+        self.checked_out = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def getconn(self):
+        with self._lock:
+            if self.checked_out >= self.max_connections:
+                raise RuntimeError("connection pool exhausted")
+            self.checked_out += 1
+            self.peak = max(self.peak, self.checked_out)
+        return self.pool.getconn()
+
+    def putconn(self, conn):
+        self.pool.putconn(conn)
+        with self._lock:
+            self.checked_out -= 1
+
+
+class FakePlaylistQuotaManager:
+    """``pages`` pages of ``page_size`` videos per playlist; video details as raw response bodies."""
+
+    def __init__(self, pages: int, page_size: int):
+        self.pages = pages
+        self.page_size = page_size
+
+    def execute(self, request, **kwargs):
+        if isinstance(request, GetPlaylistPage):
+            page = int(kwargs["page_token"] or 0)
+            video_ids = [f"{kwargs['playlist_id']}-{page}-{index}" for index in range(self.page_size)]
+            return video_ids, str(page + 1) if page + 1 < self.pages else None
+        items = [
+            {"id": video_id, "snippet": {"publishedAt": "2025-06-30T10:00:00Z", "channelId": video_id.split("-")[0]}}
+            for video_id in kwargs["video_ids"]
+        ]
+        return [json.dumps({"items": items}).encode()]
+
+
+class UnlimitedBudget:
+    def allows(self, units: int) -> bool:
+        return True
+
+
+def test_backfill_with_more_workers_than_connections(postgres, monkeypatch):
+    channel_ids = [f"UC{index}" for index in range(6)]
+    for channel_id in channel_ids:
+        execute_query("INSERT INTO channels (id) VALUES (%s);", (channel_id,))
+    enqueue_channel_backfills(channel_ids)
+    capped_pool = CappedPool(postgres, max_connections=2)
+    database_client.set_pool(BlockingConnectionPool(capped_pool, 2))
+    monkeypatch.setattr(backfill, "channel_workers", 6)
+    monkeypatch.setattr(backfill, "store_workers", 6)
+    monkeypatch.setattr(backfill, "pages_ahead", 3)
+
+    run = backfill.BackfillRun(
+        FakePlaylistQuotaManager(pages=4, page_size=5), UnlimitedBudget(), FakeKnownIds(),
+        VideoPageMapper(VIDEO_COLUMNS, VIDEO_SCHEDULE_COLUMNS), datetime(2025, 7, 1, tzinfo=timezone.utc),
+    )
+    run.run((channel_id, channel_id, None) for channel_id in channel_ids)
+
+    assert run.completed_count == 6 and run.failed_count == 0
+    assert run.inserted_count == 6 * 4 * 5
+    assert execute_query("SELECT COUNT(*) FROM videos;", fetch=True) == [(120,)]
+    assert execute_query("SELECT COUNT(*) FROM video_schedule;", fetch=True) == [(120,)]
+    backfills = execute_query("SELECT status, pages_fetched, videos_inserted FROM channel_backfills;", fetch=True)
+    assert backfills == [("completed", 4, 20)] * 6
+    # Threads waited for a connection rather than failing on an exhausted pool
+    assert capped_pool.peak == 2
@@ -0,0 +1,142 @@
+# tests/test_bigquery_client.py
+
+import json
+
+import pytest
+
+from src.db.bigquery_client import BigQueryLoadJobSink, BigQueryStatsSink
+
+
+class FakeStreamingClient:
+    """Records insert_rows_json calls; ``fail_with`` is raised by every call while set."""
+
+    project = "test-project"
+
+    def __init__(self, fail_with: Exception = None):
+        self.fail_with = fail_with
+        self.requests = []
+
+    def insert_rows_json(self, table_id, rows, row_ids=None):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.requests.append((table_id, list(rows)))
+        return []
+
+
+class MalformedErrorsClient(FakeStreamingClient):
+    """Answers the first insert with an error entry that has no row index, which _send cannot handle."""
+
+    answered = False
+
+    def insert_rows_json(self, table_id, rows, row_ids=None):
+        if not self.answered:
+            self.answered = True
+            return [{"errors": [{"reason": "backendError"}]}]
+        return super().insert_rows_json(table_id, rows, row_ids)
+
+
+def stats_row(index: int) -> dict:
+    return {"videoId": f"video{index}", "recordedAt": "2025-07-01T00:00:00Z", "viewCount": index}
+
+
+def test_stats_sink_batches_rows():
+    client = FakeStreamingClient()
+    with BigQueryStatsSink(table_id="p.d.video_stats", bq_client=client, max_rows=2) as sink:
+        for index in range(5):
+            sink.add(stats_row(index))
+
+    assert [len(rows) for _, rows in client.requests] == [2, 2, 1]
+    assert sink.inserted_count == 5
+    assert sink.failed_count == 0
+
+
+def test_stats_sink_survives_a_failed_batch_and_close_raises():
+    client = MalformedErrorsClient()
+    sink = BigQueryStatsSink(table_id="p.d.video_stats", bq_client=client, max_rows=2)
+    for index in range(4):
+        sink.add(stats_row(index))
+
+    with pytest.raises(RuntimeError, match="failed to send"):
+        sink.close()
+
+    # The first batch is lost and counted once, the second one still went out
+    assert sink.failed_count == 2
+    assert sink.inserted_count == 2
+    assert [len(rows) for _, rows in client.requests] == [2]
+
+
+def test_stats_sink_counts_rejected_and_given_up_rows(monkeypatch):
+    monkeypatch.setattr("src.db.bigquery_client.time.sleep", lambda seconds: None)
+
+    class PartlyFailingClient(FakeStreamingClient):
+        def insert_rows_json(self, table_id, rows, row_ids=None):
+            self.requests.append((table_id, list(rows)))
+            # Row 0 is invalid, row 1 always times out, the rest are inserted
+            return [
+                {"index": index, "errors": [{"reason": "invalid" if row["viewCount"] == 0 else "timeout"}]}
+                for index, row in enumerate(rows) if row["viewCount"] < 2
+            ]
+
+    client = PartlyFailingClient()
+    with BigQueryStatsSink(table_id="p.d.video_stats", bq_client=client, max_rows=4, max_retries=3) as sink:
+        for index in range(4):
+            sink.add(stats_row(index))
+
+    assert [len(rows) for _, rows in client.requests] == [4, 1, 1]
+    assert sink.inserted_count == 2
+    assert sink.failed_count == 2
+
+
+class FakeLoadJob:
+    def __init__(self, error: Exception = None):
+        self.error = error
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+
+
+class FakeLoadClient:
+    """Records the rows of every load job; the jobs numbered in ``failing_jobs`` fail."""
+
+    project = "test-project"
+
+    def __init__(self, failing_jobs: set = frozenset()):
+        self.failing_jobs = failing_jobs
+        self.loads = []
+
+    def load_table_from_file(self, file_obj, table_id, job_config=None):
+        self.loads.append((table_id, file_obj.read().decode().splitlines(), job_config))
+        error = RuntimeError("load failed") if len(self.loads) in self.failing_jobs else None
+        return FakeLoadJob(error)
+
+
+def test_load_job_sink_batches_rows(tmp_path):
+    client = FakeLoadClient()
+    job_config = object()
+    with BigQueryLoadJobSink(table_id="p.d.video_stats", bq_client=client, staging_dir=str(tmp_path),
+                             max_rows=3, job_config=job_config) as sink:
+        for index in range(7):
+            sink.add(stats_row(index))
+
+    assert [len(lines) for _, lines, _ in client.loads] == [3, 3, 1]
+    assert all(config is job_config for _, _, config in client.loads)
+    assert json.loads(client.loads[0][1][0])["videoId"] == "video0"
+    assert sink.inserted_count == 7
+    assert sink.failed_count == 0
+    # Loaded files are removed
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_load_job_sink_counts_failed_jobs_and_keeps_their_files(tmp_path):
+    client = FakeLoadClient(failing_jobs={2})
+    with BigQueryLoadJobSink(table_id="p.d.video_stats", bq_client=client, staging_dir=str(tmp_path),
+                             max_rows=3, job_config=object()) as sink:
+        for index in range(7):
+            sink.add(stats_row(index))
+
+    assert sink.inserted_count == 4
+    assert sink.failed_count == 3
+    kept = list(tmp_path.iterdir())
+    assert len(kept) == 1
+    assert len(kept[0].read_text().splitlines()) == 3
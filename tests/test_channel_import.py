@@ -0,0 +1,48 @@
+# tests/test_channel_import.py
+
+from scripts import populate_channels_from_a_list as populate
+from src.db.database_client import BULK_INSERTED
+
+
+class FakeYouTubeClient:
+    """Resolves ``@<id>`` handles to ``<id>`` and returns details for every requested channel."""
+
+    def __init__(self, malformed: set = frozenset()):
+        self.malformed = malformed
+
+    def resolve_channel_handles(self, handles, max_workers=None):
+        for handle in handles:
+            yield handle, handle[1:], None
+
+    def fetch_channel_details(self, channel_ids):
+        return [
+            {"id": channel_id, "snippet": {"title": channel_id},
+             "statistics": {"viewCount": "not a number" if channel_id in self.malformed else "10"}}
+            for channel_id in channel_ids
+        ]
+
+
+class FakeKnownIds:
+    def __init__(self):
+        self.known = set()
+
+    def filter_unknown(self, ids):
+        return [channel_id for channel_id in ids if channel_id not in self.known]
+
+    def add(self, ids):
+        self.known.update(ids)
+
+
+def test_malformed_channel_only_loses_itself(monkeypatch):
+    upserted = []
+    monkeypatch.setattr(populate, "upsert_channels_bulk", lambda channels: (
+        upserted.extend(channel["id"] for channel in channels)
+        or [(channel["id"], BULK_INSERTED, None) for channel in channels]
+    ))
+    channel_import = populate.ChannelImport(FakeYouTubeClient(malformed={"UCbroken"}), FakeKnownIds())
+
+    counts = channel_import.import_chunk(["UCa", "UCbroken", "@UCc", "UCa"])
+
+    assert sorted(upserted) == ["UCa", "UCc"]
+    assert counts == dict(read=4, duplicate=1, known=0, not_found=0, upserted=2, failed=1)
+    assert channel_import.known_channels.known == {"UCa", "UCc"}
@@ -0,0 +1,34 @@
+# tests/test_channel_polling.py
+
+from datetime import datetime
+
+from src.scheduling.channel_polling import TIER_HOURLY, ChannelPollingPlanner
+
+NOW = datetime(2025, 7, 1, 12)
+
+
+def channel(channel_id: str, uploads_per_day, poll_tier, last_checked_at=datetime(2025, 7, 1)) -> tuple:
+    return channel_id, f"UU{channel_id}", None, None, uploads_per_day, last_checked_at, poll_tier
+
+
+def test_never_polled_channels_come_first_and_start_hourly():
+    planner = ChannelPollingPlanner()
+    # Imported channels carry a last_checked_at but no poll tier; a stale 0 rate must not sink them
+    due = [
+        channel("busy", 5.0, "hourly"),
+        channel("imported", 0.0, None),
+        channel("quiet", 0.01, "weekly"),
+        channel("new", None, None, last_checked_at=None),
+    ]
+
+    plan = planner.plan(due, budget=3, now=NOW)
+
+    assert [row[0] for row in plan] == ["imported", "new", "busy"]
+    assert planner.next_poll(None, NOW)[0] == TIER_HOURLY
+
+
+def test_polled_channels_rank_by_expected_uploads():
+    planner = ChannelPollingPlanner()
+    due = [channel("quiet", 0.1, "weekly"), channel("busy", 2.0, "hourly")]
+
+    assert [row[0] for row in planner.plan(due, budget=1, now=NOW)] == ["busy"]
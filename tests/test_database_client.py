@@ -0,0 +1,157 @@
+# tests/test_database_client.py
+
+from datetime import datetime, timedelta
+
+from src.db.database_client import BULK_FAILED, BULK_INSERTED, BULK_SKIPPED, VIDEO_COLUMNS, execute_query, \
+    filter_unknown_video_ids, insert_video_schedules_bulk, insert_videos_bulk, iter_due_videos, \
+    update_channel_high_water_marks, update_channel_uploads_playlists, update_video_stats_bulk
+from src.mappers.map_video_stats import VideoStatsBatch
+
+NOW = datetime(2025, 7, 1, 12)
+
+
+def add_videos(video_ids, current_sample: int = 0, scheduled: bool = True):
+    for video_id in video_ids:
+        execute_query("INSERT INTO videos (id, published_at) VALUES (%s, %s);", (video_id, NOW))
+        if scheduled:
+            execute_query(
+                "INSERT INTO video_schedule (video_id, upload_datetime, current_sample, next_sample_at) "
+                "VALUES (%s, %s, %s, %s);",
+                (video_id, NOW, current_sample, NOW),
+            )
+
+
+def stats_batch(*view_counts_by_id) -> VideoStatsBatch:
+    return VideoStatsBatch.from_items(
+        {"id": video_id, "statistics": {"viewCount": str(views), "likeCount": "7", "commentCount": "3"}}
+        for video_id, views in view_counts_by_id
+    )
+
+
+def test_stats_update_returns_the_sample_each_video_had(postgres):
+    add_videos(["a", "b"], current_sample=4)
+    add_videos(["unscheduled"], scheduled=False)
+    next_sample_at = datetime(2025, 7, 1, 14)
+
+    previous_samples, failed_chunks = update_video_stats_bulk(
+        stats_batch(("a", 100), ("b", 200), ("unscheduled", 300), ("a", 150)),
+        next_samples={"a": next_sample_at, "b": None},
+    )
+
+    assert previous_samples == {"a": 4, "b": 4}
+    assert failed_chunks == []
+    videos = execute_query("SELECT id, view_count, likes_count, comment_count FROM videos ORDER BY id;", fetch=True)
+    # A video listed twice keeps its last snapshot; videos without a schedule row still get their stats
+    assert videos == [("a", 150, 7, 3), ("b", 200, 7, 3), ("unscheduled", 300, 7, 3)]
+    schedules = execute_query(
+        "SELECT video_id, current_sample, last_view_count, next_sample_at FROM video_schedule ORDER BY video_id;",
+        fetch=True,
+    )
+    assert schedules == [("a", 5, 150, next_sample_at), ("b", 5, 200, None)]
+
+
+def test_failed_chunk_is_rolled_back_and_reported(postgres):
+    add_videos(["a", "b", "c", "d"])
+
+    previous_samples, failed_chunks = update_video_stats_bulk(
+        stats_batch(("a", 1), ("b", 2), ("c", 3), ("d", 4)),
+        next_samples={"c": "not a timestamp"},
+        chunk_size=2,
+    )
+
+    assert previous_samples == {"a": 0, "b": 0}
+    [(video_ids, error)] = failed_chunks
+    assert video_ids == ["c", "d"] and "invalid input syntax" in error
+    schedules = execute_query("SELECT video_id, current_sample FROM video_schedule ORDER BY video_id;", fetch=True)
+    assert schedules == [("a", 1), ("b", 1), ("c", 0), ("d", 0)]
+    assert execute_query("SELECT view_count FROM videos WHERE id IN ('c', 'd');", fetch=True) == [(None,), (None,)]
+
+
+def video_record(video_id: str, channel_id: str = None) -> dict:
+    record = dict.fromkeys(VIDEO_COLUMNS)
+    record.update(id=video_id, published_at=NOW, channel_id=channel_id, tags=[], inserted_at=NOW)
+    return record
+
+
+def test_bulk_insert_reports_an_outcome_per_row(postgres):
+    add_videos(["stored"], scheduled=False)
+
+    outcomes = insert_videos_bulk(
+        [video_record("a"), video_record("stored"), video_record("orphan", channel_id="UCmissing"), video_record("b")],
+        chunk_size=2,
+    )
+
+    # The second chunk fails as a whole on the orphan; retried row by row, only the orphan is lost
+    assert [(video_id, outcome) for video_id, outcome, _ in outcomes] == [
+        ("a", BULK_INSERTED), ("stored", BULK_SKIPPED), ("orphan", BULK_FAILED), ("b", BULK_INSERTED),
+    ]
+    assert "foreign key" in outcomes[2][2]
+    assert execute_query("SELECT id FROM videos ORDER BY id;", fetch=True) == [("a",), ("b",), ("stored",)]
+
+
+def test_bulk_schedule_insert_keeps_existing_schedules(postgres):
+    add_videos(["a"], current_sample=3)
+    add_videos(["b"], scheduled=False)
+
+    outcomes = insert_video_schedules_bulk([
+        {"video_id": video_id, "upload_datetime": NOW, "current_sample": 0, "bin_id": 12, "next_sample_at": NOW}
+        for video_id in ("a", "b")
+    ])
+
+    assert [(video_id, outcome) for video_id, outcome, _ in outcomes] == [("a", BULK_SKIPPED), ("b", BULK_INSERTED)]
+    schedules = execute_query("SELECT video_id, current_sample FROM video_schedule ORDER BY video_id;", fetch=True)
+    assert schedules == [("a", 3), ("b", 0)]
+
+
+def test_filter_unknown_video_ids_keeps_input_order(postgres):
+    add_videos(["b", "d"], scheduled=False)
+
+    assert filter_unknown_video_ids(["e", "b", "a", "d", "c"]) == ["e", "a", "c"]
+    assert filter_unknown_video_ids([]) == []
+
+
+def test_high_water_marks_never_move_back(postgres):
+    for channel_id in ("a", "b", "c"):
+        execute_query("INSERT INTO channels (id) VALUES (%s);", (channel_id,))
+    update_channel_high_water_marks({"a": (datetime(2025, 7, 1), "a-new"), "b": (datetime(2025, 7, 1), "b-new")})
+
+    update_channel_high_water_marks({
+        "a": (datetime(2025, 6, 1), "a-older"),
+        "b": (datetime(2025, 7, 2), "b-newer"),
+        "c": (datetime(2025, 6, 1), "c-first"),
+    })
+
+    marks = execute_query(
+        "SELECT id, last_seen_published_at, last_seen_video_id FROM channels ORDER BY id;", fetch=True
+    )
+    assert marks == [
+        ("a", datetime(2025, 7, 1), "a-new"),
+        ("b", datetime(2025, 7, 2), "b-newer"),
+        ("c", datetime(2025, 6, 1), "c-first"),
+    ]
+
+
+def test_resolved_uploads_playlists_are_stored_in_one_statement(postgres):
+    for channel_id in ("a", "b", "c"):
+        execute_query("INSERT INTO channels (id) VALUES (%s);", (channel_id,))
+
+    update_channel_uploads_playlists({"a": "UUa", "c": "UUc", "unknown": "UUunknown"})
+
+    playlists = execute_query("SELECT id, uploads_playlist_id FROM channels ORDER BY id;", fetch=True)
+    assert playlists == [("a", "UUa"), ("b", None), ("c", "UUc")]
+
+
+def test_due_videos_come_most_overdue_first_up_to_the_limit(postgres):
+    add_videos(["v0", "v1", "v2", "v3", "future"])
+    for hours_overdue, video_id in enumerate(["v3", "v2", "v1", "v0"], start=1):
+        execute_query("UPDATE video_schedule SET next_sample_at = %s WHERE video_id = %s;",
+                      (NOW - timedelta(hours=hours_overdue), video_id))
+    execute_query("UPDATE video_schedule SET next_sample_at = %s WHERE video_id = 'future';",
+                  (NOW + timedelta(hours=1),))
+
+    chunks = list(iter_due_videos(NOW, limit=3, chunk_size=2))
+
+    assert [[row[0] for row in chunk] for chunk in chunks] == [["v0", "v1"], ["v2"]]
+    # Continuing after the last key sampled, e.g. on a resumed run
+    resumed = list(iter_due_videos(NOW, limit=10, start_after=(chunks[-1][-1][4], "v2")))
+    assert [[row[0] for row in chunk] for chunk in resumed] == [["v3"]]
@@ -0,0 +1,187 @@
+# tests/test_field_masks.py
+
+import json
+import os
+import re
+from datetime import datetime
+
+import pytest
+
+from src.api.fields import project
+from src.api.requests.get_channel_details import GetChannelDataByHandleOrId
+from src.api.requests.get_channel_id_for_handle import GetChannelIdForHandle
+from src.api.requests.get_channel_uploads_playlists import GetChannelUploadsPlaylists
+from src.api.requests.get_playlist_page import GetPlaylistPage
+from src.api.requests.get_playlist_videos import GetPlaylistVideos
+from src.api.requests.get_video_details import GetVideoDetails
+from src.api.requests.get_video_stats_snapshot import GetVideoStatsSnapshot
+from src.db.database_client import VIDEO_COLUMNS, VIDEO_SCHEDULE_COLUMNS
+from src.mappers import map_channel_metadata as map_channel_metadata_module
+from src.mappers import map_video_metadata as map_video_metadata_module
+from src.mappers.map_channel_metadata import map_channel_metadata
+from src.mappers.map_video_metadata import map_video_metadata
+from src.mappers.map_video_stats import map_video_stats_snapshot
+from src.mappers.video_rows import map_video_page, map_video_responses
+from src.scheduling.sampling_scheduler import SamplingScheduler
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "api", "requests")
+
+
+def load_sample(name: str) -> list[dict]:
+    with open(os.path.join(SAMPLES_DIR, name)) as f:
+        sample = json.load(f)
+    return sample["items"] if isinstance(sample, dict) else sample
+
+
+VIDEOS = load_sample("get_video_details_response.json")
+CHANNELS = load_sample("get_channel_details_response.json")
+PLAYLIST_ITEMS = load_sample("get_playlist_videos_response.json")
+
+
+def item_paths(mask: str) -> list[str]:
+    """
+    The item field paths a ``fields`` mask selects, the inverse of fields_mask:
+    ``items(id,snippet(title,tags)),nextPageToken`` gives ``id``, ``snippet/title``
+    and ``snippet/tags``.
+    """
+    paths = []
+    groups = []
+    name = None
+    for token in re.findall(r"[^(),]+|[(),]", mask):
+        if token == "(":
+            groups.append(name)
+        elif token in (",", ")"):
+            if name is not None and groups[:1] == ["items"]:
+                paths.append("/".join(groups[1:] + [name]))
+            if token == ")":
+                groups.pop()
+        else:
+            name = token
+            continue
+        name = None
+    return paths
+
+
+class FakeRequest:
+    def __init__(self, response: dict):
+        self.response = response
+        self.postproc = None
+
+    def execute(self):
+        if self.postproc is not None:
+            return self.postproc(None, json.dumps(self.response).encode())
+        return self.response
+
+
+class FakeService:
+    """
+    Answers every ``<resource>().list(...)`` call with the sample items of that
+    resource. With ``apply_masks`` the items are projected with the call's
+    ``fields`` mask, the way the API would, else the full items are returned.
+    """
+
+    def __init__(self, apply_masks: bool, **items):
+        self.apply_masks = apply_masks
+        self.items = items
+        self.masks = []
+
+    def __getattr__(self, resource):
+        service = self
+
+        class Resource:
+            def list(self, fields=None, **kwargs):
+                service.masks.append(fields)
+                items = service.items[resource]
+                if service.apply_masks and fields is not None:
+                    items = [project(item, item_paths(fields)) for item in items]
+                return FakeRequest({"items": items})
+
+        return Resource
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    """The mappers stamp rows with utcnow(); both mappings of a case must get the same stamp."""
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2025, 7, 1, 12)
+
+    monkeypatch.setattr(map_video_metadata_module, "datetime", FrozenDatetime)
+    monkeypatch.setattr(map_channel_metadata_module, "datetime", FrozenDatetime)
+
+
+def video_rows(items: list[dict]):
+    rows = map_video_page(items, SamplingScheduler(), VIDEO_COLUMNS, VIDEO_SCHEDULE_COLUMNS)
+    return [map_video_metadata(item) for item in items], rows
+
+
+def stats_columns(batch):
+    return batch.video_ids, list(batch.view_counts), list(batch.like_counts), list(batch.comment_counts)
+
+
+# (request, arguments, the mapper run on its result)
+CASES = {
+    "video details": (
+        GetVideoDetails(), {"video_ids": [VIDEOS[0]["id"]]}, video_rows,
+    ),
+    "raw video details": (
+        GetVideoDetails(), {"video_ids": [VIDEOS[0]["id"]], "raw": True},
+        lambda bodies: map_video_responses(bodies, SamplingScheduler(), VIDEO_COLUMNS, VIDEO_SCHEDULE_COLUMNS),
+    ),
+    "video stats": (
+        GetVideoStatsSnapshot(), {"video_ids": [VIDEOS[0]["id"]]}, stats_columns,
+    ),
+    "channel details": (
+        GetChannelDataByHandleOrId(), {"channel_ids": [CHANNELS[0]["id"], "@veritasium"]},
+        lambda items: [map_channel_metadata(item) for item in items],
+    ),
+    "channel id for handle": (
+        GetChannelIdForHandle(), {"handle": "@veritasium"}, lambda channel_id: channel_id,
+    ),
+    "uploads playlists": (
+        GetChannelUploadsPlaylists(), {"channel_ids": [CHANNELS[0]["id"]]}, lambda playlists: playlists,
+    ),
+    "playlist videos by channel": (
+        GetPlaylistVideos(), {"identifier": CHANNELS[0]["id"]}, lambda video_ids: video_ids,
+    ),
+    "playlist page": (
+        GetPlaylistPage(), {"playlist_id": "UUHnyfMqiRRG1u-2MsSQLbXA"}, lambda page: page,
+    ),
+}
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_masked_response_maps_to_the_same_rows(case):
+    request, arguments, mapper = CASES[case]
+    samples = {"videos": VIDEOS, "channels": CHANNELS, "playlistItems": PLAYLIST_ITEMS}
+    full_service = FakeService(apply_masks=False, **samples)
+    masked_service = FakeService(apply_masks=True, **samples)
+
+    full, _ = request.execute(full_service, **arguments)
+    masked, _ = request.execute(masked_service, **arguments)
+
+    # Every call of the request sends a mask
+    assert masked_service.masks and None not in masked_service.masks
+    assert mapper(masked) == mapper(full)
+    assert mapper(full)
+
+
+@pytest.mark.parametrize("mask, items, mapper", [
+    (GetVideoDetails.FIELDS, VIDEOS, map_video_metadata),
+    (GetVideoStatsSnapshot.FIELDS, VIDEOS, map_video_stats_snapshot),
+    (GetChannelDataByHandleOrId.FIELDS, CHANNELS, map_channel_metadata),
+], ids=["video metadata", "video stats", "channel metadata"])
+def test_mappers_read_nothing_outside_their_mask(mask, items, mapper):
+    for item in items:
+        projected = project(item, item_paths(mask))
+
+        assert projected != item
+        assert mapper(projected) == mapper(item)
+
+
+def test_item_paths_inverts_fields_mask():
+    assert item_paths("items(id,snippet(title,tags)),nextPageToken") == ["id", "snippet/title", "snippet/tags"]
+    assert item_paths(GetPlaylistVideos.PLAYLIST_FIELDS) == [
+        "contentDetails/videoId", "contentDetails/videoPublishedAt"
+    ]
@@ -0,0 +1,72 @@
+# tests/test_handle_cache.py
+
+from datetime import timedelta
+
+from src.api.handle_cache import HandleCache
+from src.api.youtube_client import YouTubeClient
+from src.db import database_client
+
+
+def test_resolutions_are_kept_in_the_table_across_caches(postgres):
+    HandleCache().set("@Veritasium", "UCveritasium")
+    HandleCache().set("nobody", None)
+
+    cache = HandleCache()
+    # Handles are matched case-insensitively, with or without the "@"
+    assert cache.get("veritasium") == (True, "UCveritasium")
+    assert cache.get("@NOBODY") == (True, None)
+    assert cache.get("@unseen") == (False, None)
+
+
+def test_handles_without_a_channel_are_looked_up_again_after_the_ttl(postgres):
+    HandleCache().set("@nobody", None)
+    HandleCache().set("@somebody", "UCsomebody")
+
+    cache = HandleCache(negative_ttl=timedelta(0))
+
+    assert cache.get("@nobody") == (False, None)
+    assert cache.get("@somebody") == (True, "UCsomebody")
+
+
+def test_lru_evicts_from_memory_only(postgres):
+    cache = HandleCache(capacity=2)
+    for index in range(3):
+        cache.set(f"@handle{index}", f"UC{index}")
+
+    assert cache.stats() == {"hits": 0, "misses": 3, "size": 2}
+    assert cache.get("@handle0") == (True, "UC0")
+
+
+def test_preload_reads_every_handle_in_one_query(postgres, monkeypatch):
+    HandleCache().set("@a", "UCa")
+    queries = []
+    fetch_channel_handles = database_client.fetch_channel_handles
+    monkeypatch.setattr(database_client, "fetch_channel_handles",
+                        lambda handles: queries.append(handles) or fetch_channel_handles(handles))
+    cache = HandleCache()
+
+    cache.preload(["@a", "@b", "@A"])
+
+    assert queries == [["@a", "@b"]]
+    assert cache.get("@a") == (True, "UCa") and cache.get("@b") == (False, None)
+    assert len(queries) == 1
+
+
+class FakeQuotaManager:
+    def __init__(self):
+        self.resolved = []
+
+    def execute(self, request, handle):
+        self.resolved.append(handle)
+        return f"UC{handle[1:]}"
+
+
+def test_cached_handles_are_answered_without_the_api(postgres):
+    cache = HandleCache()
+    cache.set("@cached", "UCcached")
+    qm = FakeQuotaManager()
+
+    results = YouTubeClient(qm, handle_cache=cache).resolve_channel_handles(["@cached", "@new"])
+
+    assert sorted(results) == [("@cached", "UCcached", None), ("@new", "UCnew", None)]
+    assert qm.resolved == ["@new"]
@@ -0,0 +1,336 @@
+# tests/test_job_resume.py
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from scripts import fetch_new_uploads as uploads
+from scripts import update_video_stats_hourly as hourly
+from src.db.database_client import BULK_INSERTED
+from src.mappers.map_video_stats import VideoStatsBatch
+from src.scheduling import checkpoint as checkpoint_module
+
+VIDEO_COUNT = 10
+CHUNK_SIZE = 3
+CHANNEL_COUNT = 6
+VIDEOS_PER_CHANNEL = 200
+
+
+class Crash(BaseException):
+    """Stands in for the process being killed: nothing in the script catches it."""
+
+
+class FakeJobRuns:
+    """The job_runs and job_run_items tables, as used by JobCheckpoint."""
+
+    def __init__(self):
+        self.runs = {}
+        self.items = {}
+
+    def install(self, monkeypatch):
+        monkeypatch.setattr(checkpoint_module, "create_job_run", self.create)
+        monkeypatch.setattr(checkpoint_module, "fetch_resumable_job_run", self.fetch_resumable)
+        monkeypatch.setattr(checkpoint_module, "update_job_run", self.update)
+        monkeypatch.setattr(checkpoint_module, "insert_job_run_items", self.insert_items)
+        monkeypatch.setattr(checkpoint_module, "fetch_job_run_items", lambda run_id: set(self.items[run_id]))
+
+    def create(self, job_name, state):
+        for run in self.runs.values():
+            if run["job_name"] == job_name and run["status"] in ("running", "failed"):
+                run["status"] = "abandoned"
+        run_id = len(self.runs) + 1
+        self.runs[run_id] = {"job_name": job_name, "status": "running", "state": dict(state)}
+        self.items[run_id] = set()
+        return run_id
+
+    def fetch_resumable(self, job_name):
+        runs = [(run_id, run) for run_id, run in self.runs.items()
+                if run["job_name"] == job_name and run["status"] != "abandoned"]
+        if not runs or runs[-1][1]["status"] == "completed":
+            return None
+        run_id, run = runs[-1]
+        return run_id, dict(run["state"])
+
+    def update(self, run_id, status=None, state=None):
+        if status is not None:
+            self.runs[run_id]["status"] = status
+        if state is not None:
+            self.runs[run_id]["state"] = dict(state)
+
+    def insert_items(self, run_id, keys):
+        self.items[run_id].update(keys)
+
+
+class FakeVideoSchedule:
+    """The video_schedule table: due videos are read in keyset chunks and rescheduled when stored."""
+
+    def __init__(self, now: datetime):
+        self.rows = {
+            f"video{index:02d}": [now - timedelta(days=1), None, None, now - timedelta(minutes=60 - index)]
+            for index in range(VIDEO_COUNT)
+        }
+        self.crash_on_store = None
+
+    def install(self, monkeypatch):
+        monkeypatch.setattr(hourly, "iter_due_videos", self.iter_due_videos)
+        monkeypatch.setattr(hourly, "update_video_stats_bulk", self.update_video_stats_bulk)
+        monkeypatch.setattr(hourly, "end_video_sampling", lambda video_ids: None)
+        monkeypatch.setattr(hourly, "create_stats_sink", lambda config=None: FakeStatsSink())
+
+    def iter_due_videos(self, now, limit, start_after=None):
+        last_key = start_after or (datetime.min, "")
+        while limit > 0:
+            due = sorted(
+                (next_sample_at, video_id, upload_datetime, last_sampled_at, last_view_count)
+                for video_id, (upload_datetime, last_sampled_at, last_view_count, next_sample_at) in self.rows.items()
+                if next_sample_at is not None and next_sample_at <= now and (next_sample_at, video_id) > last_key
+            )[:min(CHUNK_SIZE, limit)]
+            if not due:
+                return
+            yield [(video_id, upload_datetime, last_sampled_at, last_view_count, next_sample_at)
+                   for next_sample_at, video_id, upload_datetime, last_sampled_at, last_view_count in due]
+            limit -= len(due)
+            last_key = due[-1][:2]
+
+    def update_video_stats_bulk(self, stats_batch, next_samples):
+        for video_id, view_count in zip(stats_batch.video_ids, stats_batch.view_counts):
+            row = self.rows[video_id]
+            row[1], row[2], row[3] = datetime.utcnow(), view_count, next_samples[video_id]
+        if self.crash_on_store is not None:
+            self.crash_on_store -= 1
+            if self.crash_on_store < 0:
+                # Stored, but killed before the checkpoint recorded the chunk
+                raise Crash()
+        return {video_id: 1 for video_id in stats_batch.video_ids}, []
+
+
+class FakeQuotaManager:
+    """
+    Returns stats for every requested video and counts the requested IDs. The
+    calls numbered in ``failing_calls`` fail with an API error, call number
+    ``crash_at`` crashes before sending anything.
+    """
+
+    total_quota = 0
+
+    def __init__(self, requested: Counter, failing_calls: set = frozenset(), crash_at: int = None):
+        self.requested = requested
+        self.failing_calls = failing_calls
+        self.crash_at = crash_at
+        self.calls = 0
+
+    def remaining_units(self):
+        return 1_000_000
+
+    def execute(self, request, video_ids):
+        call = self.calls
+        self.calls += 1
+        if call == self.crash_at:
+            raise Crash()
+        self.requested.update(video_ids)
+        if call in self.failing_calls:
+            raise RuntimeError("backendError")
+        return VideoStatsBatch.from_items({"id": video_id, "statistics": {"viewCount": "10"}} for video_id in video_ids)
+
+
+class FakeStatsSink:
+    inserted_count = 0
+    failed_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def add_stats_batch(self, batch, recorded_at, sample_indexes, fetched_from):
+        self.inserted_count += len(sample_indexes)
+
+
+@pytest.fixture
+def job_runs(monkeypatch):
+    job_runs = FakeJobRuns()
+    job_runs.install(monkeypatch)
+    return job_runs
+
+
+def sampled_ids(schedule: FakeVideoSchedule) -> set:
+    return {video_id for video_id, row in schedule.rows.items() if row[1] is not None}
+
+
+@pytest.mark.parametrize("crash_at", [1, 2, 3])
+def test_resumed_run_requests_every_due_video_exactly_once(job_runs, monkeypatch, crash_at):
+    schedule = FakeVideoSchedule(datetime.utcnow())
+    schedule.install(monkeypatch)
+    requested = Counter()
+
+    # The first chunk fails and stays due, then the run is killed after ``crash_at`` chunks
+    with pytest.raises(Crash):
+        hourly.sample_due_videos(FakeQuotaManager(requested, failing_calls={0}, crash_at=crash_at))
+    assert sum(requested.values()) == crash_at * CHUNK_SIZE
+
+    hourly.sample_due_videos(FakeQuotaManager(requested), resume=True)
+
+    # The failed chunk is left to the next regular run, nothing is requested twice
+    assert requested == Counter(list(schedule.rows))
+    assert sampled_ids(schedule) == set(schedule.rows) - {"video00", "video01", "video02"}
+    assert [run["status"] for run in job_runs.runs.values()] == ["completed"]
+
+
+def test_chunk_stored_before_the_crash_is_not_fetched_again(job_runs, monkeypatch):
+    schedule = FakeVideoSchedule(datetime.utcnow())
+    schedule.install(monkeypatch)
+    schedule.crash_on_store = 1
+    requested = Counter()
+
+    with pytest.raises(Crash):
+        hourly.sample_due_videos(FakeQuotaManager(requested))
+    # The second chunk is stored, but the checkpoint's cursor still points after the first one
+    assert job_runs.runs[1]["state"]["handled"] == CHUNK_SIZE
+
+    schedule.crash_on_store = None
+    hourly.sample_due_videos(FakeQuotaManager(requested), resume=True)
+
+    assert requested == Counter(list(schedule.rows))
+    assert sampled_ids(schedule) == set(schedule.rows)
+
+
+def test_run_without_resume_starts_over(job_runs, monkeypatch):
+    schedule = FakeVideoSchedule(datetime.utcnow())
+    schedule.install(monkeypatch)
+    requested = Counter()
+
+    with pytest.raises(Crash):
+        hourly.sample_due_videos(FakeQuotaManager(requested, failing_calls={0}, crash_at=1))
+    hourly.sample_due_videos(FakeQuotaManager(requested))
+
+    # A new run has its own clock and cursor, so the failed chunk is requested again
+    assert [run["status"] for run in job_runs.runs.values()] == ["abandoned", "completed"]
+    assert requested == Counter(list(schedule.rows)) + Counter(["video00", "video01", "video02"])
+    assert sampled_ids(schedule) == set(schedule.rows)
+
+
+class FakeChannels:
+    """
+    The channels and videos tables and the API behind fetch_new_uploads: every
+    channel has uploaded VIDEOS_PER_CHANNEL videos since it was last polled.
+    Counts every playlist scanned and every video whose details are requested.
+    """
+
+    def __init__(self, now: datetime):
+        self.now = now
+        self.next_poll_at = {f"channel{index}": None for index in range(CHANNEL_COUNT)}
+        self.stored = set()
+        self.scanned = Counter()
+        self.requested = Counter()
+        self.crash_after_scans = None
+
+    def install(self, monkeypatch):
+        channels = self
+        monkeypatch.setattr(uploads, "refresh_channel_upload_rates", lambda *args: None)
+        monkeypatch.setattr(uploads, "iter_due_channels", self.iter_due_channels)
+        monkeypatch.setattr(uploads, "insert_video_rows_bulk", self.insert_video_rows_bulk)
+        monkeypatch.setattr(uploads, "insert_video_schedule_rows_bulk", lambda rows: [])
+        monkeypatch.setattr(uploads, "update_channel_high_water_marks", lambda marks: None)
+        monkeypatch.setattr(uploads, "update_channel_poll_schedule", self.update_channel_poll_schedule)
+        monkeypatch.setattr(uploads, "create_known_ids_index", lambda kind, config=None: FakeKnownIds(self))
+        monkeypatch.setattr(uploads, "VideoPageMapper", FakeVideoPageMapper)
+        monkeypatch.setattr(uploads, "YouTubeClient", lambda quota_manager: FakeYouTubeClient(channels))
+        # Checkpoint every finished channel
+        monkeypatch.setattr(uploads.NewUploadsRun, "FLUSH_CHANNELS", 1)
+
+    def iter_due_channels(self, now):
+        yield [
+            (channel_id, f"UU{channel_id}", None, None, 1.0, None, "hourly")
+            for channel_id, next_poll_at in self.next_poll_at.items()
+            if next_poll_at is None or next_poll_at <= now
+        ]
+
+    def insert_video_rows_bulk(self, video_rows):
+        self.stored.update(video_row[0] for video_row in video_rows)
+        return [(video_row[0], BULK_INSERTED, None) for video_row in video_rows]
+
+    def update_channel_poll_schedule(self, schedules):
+        for channel_id, _, _, next_poll_at in schedules:
+            self.next_poll_at[channel_id] = next_poll_at
+
+
+class FakeYouTubeClient:
+    def __init__(self, channels: FakeChannels):
+        self.channels = channels
+
+    def scan_new_uploads(self, targets, max_workers=None):
+        for playlist_id, _, _ in targets:
+            if self.channels.crash_after_scans is not None and sum(self.channels.scanned.values()) \
+                    >= self.channels.crash_after_scans:
+                raise Crash()
+            self.channels.scanned[playlist_id] += 1
+            yield playlist_id, [f"{playlist_id}-{index}" for index in range(VIDEOS_PER_CHANNEL)], None
+
+
+class FakeKnownIds:
+    def __init__(self, channels: FakeChannels):
+        self.channels = channels
+
+    def filter_unknown(self, ids):
+        return [video_id for video_id in ids if video_id not in self.channels.stored]
+
+    def add(self, ids):
+        pass
+
+    def save(self):
+        pass
+
+
+class FakeVideoPageMapper:
+    """Maps the "bodies" FakeUploadsQuotaManager returns, which are just the video IDs."""
+
+    def __init__(self, video_columns, schedule_columns, sampling_config=None):
+        pass
+
+    def map_responses(self, bodies):
+        return [((video_id,), (video_id, datetime(2025, 7, 1))) for video_id in bodies], []
+
+
+class FakeUploadsQuotaManager:
+    total_quota = 0
+    response_cache = None
+
+    def __init__(self, channels: FakeChannels):
+        self.channels = channels
+
+    def remaining_units(self):
+        return 1_000_000
+
+    def execute(self, request, video_ids, raw=False):
+        self.channels.requested.update(video_ids)
+        return list(video_ids)
+
+
+# The scan feeds the pipeline 500 IDs at a time: channels whose videos all went in
+# before the crash are stored and checkpointed, the IDs still buffered are lost
+@pytest.mark.parametrize("crash_after_scans, checkpointed", [(1, 0), (3, 2), (5, 5)])
+def test_resumed_fetch_new_uploads_fetches_every_video_once(job_runs, monkeypatch, crash_after_scans,
+                                                             checkpointed):
+    channels = FakeChannels(datetime.utcnow())
+    channels.install(monkeypatch)
+    channels.crash_after_scans = crash_after_scans
+
+    with pytest.raises(Crash):
+        uploads.fetch_and_store_new_uploads(FakeUploadsQuotaManager(channels))
+    done = set(job_runs.items[1])
+    assert len(done) == checkpointed
+
+    channels.crash_after_scans = None
+    uploads.fetch_and_store_new_uploads(FakeUploadsQuotaManager(channels), resume=True)
+
+    # Checkpointed channels are not scanned again; videos stored before the crash are
+    # known, so even a channel scanned twice has each video's details requested once
+    all_videos = [f"UU{channel_id}-{index}"
+                  for channel_id in channels.next_poll_at for index in range(VIDEOS_PER_CHANNEL)]
+    assert all(channels.scanned[f"UU{channel_id}"] == 1 for channel_id in done)
+    assert channels.requested == Counter(all_videos)
+    assert channels.stored == set(all_videos)
+    assert job_runs.items[1] == set(channels.next_poll_at)
+    assert [run["status"] for run in job_runs.runs.values()] == ["completed"]
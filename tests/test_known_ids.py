@@ -0,0 +1,82 @@
+# tests/test_known_ids.py
+
+import os
+from datetime import datetime
+
+import pytest
+
+from src.db import known_ids as known_ids_module
+from src.db.known_ids import DatabaseKnownIds, KnownIdsIndex, create_known_ids_index
+
+
+class FakeVideos:
+    """The videos table as seen by KnownIdsIndex: ``(video_id, inserted_at)`` rows."""
+
+    def __init__(self):
+        self.rows = []
+
+    def iter_ids(self, start_after=None):
+        rows = [row for row in self.rows if start_after is None or row[1] > start_after[0]]
+        if rows:
+            yield rows
+
+    def filter_unknown(self, video_ids):
+        stored = {video_id for video_id, _ in self.rows}
+        return [video_id for video_id in video_ids if video_id not in stored]
+
+
+@pytest.fixture
+def videos(monkeypatch):
+    videos = FakeVideos()
+    monkeypatch.setitem(known_ids_module.KINDS, "videos", (videos.iter_ids, videos.filter_unknown))
+    return videos
+
+
+def open_index(directory) -> KnownIdsIndex:
+    index = KnownIdsIndex("videos", directory=str(directory), capacity=1000)
+    index.sync()
+    return index
+
+
+def test_unchanged_index_is_not_written(tmp_path, videos):
+    videos.rows = [("video1", datetime(2025, 7, 1))]
+    open_index(tmp_path).save()
+    path = tmp_path / "videos.bloom"
+    written = os.stat(path).st_mtime_ns
+    os.utime(path, ns=(0, 0))
+
+    open_index(tmp_path).save()
+
+    assert os.stat(path).st_mtime_ns == 0 != written
+
+
+def test_mapped_index_is_updated_in_place(tmp_path, videos):
+    videos.rows = [("video1", datetime(2025, 7, 1))]
+    open_index(tmp_path).save()
+    path = tmp_path / "videos.bloom"
+    inode = os.stat(path).st_ino
+
+    videos.rows.append(("video2", datetime(2025, 7, 2)))
+    index = open_index(tmp_path)
+    index.add(["video3"])
+    index.save()
+
+    assert os.stat(path).st_ino == inode
+    reopened = open_index(tmp_path)
+    assert all(reopened.might_contain(video_id) for video_id in ("video1", "video2", "video3"))
+    assert reopened.bloom.count == 3
+    assert reopened.synced_through == (datetime(2025, 7, 2), "video2")
+    assert reopened.filter_unknown(["video1", "video4"]) == ["video4"]
+
+
+
+def test_index_is_only_kept_in_a_configured_directory(tmp_path, videos):
+    videos.rows = [("video1", datetime(2025, 7, 1))]
+
+    unindexed = create_known_ids_index("videos", {"directory": None})
+    assert isinstance(unindexed, DatabaseKnownIds)
+    assert unindexed.filter_unknown(["video1", "video2"]) == ["video2"]
+
+    index = create_known_ids_index("videos", {"directory": str(tmp_path), "video_capacity": 1000})
+    assert isinstance(index, KnownIdsIndex)
+    assert index.might_contain("video1")
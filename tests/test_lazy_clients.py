@@ -0,0 +1,80 @@
+# tests/test_lazy_clients.py
+
+import os
+import subprocess
+import sys
+import threading
+
+from google.cloud import bigquery
+from psycopg2 import pool
+
+from src.api import quota_manager as quota_manager_module
+from src.api.quota_manager import YouTubeQuotaManager
+from src.db import bigquery_client, database_client
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_client_modules_import_no_database_driver():
+    code = (
+        "import sys\n"
+        "import src.db.database_client, src.db.bigquery_client, src.api.quota_manager\n"
+        "print(sorted(name for name in ('psycopg2', 'google.cloud.bigquery') if name in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+
+def call_concurrently(fn, threads: int = 8) -> list:
+    results = []
+    barrier = threading.Barrier(threads)
+
+    def target():
+        barrier.wait()
+        results.append(fn())
+
+    workers = [threading.Thread(target=target) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def test_pool_is_opened_once_on_first_use(monkeypatch):
+    opened = []
+    monkeypatch.setattr(database_client, "conn_pool", None)
+    monkeypatch.setattr(pool, "ThreadedConnectionPool", lambda minconn, maxconn, **kwargs: opened.append(maxconn))
+    monkeypatch.setenv("DATABASE_MAX_CONNECTIONS", "4")
+
+    pools = call_concurrently(database_client.get_pool)
+
+    assert opened == [4]
+    assert len({id(db_pool) for db_pool in pools}) == 1
+    assert isinstance(pools[0], database_client.BlockingConnectionPool)
+
+
+def test_bigquery_client_is_built_once_on_first_use(monkeypatch):
+    built = []
+    monkeypatch.setattr(bigquery_client, "client", None)
+    monkeypatch.setattr(bigquery, "Client", lambda project=None: built.append(project) or object())
+    monkeypatch.setenv("GCP_PROJECT_ID", "project")
+
+    clients = call_concurrently(bigquery_client.get_client)
+
+    assert built == ["project"]
+    assert len({id(bq_client) for bq_client in clients}) == 1
+
+
+def test_youtube_services_are_built_per_key_on_first_use(monkeypatch):
+    built = []
+    monkeypatch.setattr(quota_manager_module, "build",
+                        lambda *args, developerKey, http: built.append(developerKey) or object())
+
+    manager = YouTubeQuotaManager(["key-a", "key-b"])
+    assert built == []
+
+    manager._build_client(1)
+    manager._build_client(1)
+    assert built == ["key-b"]
@@ -0,0 +1,121 @@
+# tests/test_metrics.py
+
+import json
+import os
+import threading
+
+import pytest
+
+from src.api.quota_manager import YouTubeQuotaManager
+from src.api.youtube_api_request import YouTubeAPIRequest
+from src.utils.metrics import MetricsRegistry, configure_metrics, metrics, write_run_metrics
+from src.utils.pipeline import Pipeline, Stage
+
+
+@pytest.fixture
+def recording():
+    """Enables the process-wide registry for one test and disables it again afterwards."""
+    configure_metrics("test_job", {"enabled": True})
+    yield metrics
+    metrics.configure(None, enabled=False)
+
+
+def series(summary: dict, name: str) -> dict:
+    """A counter's values keyed by their labels, as sorted tuples."""
+    return {tuple(sorted(entry["labels"].items())): entry["value"] for entry in summary["counters"].get(name, [])}
+
+
+def test_disabled_registry_records_and_writes_nothing(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc("calls_total")
+    registry.observe("call_seconds", 0.1)
+
+    assert registry.summary()["counters"] == {} and registry.summary()["histograms"] == {}
+    assert write_run_metrics({"directory": str(tmp_path)}) == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_prometheus_histograms_are_cumulative():
+    registry = MetricsRegistry()
+    registry.configure("job")
+    registry.inc("rows_total", 3, table="videos")
+    for seconds in (0.003, 0.02, 0.02, 100):
+        registry.observe("statement_seconds", seconds, buckets=(0.01, 0.1))
+
+    assert registry.to_prometheus().splitlines() == [
+        "# TYPE rows_total counter",
+        'rows_total{table="videos"} 3',
+        "# TYPE statement_seconds histogram",
+        'statement_seconds_bucket{le="0.01"} 1',
+        'statement_seconds_bucket{le="0.1"} 3',
+        'statement_seconds_bucket{le="+Inf"} 4',
+        "statement_seconds_sum 100.043",
+        "statement_seconds_count 4",
+    ]
+
+
+def test_stage_is_per_thread_and_defaults_to_the_job():
+    registry = MetricsRegistry()
+    registry.configure("job")
+    seen = {}
+
+    def other_thread():
+        seen["other"] = registry.current_stage()
+
+    with registry.stage("scan"):
+        seen["inside"] = registry.current_stage()
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+    seen["after"] = registry.current_stage()
+
+    assert seen == {"inside": "scan", "other": "job", "after": "job"}
+
+
+class OneCallRequest(YouTubeAPIRequest):
+    API_METHOD = "videos.list"
+
+    def execute(self, service, *args, **kwargs):
+        return "ok", 1
+
+
+def test_quota_units_and_pipeline_items_add_up_per_stage(recording, monkeypatch):
+    manager = YouTubeQuotaManager(["key-a"])
+    monkeypatch.setattr(manager, "_build_client", lambda index: index)
+    request = OneCallRequest()
+
+    def fetch(item):
+        manager.execute(request)
+        return [item]
+
+    pipeline = Pipeline([Stage("details", fetch, workers=2), Stage("write", lambda batch: None, batch_size=4)])
+    pipeline.run(range(10))
+    manager.execute(request)
+
+    summary = recording.summary()
+    units_by_stage = {}
+    for labels, units in series(summary, "youtube_quota_units_total").items():
+        stage = dict(labels)["stage"]
+        units_by_stage[stage] = units_by_stage.get(stage, 0) + units
+    assert units_by_stage == {"details": 10, "test_job": 1}
+    assert series(summary, "pipeline_stage_items_total") == {
+        (("stage", "details"),): 10,
+        (("stage", "write"),): 10,
+    }
+    assert set(summary["rates"]["pipeline_items_per_second"]) == {"details", "write"}
+
+
+def test_run_metrics_are_written_as_prometheus_text_and_a_json_summary(recording, tmp_path):
+    recording.inc("db_statement_rows_total", 500, statement="insert videos")
+    recording.observe("db_statement_seconds", 0.25, statement="insert videos")
+
+    paths = write_run_metrics({"directory": str(tmp_path)})
+
+    assert [os.path.basename(path).split("-")[0] for path in paths] == ["test_job.prom", "test_job"]
+    with open(paths[0]) as f:
+        assert 'db_statement_rows_total{statement="insert videos"} 500' in f.read()
+    with open(paths[1]) as f:
+        summary = json.load(f)
+    assert summary["job"] == "test_job"
+    assert summary["rates"]["db_rows_per_second"] == {"insert videos": 2000.0}
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
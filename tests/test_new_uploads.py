@@ -0,0 +1,290 @@
+# tests/test_new_uploads.py
+
+import time
+from datetime import datetime, timezone
+
+from scripts import fetch_new_uploads as uploads
+from src.api.requests.get_channel_uploads_playlists import GetChannelUploadsPlaylists
+from src.api.requests.get_playlist_videos import GetPlaylistVideos
+from src.db.database_client import BULK_FAILED, BULK_INSERTED
+from src.scheduling import checkpoint as checkpoint_module
+from src.scheduling.channel_polling import ChannelPollingPlanner
+from src.scheduling.checkpoint import JobCheckpoint
+
+NOW = datetime(2025, 7, 1, 12, tzinfo=timezone.utc)
+
+
+class FakePlaylistService:
+    """A paged uploads playlist, newest first, ``page_size`` items per page; records the pages fetched."""
+
+    def __init__(self, uploads: list[tuple[str, str]], page_size: int = 2):
+        self.pages = [uploads[start:start + page_size] for start in range(0, len(uploads), page_size)]
+        self.fetched = []
+
+    def playlistItems(self):
+        service = self
+
+        class Request:
+            def __init__(self, page: int):
+                self.page = page
+
+            def execute(self):
+                service.fetched.append(self.page)
+                response = {"items": [
+                    {"contentDetails": {"videoId": video_id, "videoPublishedAt": published_at}}
+                    for video_id, published_at in service.pages[self.page]
+                ]}
+                if self.page + 1 < len(service.pages):
+                    response["nextPageToken"] = str(self.page + 1)
+                return response
+
+        class Resource:
+            def list(self, pageToken=None, **kwargs):
+                return Request(int(pageToken or 0))
+
+        return Resource()
+
+
+UPLOADS = [
+    ("v5", "2025-07-01T10:00:00Z"),
+    ("v4", "2025-06-30T10:00:00Z"),
+    ("v3", "2025-06-29T10:00:00Z"),
+    ("v2", "2025-06-28T10:00:00Z"),
+    ("v1", "2025-06-27T10:00:00Z"),
+]
+
+
+def test_scan_stops_at_the_high_water_mark():
+    service = FakePlaylistService(UPLOADS)
+
+    video_ids, calls = GetPlaylistVideos().execute(
+        service, "UUchannel", since_datetime=datetime(2025, 6, 1, tzinfo=timezone.utc), stop_at_video_id="v3"
+    )
+
+    # The mark is on the second page; the third is never fetched
+    assert video_ids == ["v5", "v4"]
+    assert calls == 2
+    assert service.fetched == [0, 1]
+
+
+def test_scan_without_a_mark_stops_at_the_lookback_window():
+    service = FakePlaylistService(UPLOADS)
+
+    video_ids, calls = GetPlaylistVideos().execute(
+        service, "UUchannel", since_datetime=datetime(2025, 6, 30, 12, tzinfo=timezone.utc)
+    )
+
+    assert video_ids == ["v5"]
+    assert calls == 1
+    assert service.fetched == [0]
+
+
+class FakeCheckpoint:
+    def __init__(self):
+        self.done = []
+
+    def mark_done(self, item_keys):
+        self.done.extend(item_keys)
+
+
+class FakeKnownIds:
+    """Knows no video yet."""
+
+    def filter_unknown(self, ids):
+        return list(ids)
+
+    def add(self, ids):
+        pass
+
+    def save(self):
+        pass
+
+
+def test_marks_advance_only_past_stored_videos(monkeypatch):
+    marks = {}
+    failing = {"b1"}
+    monkeypatch.setattr(uploads, "insert_video_rows_bulk", lambda rows: [
+        (video_id, BULK_FAILED if video_id in failing else BULK_INSERTED, None) for video_id, in rows
+    ])
+    monkeypatch.setattr(uploads, "insert_video_schedule_rows_bulk", lambda rows: [])
+    monkeypatch.setattr(uploads, "update_channel_high_water_marks", marks.update)
+    monkeypatch.setattr(uploads, "update_channel_poll_schedule", lambda schedules: None)
+    checkpoint = FakeCheckpoint()
+    run = uploads.NewUploadsRun(None, ChannelPollingPlanner(), checkpoint, NOW, FakeKnownIds(), mapper=None)
+    published = {"a1": datetime(2025, 7, 1, 9), "a2": datetime(2025, 7, 1, 11), "b1": datetime(2025, 7, 1, 10)}
+
+    run.planned("UUa", "a", 1.0)
+    run.planned("UUb", "b", 1.0)
+    run.scanned("UUa", ["a2", "a1"])
+    run.scanned("UUb", ["b1"])
+
+    # Scanned but not written yet: no mark moves
+    run.flush()
+    assert marks == {} and checkpoint.done == []
+
+    run.write_batch([((video_id,), (video_id, published[video_id])) for video_id in ("a2", "a1", "b1")])
+    run.flush()
+
+    # Channel b's only video failed to insert, so it keeps its old mark and stays due
+    assert marks == {"a": (published["a2"], "a2")}
+    assert checkpoint.done == ["a"]
+    assert run.failed_ids == {"b1"}
+
+
+def test_failed_write_batch_keeps_the_channel_unfinished(monkeypatch):
+    marks = {}
+    monkeypatch.setattr(uploads, "update_channel_high_water_marks", marks.update)
+    monkeypatch.setattr(uploads, "update_channel_poll_schedule", lambda schedules: None)
+    checkpoint = FakeCheckpoint()
+    run = uploads.NewUploadsRun(None, ChannelPollingPlanner(), checkpoint, NOW, FakeKnownIds(), mapper=None)
+
+    run.planned("UUa", "a", 1.0)
+    run.scanned("UUa", ["a1"])
+    run.write_failed([(("a1",), ("a1", datetime(2025, 7, 1)))], RuntimeError("connection lost"))
+    run.flush()
+
+    assert marks == {} and checkpoint.done == []
+
+
+class FakeYouTubeClient:
+    """Every planned playlist has ``per_channel`` new uploads."""
+
+    def __init__(self, per_channel: int):
+        self.per_channel = per_channel
+        self.scanned_ids = []
+
+    def scan_new_uploads(self, targets, max_workers=None):
+        for playlist_id, _, _ in targets:
+            video_ids = [f"{playlist_id}-{index}" for index in range(self.per_channel)]
+            self.scanned_ids.extend(video_ids)
+            yield playlist_id, video_ids, None
+
+
+class FakeVideoPageMapper:
+    """Maps the "bodies" FakeQuotaManager returns, which are just the video IDs."""
+
+    def __init__(self, video_columns, schedule_columns, sampling_config=None):
+        pass
+
+    def map_responses(self, bodies):
+        return [((video_id,), (video_id, datetime(2025, 7, 1))) for video_id in bodies], []
+
+
+class FakeQuotaManager:
+    total_quota = 0
+    response_cache = None
+
+    def remaining_units(self):
+        return 1_000_000
+
+    def execute(self, request, video_ids, raw=False):
+        time.sleep(0.001)
+        return list(video_ids)
+
+
+def test_every_scanned_video_reaches_the_write_stage(monkeypatch):
+    written = []
+    polled = []
+    youtube = FakeYouTubeClient(per_channel=120)
+    channels = [(f"channel{index}", f"UUchannel{index}", None, None, 1.0, None, "hourly") for index in range(9)]
+
+    monkeypatch.setattr(uploads.JobCheckpoint, "start", classmethod(
+        lambda cls, job_name, resume=False, state=None: JobCheckpoint(job_name, 1, state=state)
+    ))
+    monkeypatch.setattr(checkpoint_module, "insert_job_run_items", lambda run_id, keys: None)
+    monkeypatch.setattr(checkpoint_module, "update_job_run", lambda run_id, status=None, state=None: None)
+    monkeypatch.setattr(uploads, "refresh_channel_upload_rates", lambda *args: None)
+    monkeypatch.setattr(uploads, "iter_due_channels", lambda now: iter([channels]))
+    monkeypatch.setattr(uploads, "insert_video_rows_bulk", lambda rows: (
+        written.extend(video_id for video_id, in rows) or [(video_id, BULK_INSERTED, None) for video_id, in rows]
+    ))
+    monkeypatch.setattr(uploads, "insert_video_schedule_rows_bulk", lambda rows: [])
+    monkeypatch.setattr(uploads, "update_channel_high_water_marks", lambda marks: None)
+    monkeypatch.setattr(uploads, "update_channel_poll_schedule", polled.extend)
+    monkeypatch.setattr(uploads, "create_known_ids_index", lambda kind, config=None: FakeKnownIds())
+    monkeypatch.setattr(uploads, "VideoPageMapper", FakeVideoPageMapper)
+    monkeypatch.setattr(uploads, "YouTubeClient", lambda quota_manager: youtube)
+    # Small queues and batches that do not divide the video count, so every stage waits on the next
+    monkeypatch.setattr(uploads, "pipeline_queue_size", 1)
+    monkeypatch.setattr(uploads, "details_workers", 3)
+    monkeypatch.setattr(uploads, "write_batch_size", 7)
+
+    uploads.fetch_and_store_new_uploads(FakeQuotaManager())
+
+    assert len(youtube.scanned_ids) == 9 * 120
+    assert sorted(written) == sorted(youtube.scanned_ids)
+    assert sorted(channel_id for channel_id, _, _, _ in polled) == sorted(channel[0] for channel in channels)
+
+
+class FakeChannelsService:
+    """channels.list returning the uploads playlist of every requested channel except ``deleted`` ones."""
+
+    def __init__(self, deleted: set = frozenset()):
+        self.deleted = deleted
+        self.requested = []
+
+    def channels(self):
+        service = self
+
+        class Request:
+            def __init__(self, channel_ids: list[str]):
+                self.channel_ids = channel_ids
+
+            def execute(self):
+                return {"items": [
+                    {"id": channel_id, "contentDetails": {"relatedPlaylists": {"uploads": f"UU{channel_id}"}}}
+                    for channel_id in self.channel_ids if channel_id not in service.deleted
+                ]}
+
+        class Resource:
+            def list(self, id, **kwargs):
+                service.requested.append(id.split(","))
+                return Request(id.split(","))
+
+        return Resource()
+
+
+def test_uploads_playlists_are_resolved_50_channels_per_call():
+    service = FakeChannelsService(deleted={"c7"})
+    channel_ids = [f"c{index}" for index in range(120)]
+
+    playlists, calls = GetChannelUploadsPlaylists().execute(service, channel_ids)
+
+    assert calls == 3 and [len(chunk) for chunk in service.requested] == [50, 50, 20]
+    assert playlists == {channel_id: f"UU{channel_id}" for channel_id in channel_ids if channel_id != "c7"}
+
+
+class FakeResolvingClient:
+    def __init__(self, playlists: dict[str, str]):
+        self.playlists = playlists
+        self.requested = []
+
+    def resolve_uploads_playlists(self, channel_ids):
+        self.requested.append(list(channel_ids))
+        return {channel_id: self.playlists[channel_id] for channel_id in channel_ids if channel_id in self.playlists}
+
+
+def test_scan_targets_use_stored_playlists_and_resolve_only_missing_ones(monkeypatch):
+    stored = {}
+    inactive = []
+    monkeypatch.setattr(uploads, "update_channel_uploads_playlists", stored.update)
+    monkeypatch.setattr(uploads, "mark_channel_inactive", inactive.append)
+    yt = FakeResolvingClient({"b": "UUb"})
+    run = uploads.NewUploadsRun(None, ChannelPollingPlanner(), FakeCheckpoint(), NOW, FakeKnownIds(), mapper=None)
+    since_time = datetime(2025, 6, 30, tzinfo=timezone.utc)
+    channels = [
+        ("a", "UUa", datetime(2025, 6, 29, 8), "a-last", 1.0, None, "hourly"),
+        ("b", None, None, None, 1.0, None, "hourly"),
+        ("gone", None, None, None, 1.0, None, "hourly"),
+    ]
+
+    targets = list(uploads.iter_scan_targets(channels, since_time, yt, run))
+
+    # One lookup for both channels without a stored playlist; the deleted one is not scanned
+    assert yt.requested == [["b", "gone"]]
+    assert targets == [
+        ("UUa", datetime(2025, 6, 29, 8, tzinfo=timezone.utc), "a-last"),
+        ("UUb", since_time, None),
+    ]
+    assert stored == {"b": "UUb"}
+    assert inactive == ["gone"]
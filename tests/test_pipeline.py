@@ -0,0 +1,111 @@
+# tests/test_pipeline.py
+
+import threading
+import time
+
+import pytest
+
+from src.utils.pipeline import Pipeline, Stage
+
+
+class Stop(BaseException):
+    """Not an Exception, so it stops the pipeline instead of failing one item."""
+
+
+def run_with_timeout(pipeline: Pipeline, source, seconds: float = 10):
+    """Runs the pipeline on a thread and fails the test instead of hanging if it deadlocks."""
+    outcome = {}
+
+    def target():
+        try:
+            pipeline.run(source)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), "pipeline deadlocked"
+    return outcome.get("error")
+
+
+def test_every_item_reaches_the_last_stage_once():
+    written = []
+    pipeline = Pipeline([
+        Stage("double", lambda item: [item, -item], workers=3),
+        Stage("slow", lambda item: (time.sleep(0.001), [item])[1], workers=2),
+        Stage("write", written.extend, batch_size=7),
+    ], queue_size=1)
+
+    assert run_with_timeout(pipeline, range(1, 201)) is None
+
+    assert sorted(written) == sorted(list(range(1, 201)) + list(range(-200, 0)))
+    assert pipeline.stats()["write"]["in"] == 400
+
+
+def test_failed_items_are_handed_to_on_error_and_the_rest_go_on():
+    failed = []
+    written = []
+
+    def fetch(item):
+        if item % 3 == 0:
+            raise ValueError(item)
+        return [item]
+
+    pipeline = Pipeline([
+        Stage("fetch", fetch, workers=2, on_error=lambda item, error: failed.append(item)),
+        Stage("write", written.extend, batch_size=4),
+    ], queue_size=1)
+
+    assert run_with_timeout(pipeline, range(100)) is None
+
+    assert sorted(failed) == list(range(0, 100, 3))
+    assert sorted(written) == [item for item in range(100) if item % 3]
+    assert pipeline.stats()["fetch"]["errors"] == len(failed)
+
+
+@pytest.mark.parametrize("stopping_stage", ["fetch", "write"])
+def test_stopped_stage_stops_the_pipeline_without_deadlocking(stopping_stage):
+    consumed = []
+    written = []
+
+    def source():
+        for item in range(10_000):
+            consumed.append(item)
+            yield item
+
+    def fetch(item):
+        if stopping_stage == "fetch" and item == 50:
+            raise Stop()
+        return [item]
+
+    def write(batch):
+        if stopping_stage == "write" and len(written) >= 20:
+            raise Stop()
+        written.extend(batch)
+
+    pipeline = Pipeline([
+        Stage("fetch", fetch, workers=2),
+        Stage("map", lambda item: [item], workers=2),
+        Stage("write", write, batch_size=5),
+    ], queue_size=2)
+
+    assert isinstance(run_with_timeout(pipeline, source()), Stop)
+
+    # The source is no longer read once a stage stopped
+    assert len(consumed) < 10_000
+
+
+def test_source_error_is_raised_after_the_stages_drain():
+    written = []
+
+    def source():
+        yield from range(50)
+        raise RuntimeError("scan failed")
+
+    pipeline = Pipeline([Stage("write", written.extend, batch_size=8)], queue_size=1)
+
+    error = run_with_timeout(pipeline, source())
+
+    assert isinstance(error, RuntimeError)
+    assert sorted(written) == list(range(50))
@@ -0,0 +1,63 @@
+# tests/test_playlist_scanner.py
+
+import threading
+import time
+
+from src.api.playlist_scanner import PlaylistScanner
+
+
+class FakeQuotaManager:
+    """Returns one video per playlist after a short wait; ``failing`` playlists raise. Records the peak concurrency."""
+
+    def __init__(self, failing: set = frozenset()):
+        self.failing = failing
+        self.running = 0
+        self.peak = 0
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def execute(self, request, identifier, since_datetime=None, stop_at_video_id=None):
+        with self._lock:
+            self.calls.append((identifier, stop_at_video_id))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            time.sleep(0.005)
+            if identifier in self.failing:
+                raise RuntimeError(f"{identifier} not found")
+            return [f"{identifier}-video"]
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def test_every_playlist_is_scanned_once_and_failures_are_passed_through():
+    qm = FakeQuotaManager(failing={"UU3"})
+    targets = [(f"UU{index}", None, f"last{index}") for index in range(20)]
+
+    results = {identifier: (video_ids, error) for identifier, video_ids, error in
+               PlaylistScanner(qm, max_workers=4).scan_incremental(targets)}
+
+    assert sorted(qm.calls) == sorted((identifier, last_seen) for identifier, _, last_seen in targets)
+    assert len(results) == 20
+    video_ids, error = results.pop("UU3")
+    assert video_ids == [] and isinstance(error, RuntimeError)
+    assert all(video_ids == [f"{identifier}-video"] and error is None
+               for identifier, (video_ids, error) in results.items())
+    assert 1 < qm.peak <= 4
+
+
+def test_targets_are_pulled_only_a_window_ahead_of_the_workers():
+    pulled = []
+
+    def targets():
+        for index in range(1000):
+            pulled.append(index)
+            yield f"UU{index}", None, None
+
+    scan = PlaylistScanner(FakeQuotaManager(), max_workers=4).scan_incremental(targets())
+    next(scan)
+
+    # Twice the workers in flight, plus one submitted for the playlist that completed
+    assert len(pulled) <= 4 * 2 + 1
+    scan.close()
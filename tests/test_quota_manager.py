@@ -0,0 +1,70 @@
+# tests/test_quota_manager.py
+
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.api import quota_manager as quota_manager_module
+from src.api.errors import QuotaExhaustedError, RateLimitedError
+from src.api.quota_manager import YouTubeQuotaManager
+from src.api.youtube_api_request import YouTubeAPIRequest
+
+
+def http_error(status: int, reason: str) -> HttpError:
+    content = json.dumps({"error": {"code": status, "errors": [{"reason": reason}]}}).encode()
+    return HttpError(httplib2.Response({"status": status}), content)
+
+
+class ScriptedRequest(YouTubeAPIRequest):
+    """Raises the scripted errors in order, then succeeds; records the key of every attempt."""
+
+    API_METHOD = "videos.list"
+
+    def __init__(self, errors: list):
+        self.errors = list(errors)
+        self.keys = []
+
+    def execute(self, service, *args, **kwargs):
+        self.keys.append(service)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok", 1
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(quota_manager_module, "sleep", lambda seconds: None)
+    manager = YouTubeQuotaManager(["key-a", "key-b"], max_retries=2)
+    # The "service" handed to a request is just the index of the key it runs on
+    monkeypatch.setattr(manager, "_build_client", lambda index: index)
+    return manager
+
+
+def test_rate_limited_keys_are_retried_after_a_backoff(manager):
+    request = ScriptedRequest([http_error(429, "rateLimitExceeded"), http_error(403, "userRateLimitExceeded")])
+
+    assert manager.execute(request) == "ok"
+    # Both keys were throttled once, then one of them was tried again
+    assert sorted(request.keys[:2]) == [0, 1]
+    assert len(request.keys) == 3
+
+
+def test_persistent_rate_limits_raise_rate_limited_not_quota_exhausted(manager):
+    request = ScriptedRequest([http_error(429, "rateLimitExceeded")] * 100)
+
+    with pytest.raises(RateLimitedError) as raised:
+        manager.execute(request)
+    assert not isinstance(raised.value, QuotaExhaustedError)
+    # Every key on each of the first attempt and max_retries backoff rounds
+    assert len(request.keys) == 2 * 3
+    assert manager.remaining_units() > 0
+
+
+def test_exhausted_keys_raise_quota_exhausted(manager):
+    request = ScriptedRequest([http_error(403, "quotaExceeded")] * 2)
+
+    with pytest.raises(QuotaExhaustedError):
+        manager.execute(request)
+    assert manager.remaining_units() == 0
@@ -0,0 +1,71 @@
+# tests/test_response_cache.py
+
+import time
+
+import httplib2
+
+from src.api.response_cache import ConditionalHttp, ResponseCache
+
+BASE = "https://youtube.googleapis.com/youtube/v3"
+
+
+class FakeHttp:
+    """Answers with a fixed ETag: 304 when it is sent back, else 200 with the body."""
+
+    def __init__(self, etag: str = '"v1"', body: bytes = b'{"items": []}'):
+        self.etag = etag
+        self.body = body
+        self.requests = []
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        self.requests.append((uri, dict(headers or {})))
+        if (headers or {}).get("if-none-match") == self.etag:
+            return httplib2.Response({"status": 304}), b""
+        return httplib2.Response({"status": 200, "etag": self.etag}), self.body
+
+
+def last_used(cache: ResponseCache) -> list:
+    return [row[0] for row in cache._conn.execute("SELECT last_used FROM responses")]
+
+
+def test_allowed_endpoints_are_revalidated_and_served_from_the_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    http = ConditionalHttp(cache, http=FakeHttp())
+    uri = f"{BASE}/playlistItems?playlistId=UU1&part=snippet&key=secret"
+
+    first = http.request(uri)
+    second = http.request(f"{BASE}/playlistItems?part=snippet&playlistId=UU1&key=other")
+
+    assert second[0].status == 200
+    assert second[1] == first[1]
+    assert http.http.requests[1][1]["if-none-match"] == '"v1"'
+    assert cache.stats()["hits"] == 1
+    cache.close()
+
+
+def test_other_endpoints_bypass_the_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    http = ConditionalHttp(cache, http=FakeHttp())
+
+    for _ in range(2):
+        http.request(f"{BASE}/videos?id=a,b&part=statistics&key=secret")
+
+    assert all("if-none-match" not in headers for _, headers in http.http.requests)
+    assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0, "bytes": 0}
+    cache.close()
+
+
+def test_hits_do_not_write_until_the_cache_flushes(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path)
+    monkeypatch.setattr(time, "time", lambda: 100.0)
+    cache.set("key", '"v1"', {"status": "200"}, b"body")
+
+    monkeypatch.setattr(time, "time", lambda: 200.0)
+    assert cache.get("key")[2] == b"body"
+    assert last_used(cache) == [100.0]
+
+    cache.close()
+    reopened = ResponseCache(path)
+    assert last_used(reopened) == [200.0]
+    reopened.close()
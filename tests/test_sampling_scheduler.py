@@ -0,0 +1,72 @@
+# tests/test_sampling_scheduler.py
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.api.quota_manager import QUOTA_TIMEZONE
+from src.scheduling.sampling_scheduler import SamplingScheduler
+
+NOW = datetime(2025, 7, 1, 12)
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(random, "uniform", lambda low, high: 0.0)
+
+
+def hours_until_next_sample(scheduler: SamplingScheduler, age_hours: float, last_view_count: int = None,
+                            view_count: int = 1000) -> float:
+    last_sampled_at = NOW - timedelta(hours=1) if last_view_count is not None else None
+    next_sample_at = scheduler.next_sample_at(
+        NOW, NOW - timedelta(hours=age_hours), last_sampled_at, last_view_count, view_count
+    )
+    return None if next_sample_at is None else (next_sample_at - NOW).total_seconds() / 3600
+
+
+@pytest.mark.parametrize("age_hours, last_view_count, expected_hours", [
+    (2, None, 1),  # fresh: hourly
+    (48, None, 3),
+    (100, None, 6),
+    (24 * 10, None, 24),  # over a week old: daily
+    (48, 900, 1.5),  # views grew by over 1% an hour: twice as often
+    (48, 1000, 6),  # flat: half as often
+    (2, 900, 1),  # never below min_interval_hours
+])
+def test_interval_follows_age_and_view_growth(no_jitter, age_hours, last_view_count, expected_hours):
+    assert hours_until_next_sample(SamplingScheduler(), age_hours, last_view_count) == expected_hours
+
+
+def test_interval_is_capped_and_tracking_ends(no_jitter):
+    scheduler = SamplingScheduler({"max_interval_hours": 12, "max_tracking_days": 14})
+
+    # Daily, doubled for flat views, capped
+    assert hours_until_next_sample(scheduler, 10 * 24, last_view_count=1000) == 12
+    assert hours_until_next_sample(scheduler, 14 * 24) is None
+
+
+def test_jitter_stays_within_ten_percent():
+    scheduler = SamplingScheduler()
+
+    intervals = {hours_until_next_sample(scheduler, 10 * 24) for _ in range(200)}
+
+    assert len(intervals) > 1
+    assert all(24 * 0.9 <= hours <= 24 * 1.1 for hours in intervals)
+
+
+def test_first_sample_is_an_interval_after_the_upload():
+    upload = datetime(2025, 7, 1, 9, 30)
+
+    assert SamplingScheduler({"min_interval_hours": 2}).first_sample_at(upload) == datetime(2025, 7, 1, 11, 30)
+
+
+def test_hourly_budget_spreads_the_quota_share_over_the_hours_to_the_reset():
+    scheduler = SamplingScheduler({"quota_share": 0.8})
+    ten_hours_before_reset = datetime(2025, 7, 1, 14, tzinfo=QUOTA_TIMEZONE)
+    last_hour = datetime(2025, 7, 1, 23, 30, tzinfo=QUOTA_TIMEZONE)
+
+    # 10,000 units * 0.8 / 10 hours = 800 units this hour, at 50 videos per unit
+    assert scheduler.hourly_video_budget(10_000, ten_hours_before_reset) == 40_000
+    # Less than an hour left: this run may spend the whole share
+    assert scheduler.hourly_video_budget(10_000, last_hour) == 400_000